@@ -1,6 +1,6 @@
 from fastapi import APIRouter
 
-from .endpoints import auth, users, chat, speech, websocket
+from .endpoints import auth, users, chat, speech, websocket, maps, trips, analytics, admin
 
 api_router = APIRouter()
 
@@ -13,8 +13,20 @@ api_router.include_router(users.router, prefix="/users", tags=["用户"])
 # 注册聊天相关路由
 api_router.include_router(chat.router, prefix="/chats", tags=["聊天"])
 
-# 注册语音识别相关路由
-api_router.include_router(speech.router, prefix="/speech", tags=["语音识别"])
+# 注册语音识别与合成相关路由
+api_router.include_router(speech.router, prefix="/speech", tags=["语音"])
+
+# 注册地图相关路由
+api_router.include_router(maps.router, prefix="/maps", tags=["地图"])
+
+# 注册行程相关路由
+api_router.include_router(trips.router, prefix="/trips", tags=["行程"])
+
+# 注册统计相关路由
+api_router.include_router(analytics.router, prefix="/analytics", tags=["统计"])
+
+# 注册管理接口（采样分析、慢请求），不在接口文档中展示
+api_router.include_router(admin.router, prefix="/admin", tags=["管理"], include_in_schema=False)
 
 # 注册WebSocket相关路由
 api_router.include_router(websocket.router, tags=["WebSocket"])
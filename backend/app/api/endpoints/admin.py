@@ -0,0 +1,98 @@
+import os
+from typing import Any, Dict, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+from sqlalchemy.orm import Session
+
+from ...core.config import settings
+from ...core.database import get_db
+from ...core.profiler import sampler, slow_requests, slow_requests_collapsed
+from ...core.tracing import memory_exporter
+from ...core.security import verify_admin_token
+from ...schemas.admin import ExchangeRates, ExchangeRatesUpdate, ProfilerStatus, SlowRequest
+from ...services.currency_service import CurrencyService
+
+# 管理接口只作用于处理请求的工作进程，响应中的pid用于区分
+router = APIRouter(dependencies=[Depends(verify_admin_token)])
+
+
+# 开始采样分析
+@router.post("/profiler/start", response_model=ProfilerStatus)
+def start_profiler(
+    interval_ms: float = Query(None, ge=1, le=1000, description="采样间隔，默认PROFILER_INTERVAL_MS"),
+    duration_seconds: int = Query(60, ge=1, description="最长采样时间，到期自动停止"),
+    include_idle: bool = Query(False, description="是否计入等待锁、队列或事件循环的空闲线程")
+):
+    duration = min(duration_seconds, settings.PROFILER_MAX_DURATION_SECONDS)
+    try:
+        sampler.start((interval_ms or settings.PROFILER_INTERVAL_MS) / 1000, duration, include_idle)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return sampler.status()
+
+
+# 停止采样分析
+@router.post("/profiler/stop", response_model=ProfilerStatus)
+def stop_profiler():
+    sampler.stop()
+    return sampler.status()
+
+
+# 查看采样分析状态
+@router.get("/profiler", response_model=ProfilerStatus)
+def get_profiler_status():
+    return sampler.status()
+
+
+# 下载采样结果
+@router.get("/profiler/flamegraph", response_class=PlainTextResponse)
+def get_profiler_flamegraph():
+    """折叠栈格式，可用flamegraph.pl或speedscope生成火焰图；采样进行中时返回当前的结果"""
+    return PlainTextResponse(sampler.collapsed(), headers={"X-Worker-Pid": str(os.getpid())})
+
+
+# 最近的慢请求
+@router.get("/slow-requests", response_model=List[SlowRequest])
+def get_slow_requests():
+    return slow_requests()
+
+
+# 慢请求各阶段耗时火焰图
+@router.get("/slow-requests/flamegraph", response_class=PlainTextResponse)
+def get_slow_requests_flamegraph():
+    """折叠栈格式，数值为微秒"""
+    return PlainTextResponse(slow_requests_collapsed(), headers={"X-Worker-Pid": str(os.getpid())})
+
+
+# 最近的追踪span（仅TRACING_BACKEND=memory）
+@router.get("/traces")
+def get_traces(
+    trace_id: Optional[str] = Query(None, description="32位十六进制trace_id，如响应头X-Trace-Id"),
+    limit: int = Query(200, ge=1, le=5000)
+) -> List[Dict[str, Any]]:
+    if memory_exporter is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="未开启内存追踪（TRACING_BACKEND=memory）")
+    try:
+        trace_filter = int(trace_id, 16) if trace_id else None
+    except ValueError:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="trace_id格式不正确")
+    spans = memory_exporter.get_finished_spans(trace_filter)[-limit:]
+    return [span.to_dict() for span in spans]
+
+
+# 当前汇率（默认值与汇率表合并后的结果）
+@router.get("/exchange-rates", response_model=ExchangeRates)
+def get_exchange_rates(db: Session = Depends(get_db)):
+    return {"base": settings.CURRENCY_BASE, "rates": CurrencyService(db).rates()}
+
+
+# 更新汇率
+@router.put("/exchange-rates", response_model=ExchangeRates)
+def update_exchange_rates(request: ExchangeRatesUpdate, db: Session = Depends(get_db)):
+    """写入汇率表，已保存的行程花费在下次重新计算时按新汇率换算"""
+    try:
+        rates = CurrencyService(db).set_rates(request.rates)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    return {"base": settings.CURRENCY_BASE, "rates": rates}
@@ -0,0 +1,54 @@
+from datetime import datetime, timedelta, timezone
+from typing import List, Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from ...core.database import get_db
+from ...core.security import get_current_user, verify_admin_token
+from ...models.user import User
+from ...schemas.analytics import AnalyticsEventBatch, AnalyticsSeriesResponse
+from ...services.analytics_service import AnalyticsService
+
+router = APIRouter()
+
+# 未指定开始时间时的默认查询范围
+DEFAULT_RANGES = {"hour": timedelta(hours=24), "day": timedelta(days=30)}
+
+
+# 上报客户端事件（如查看兴趣点详情）
+@router.post("/events", status_code=status.HTTP_202_ACCEPTED)
+async def record_events(
+    batch: AnalyticsEventBatch,
+    current_user: User = Depends(get_current_user)
+):
+    """事件先写入进程内缓冲区，由后台任务批量入库"""
+    for event in batch.events:
+        properties = dict(event.properties or {})
+        if event.poi_id is not None:
+            properties["poi_id"] = str(event.poi_id)
+        AnalyticsService.record(event.event_type, current_user.id, **properties)
+    return {"accepted": len(batch.events)}
+
+
+# 查询统计汇总（全站数据，需要管理令牌）
+@router.get("/series", response_model=AnalyticsSeriesResponse, dependencies=[Depends(verify_admin_token)])
+async def get_series(
+    granularity: Literal["hour", "day"] = "hour",
+    start: Optional[datetime] = Query(None, description="为空时小时粒度取最近24小时，天粒度取最近30天"),
+    end: Optional[datetime] = None,
+    event_type: Optional[List[str]] = Query(None, description="可重复，为空时返回所有事件类型"),
+    db: Session = Depends(get_db)
+):
+    """按小时或天读取事件数、计量值之和和去重用户数，只读取汇总表"""
+    end = end or datetime.now(timezone.utc)
+    start = start or end - DEFAULT_RANGES[granularity]
+
+    analytics_service = AnalyticsService(db)
+    try:
+        return analytics_service.series(granularity, start, end, event_type)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
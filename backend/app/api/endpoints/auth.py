@@ -1,11 +1,12 @@
+import logging
 from datetime import timedelta
 from typing import Any, Dict
 
 from fastapi import APIRouter, Depends, status, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 from sqlalchemy.orm import Session
-import traceback
 
+from ...core.container import get_auth_service
 from ...core.database import get_db
 from ...core.security import create_access_token
 from ...core.config import settings
@@ -21,15 +22,18 @@ from ...schemas.user import (
 from ...services.user_service import UserService
 from ...services.auth_service import AuthService
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 @router.post("/signup", response_model=UserAndToken)
 def signup(
     user_data: UserCreate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    auth_service: AuthService = Depends(get_auth_service)
 ) -> Any:
     """用户注册（使用Supabase Auth）"""
-    print(f"收到的注册数据: {user_data.dict()}")
+    logger.debug("收到注册请求: %s", user_data.email)
 
     # 验证密码强度
     if len(user_data.password) < 6:
@@ -46,7 +50,6 @@ def signup(
 
     # 使用Supabase Auth创建用户
     try:
-        auth_service = AuthService()
         response = auth_service.sign_up(
             email=user_data.email,
             password=user_data.password,
@@ -75,7 +78,7 @@ def signup(
                 access_token = login_response["session"].access_token
             except Exception as login_error:
                 # 如果自动登录也失败，返回提示信息
-                print(f"自动登录失败: {str(login_error)}")
+                logger.info("注册后自动登录失败: %s", login_error)
                 return {
                     "user": user,
                     "token": None,
@@ -87,8 +90,7 @@ def signup(
             "token": access_token
         }
     except Exception as e:
-        print(f"注册失败: {str(e)}")
-        traceback.print_exc()
+        logger.exception("注册失败")
         if "already registered" in str(e).lower():
             raise EmailAlreadyExistsException(user_data.email)
         raise DatabaseException(f"注册失败: {str(e)}")
@@ -96,12 +98,12 @@ def signup(
 @router.post("/login")
 def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    auth_service: AuthService = Depends(get_auth_service)
 ) -> Any:
     """OAuth2兼容的登录接口（使用Supabase Auth）"""
     try:
         # 使用Supabase进行身份验证
-        auth_service = AuthService()
         response = auth_service.sign_in(
             email=form_data.username,
             password=form_data.password
@@ -120,20 +122,20 @@ def login_for_access_token(
 
         return {"access_token": access_token, "token_type": "bearer"}
     except Exception as e:
-        print(f"登录失败: {str(e)}")
-        traceback.print_exc()
+        # 账号密码错误是常见情况，不记录堆栈
+        logger.info("登录失败: %s", e)
         raise InvalidCredentialsException()
 
 @router.post("/signin", response_model=UserAndToken)
 def signin(
     user_credentials: UserLogin,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    auth_service: AuthService = Depends(get_auth_service)
 ) -> Any:
     """用户登录（使用Supabase Auth）"""
-    print(f"收到登录请求: {user_credentials.email}")
+    logger.debug("收到登录请求: %s", user_credentials.email)
     try:
         # 使用Supabase进行身份验证
-        auth_service = AuthService()
         response = auth_service.sign_in(
             email=user_credentials.email,
             password=user_credentials.password
@@ -155,8 +157,8 @@ def signin(
             "token": access_token
         }
     except Exception as e:
-        print(f"登录失败: {str(e)}")
-        traceback.print_exc()
+        # 账号密码错误是常见情况，不记录堆栈
+        logger.info("登录失败: %s", e)
         raise InvalidCredentialsException()
 
 @router.post("/guest", response_model=UserAndToken)
@@ -178,16 +180,15 @@ def guest_signin(db: Session = Depends(get_db)) -> Any:
 
 @router.post("/signout", response_model=MessageResponse)
 def signout(
-    token: str = Depends(OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login"))
+    token: str = Depends(OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")),
+    auth_service: AuthService = Depends(get_auth_service)
 ) -> Any:
     """用户登出（使用Supabase Auth）"""
     try:
         # 使用Supabase进行登出
-        auth_service = AuthService()
         auth_service.sign_out(access_token=token)
         return {"message": "登出成功"}
     except Exception as e:
-        print(f"登出失败: {str(e)}")
-        traceback.print_exc()
+        logger.warning("登出失败: %s", e)
         # 即使Supabase登出失败，也返回成功消息，因为客户端可以清除本地令牌
         return {"message": "登出成功"}
@@ -0,0 +1,262 @@
+import asyncio
+from typing import Optional
+from uuid import UUID
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from sqlalchemy.orm import Session
+
+from ...core.config import settings
+from ...core.database import get_db
+from ...core.security import get_current_user
+from ...models.user import User
+from ...schemas.poi import DistanceMatrixRequest, DistanceMatrixResponse, GeocodeListResponse, PoiListResponse
+from ...services.amap_client import AMapClient
+from ...services.map_service import MapService
+from ...services.static_map_service import StaticMapService
+from ...services.trip_service import TripService
+
+router = APIRouter()
+
+# 高德静态地图的最大图片尺寸
+STATIC_MAP_MAX_SIZE = 1024
+
+
+def _parse_size(size: str) -> str:
+    """校验 宽*高 格式的图片尺寸"""
+    try:
+        width, height = (int(value) for value in size.split("*"))
+    except ValueError:
+        width = height = 0
+    if not (1 <= width <= STATIC_MAP_MAX_SIZE and 1 <= height <= STATIC_MAP_MAX_SIZE):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"图片尺寸应为 宽*高，且不超过{STATIC_MAP_MAX_SIZE}*{STATIC_MAP_MAX_SIZE}"
+        )
+    return f"{width}*{height}"
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    """请求头If-None-Match是否包含当前ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in header.split(","))
+
+
+def _read_image(path: str) -> Optional[bytes]:
+    """读取缓存的图片文件，文件已被淘汰时返回None"""
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+async def _static_map_response(request: Request, params: dict) -> Response:
+    """
+    返回静态地图图片：ETag未变时返回304，否则从磁盘缓存读取后发送，
+    配置了STATIC_MAP_ACCEL_PREFIX时交给Nginx发送文件
+    """
+    etag = f'"{StaticMapService.image_key(params)}"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"private, max-age={settings.STATIC_MAP_MAX_AGE_SECONDS}",
+    }
+    if _etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    _, path = await StaticMapService.get_image(params)
+    accel_path = StaticMapService.accel_path(path)
+    if accel_path is not None:
+        headers["X-Accel-Redirect"] = accel_path
+        return Response(media_type="image/png", headers=headers)
+
+    # 取到路径后文件可能被并发写入触发的淘汰删除，此时重新获取一次；图片不大，整体读出后发送
+    data = await asyncio.to_thread(_read_image, path)
+    if data is None:
+        _, path = await StaticMapService.get_image(params)
+        data = await asyncio.to_thread(_read_image, path)
+    if data is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="静态地图暂时不可用，请稍后重试"
+        )
+    return Response(content=data, media_type="image/png", headers=headers)
+
+
+# 搜索附近的兴趣点
+@router.get("/pois/nearby", response_model=PoiListResponse)
+async def search_nearby_pois(
+    latitude: float = Query(..., ge=-90, le=90),
+    longitude: float = Query(..., ge=-180, le=180),
+    radius: float = Query(1000, gt=0, le=50000, description="搜索半径（米）"),
+    category: Optional[str] = None,
+    min_rating: Optional[float] = Query(None, ge=0, le=5),
+    limit: int = Query(50, ge=1, le=500),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """搜索指定半径内的兴趣点，按距离由近到远排序"""
+    map_service = MapService(db)
+    pois = map_service.search_nearby(latitude, longitude, radius, category, min_rating, limit)
+    return {"pois": pois}
+
+
+# 搜索矩形区域内的兴趣点（地图可视区域）
+@router.get("/pois/bbox", response_model=PoiListResponse)
+async def search_bbox_pois(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lng: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lng: float = Query(..., ge=-180, le=180),
+    category: Optional[str] = None,
+    min_rating: Optional[float] = Query(None, ge=0, le=5),
+    limit: int = Query(100, ge=1, le=1000),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """搜索地图可视区域内的兴趣点，按评分由高到低排序"""
+    if min_lat > max_lat or min_lng > max_lng:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="区域范围无效"
+        )
+
+    map_service = MapService(db)
+    pois = map_service.search_bbox(min_lat, min_lng, max_lat, max_lng, category, min_rating, limit)
+    return {"pois": pois}
+
+
+# 兴趣点名称联想（汉字、全拼或拼音首字母）
+@router.get("/pois/autocomplete", response_model=PoiListResponse)
+async def autocomplete_pois(
+    q: str = Query(..., min_length=1, max_length=50),
+    latitude: Optional[float] = Query(None, ge=-90, le=90, description="地图中心纬度"),
+    longitude: Optional[float] = Query(None, ge=-180, le=180, description="地图中心经度"),
+    limit: int = Query(10, ge=1, le=50),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """按名称前缀联想兴趣点，评分越高、离地图中心越近越靠前"""
+    map_service = MapService(db)
+    pois = map_service.autocomplete(q, latitude, longitude, limit)
+    return {"pois": pois}
+
+
+# 静态地图图片（经服务端缓存的高德静态地图）
+@router.get("/static", response_class=Response)
+async def static_map(
+    request: Request,
+    location: Optional[str] = Query(None, max_length=64, description="地图中心点：经度,纬度"),
+    zoom: Optional[int] = Query(None, ge=1, le=17),
+    size: str = Query("400*400", max_length=9, description="图片尺寸：宽*高"),
+    scale: int = Query(1, ge=1, le=2, description="2为高清图"),
+    markers: Optional[str] = Query(None, max_length=4000),
+    labels: Optional[str] = Query(None, max_length=2000),
+    paths: Optional[str] = Query(None, max_length=4000),
+    traffic: int = Query(0, ge=0, le=1),
+    current_user: User = Depends(get_current_user)
+):
+    """获取静态地图图片，参数同高德静态地图API，相同参数的图片只请求高德一次"""
+    if not (location or markers or paths):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="location、markers、paths至少需要提供一个"
+        )
+
+    params = {
+        "location": location,
+        "zoom": zoom,
+        "size": _parse_size(size),
+        "scale": scale,
+        "markers": markers,
+        "labels": labels,
+        "paths": paths,
+        "traffic": traffic,
+    }
+    return await _static_map_response(request, params)
+
+
+# 行程路线缩略图
+@router.get("/trips/{trip_id}/thumbnail", response_class=Response)
+async def trip_thumbnail(
+    request: Request,
+    trip_id: UUID,
+    day_index: Optional[int] = Query(None, ge=0, description="为空时包含所有天的途经点"),
+    size: str = Query("400*300", max_length=9, description="图片尺寸：宽*高"),
+    scale: int = Query(1, ge=1, le=2),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """按游览顺序标注行程途经点并连线的静态地图"""
+    trip = TripService(db).get_trip(trip_id, current_user.id)
+    days = [] if trip is None else [day for day in trip.days if day_index is None or day.day_index == day_index]
+    if not days:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="行程或行程日不存在"
+        )
+
+    points = [(stop.latitude, stop.longitude) for day in days for stop in day.stops]
+    if not points:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="行程中还没有途经点"
+        )
+
+    params = StaticMapService.route_params(points, _parse_size(size), scale)
+    return await _static_map_response(request, params)
+
+
+# 关键字搜索兴趣点（经高德地图，结果缓存并写入本地兴趣点表）
+@router.get("/pois/search", response_model=PoiListResponse)
+async def search_pois(
+    keywords: str = Query(..., min_length=1, max_length=100),
+    city: Optional[str] = None,
+    types: Optional[str] = None,
+    page: int = Query(1, ge=1, le=100),
+    page_size: int = Query(20, ge=1, le=25),
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """按关键字搜索兴趣点"""
+    amap_client = AMapClient(db)
+    pois = await amap_client.search_pois(keywords, city, types, page, page_size)
+    return {"pois": pois}
+
+
+# 地理编码：地址转经纬度
+@router.get("/geocode", response_model=GeocodeListResponse)
+async def geocode(
+    address: str = Query(..., min_length=1, max_length=200),
+    city: Optional[str] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """将结构化地址转换为经纬度"""
+    amap_client = AMapClient(db)
+    results = await amap_client.geocode(address, city)
+    return {"results": results}
+
+
+# 计算途经点之间的距离/时间矩阵
+@router.post("/distance-matrix", response_model=DistanceMatrixResponse)
+async def distance_matrix(
+    request: DistanceMatrixRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """计算途经点两两之间的距离和时间，高德不可用时返回直线距离估算值"""
+    map_service = MapService(db)
+    try:
+        return await map_service.distance_matrix(
+            [(point.latitude, point.longitude) for point in request.points],
+            request.mode
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
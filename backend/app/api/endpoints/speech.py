@@ -1,14 +1,24 @@
 
 import os
+import json
+import base64
+import asyncio
 import logging
+from collections import deque
 from typing import Dict, Any
+from uuid import UUID
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
 
+from ...core.config import settings
 from ...core.database import get_db
 from ...core.security import get_current_user
 from ...models.user import User
+from ...schemas.chat import ChatCompletionRequest
+from ...schemas.speech import TextToSpeechRequest
+from ...services.analytics_service import AnalyticsService
+from ...services.chat_service import ChatService
 from ...services.speech_service import SpeechService
 
 # 设置日志
@@ -34,30 +44,34 @@ async def speech_to_text(
                 detail="上传的文件不是有效的音频文件"
             )
 
-        # 读取上传的音频文件
-        audio_bytes = await audio_file.read()
+        # 超限的请求体已由上传大小限制中间件拒绝，这里只检查文件本身的大小
+        max_bytes = settings.SPEECH_MAX_UPLOAD_MB * 1024 * 1024
+        file_size = audio_file.file.seek(0, os.SEEK_END)
 
         # 检查文件大小
-        if len(audio_bytes) == 0:
+        if file_size == 0:
             logger.error("音频文件为空")
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="音频文件为空"
             )
 
-        # 检查文件大小限制 (10MB)
-        if len(audio_bytes) > 10 * 1024 * 1024:
-            logger.error(f"音频文件过大: {len(audio_bytes)} bytes")
+        # 检查文件大小限制
+        if file_size > max_bytes:
+            logger.error(f"音频文件过大: {file_size} bytes")
             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="音频文件过大，请上传小于10MB的文件"
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"音频文件过大，请上传小于{settings.SPEECH_MAX_UPLOAD_MB}MB的文件"
             )
 
-        logger.info(f"用户 {current_user.id} 上传了音频文件，大小: {len(audio_bytes)} bytes, 类型: {audio_file.content_type}")
+        logger.info(f"用户 {current_user.id} 上传了音频文件，大小: {file_size} bytes, 类型: {audio_file.content_type}")
 
-        # 使用改进版语音识别服务
-        result = await SpeechService.speech_to_text(audio_bytes, audio_file.content_type)
+        # 使用改进版语音识别服务，解码器直接读取上传时已缓存的文件，不再复制一份
+        result = await SpeechService.speech_to_text_file(audio_file.file, audio_file.content_type)
 
+        AnalyticsService.record(
+            "voice_request", current_user.id, kind="asr", success=result["success"], bytes=file_size
+        )
         if not result["success"]:
             logger.error(f"语音识别失败: {result.get('error', '未知错误')}")
             raise HTTPException(
@@ -65,7 +79,7 @@ async def speech_to_text(
                 detail=result.get("error", "语音识别失败")
             )
 
-        logger.info(f"语音识别成功: {result.get('text', '')[:50]}...")
+        logger.debug("语音识别成功: %s...", result.get('text', '')[:50])
         return result
 
     except HTTPException:
@@ -76,3 +90,150 @@ async def speech_to_text(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"语音识别失败: {str(e)}"
         )
+
+
+@router.post("/text-to-speech")
+async def text_to_speech(
+    request: TextToSpeechRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    将文本合成为语音，按句合成并以MP3流的形式依次返回
+    """
+    sentences, rest = SpeechService.split_sentences(request.text)
+    if rest.strip():
+        sentences.append(rest.strip())
+    if not sentences:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="合成文本为空"
+        )
+
+    AnalyticsService.record("voice_request", current_user.id, kind="tts", chars=len(request.text))
+
+    # 所有句子同时开始合成（受会话数限制），按顺序输出
+    tasks = [asyncio.ensure_future(SpeechService.synthesize(sentence)) for sentence in sentences]
+    try:
+        first_audio = await tasks[0]
+    except Exception as e:
+        for task in tasks:
+            task.cancel()
+        logger.error(f"语音合成失败: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"语音合成失败: {str(e)}"
+        )
+
+    async def generate():
+        try:
+            yield first_audio
+            for task in tasks[1:]:
+                yield await task
+        except Exception as e:
+            logger.error(f"语音合成失败: {str(e)}", exc_info=True)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(generate(), media_type="audio/mpeg")
+
+
+@router.post("/chats/{chat_id}/completions")
+async def speak_chat_completion(
+    chat_id: UUID,
+    request: ChatCompletionRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    发送消息并获取带语音的AI回复：在文本流中穿插按句合成的音频事件，
+    回复的第一句生成后即可开始播放
+    """
+    chat_service = ChatService(db)
+
+    chat = chat_service.get_chat(chat_id, current_user.id)
+    if not chat:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="聊天不存在"
+        )
+
+    request.stream = True
+    chat_generator = await chat_service.complete_chat(chat_id, current_user.id, request)
+
+    def audio_event(index: int, sentence: str, audio: bytes) -> str:
+        return "data: " + json.dumps({
+            "type": "audio",
+            "index": index,
+            "text": sentence,
+            "format": "mp3",
+            "audio": str(base64.b64encode(audio), "utf-8")
+        }) + "\n\n"
+
+    def sentence_event(index: int, sentence: str, task: "asyncio.Future[bytes]") -> str:
+        # 单句合成失败时只输出该句文本和错误，不影响文本流和其他句子
+        try:
+            return audio_event(index, sentence, task.result())
+        except Exception as e:
+            logger.warning(f"第{index}句语音合成失败: {str(e)}")
+            return "data: " + json.dumps({
+                "type": "audio_error",
+                "index": index,
+                "text": sentence,
+                "error": str(e)
+            }) + "\n\n"
+
+    async def generate():
+        # 正在合成的句子，按顺序输出
+        pending = deque()
+        buffer = ""
+        index = 0
+        try:
+            async for chunk in chat_generator:
+                yield f"data: {chunk}\n\n"
+
+                try:
+                    buffer += json.loads(chunk)["choices"][0]["delta"]["content"]
+                except (json.JSONDecodeError, KeyError, IndexError, TypeError):
+                    continue
+
+                sentences, buffer = SpeechService.split_sentences(buffer)
+                for sentence in sentences:
+                    pending.append((sentence, asyncio.ensure_future(SpeechService.synthesize(sentence))))
+
+                # 已合成完成的句子立即输出，不等待后续文本
+                while pending and pending[0][1].done():
+                    sentence, task = pending.popleft()
+                    yield sentence_event(index, sentence, task)
+                    index += 1
+
+            if buffer.strip():
+                pending.append((buffer.strip(), asyncio.ensure_future(SpeechService.synthesize(buffer.strip()))))
+
+            while pending:
+                sentence, task = pending.popleft()
+                # 等待合成结束，异常由sentence_event处理
+                await asyncio.wait([task])
+                yield sentence_event(index, sentence, task)
+                index += 1
+
+            yield "data: [DONE]\n\n"
+        except Exception as e:
+            logger.error(f"语音回复生成失败: {str(e)}", exc_info=True)
+            error_data = json.dumps({"error": str(e)})
+            yield f"data: {error_data}\n\n"
+        finally:
+            for _, task in pending:
+                task.cancel()
+            # 回复在生成器结束时保存，客户端断开时也需关闭生成器
+            await chat_generator.aclose()
+
+    return StreamingResponse(
+        generate(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "Connection": "keep-alive",
+            "X-Accel-Buffering": "no"  # 禁用Nginx缓冲
+        }
+    )
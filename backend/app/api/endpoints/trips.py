@@ -0,0 +1,331 @@
+from typing import Optional
+from uuid import UUID
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.orm import Session
+
+from ...core.database import get_db
+from ...core.security import get_current_user
+from ...models.user import User
+from ...schemas.trip import (
+    TripCreate,
+    TripUpdate,
+    TripResponse,
+    TripListResponse,
+    TripDetailResponse,
+    TripDaysResponse,
+    TripDayUpdate,
+    TripStopCreate,
+    TripStopUpdate,
+    TripOptimizeRequest,
+    TripOptimizeResponse,
+    TripExpenseCreate,
+    TripBudgetResponse,
+    BudgetCompareRequest,
+    BudgetCompareResponse
+)
+from ...services.trip_service import TripService
+
+router = APIRouter()
+
+
+def _days_response(result):
+    """把服务返回的(行程, 受影响的行程日)转换为响应，不存在时返回404"""
+    if result is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="行程、行程日或途经点不存在"
+        )
+    trip, days = result
+    return {"total_cost": trip.total_cost, "days": days}
+
+
+# 优化行程中每一天的游览顺序（不保存）
+@router.post("/optimize", response_model=TripOptimizeResponse)
+async def optimize_plan(
+    request: TripOptimizeRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """按营业时间、游览时长和当日预算安排每天的途经点顺序，无法安排的途经点在dropped中返回"""
+    trip_service = TripService(db)
+    try:
+        return await trip_service.optimize(request)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+# 比较多个预算方案（不保存）
+@router.post("/budget/compare", response_model=BudgetCompareResponse)
+async def compare_budgets(
+    request: BudgetCompareRequest,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """按币种和人数汇总每个方案的分类花费和每日花费，并标记超出预算的方案"""
+    trip_service = TripService(db)
+    try:
+        return trip_service.compare_budgets(request)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+# 获取用户行程列表
+@router.get("/", response_model=TripListResponse)
+async def get_user_trips(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """获取当前用户的所有行程"""
+    trip_service = TripService(db)
+    trips = trip_service.get_user_trips(current_user.id)
+    return {"trips": trips}
+
+
+# 创建行程
+@router.post("/", response_model=TripDetailResponse, status_code=status.HTTP_201_CREATED)
+async def create_trip(
+    trip_data: TripCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """创建行程及其每一天"""
+    trip_service = TripService(db)
+    try:
+        return trip_service.create_trip(current_user.id, trip_data)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+
+# 获取行程详情
+@router.get("/{trip_id}", response_model=TripDetailResponse)
+async def get_trip(
+    trip_id: UUID,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """获取行程的每一天及途经点"""
+    trip_service = TripService(db)
+    trip = trip_service.get_trip(trip_id, current_user.id)
+
+    if not trip:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="行程不存在"
+        )
+
+    return trip
+
+
+# 更新行程信息
+@router.patch("/{trip_id}", response_model=TripResponse)
+async def update_trip(
+    trip_id: UUID,
+    trip_data: TripUpdate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """更新行程标题、目的地、开始日期、出行方式、人数或币种"""
+    trip_service = TripService(db)
+    try:
+        trip = await trip_service.update_trip(trip_id, current_user.id, trip_data)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    if not trip:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="行程不存在"
+        )
+
+    return trip
+
+
+# 删除行程
+@router.delete("/{trip_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_trip(
+    trip_id: UUID,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """删除行程"""
+    trip_service = TripService(db)
+    success = trip_service.delete_trip(trip_id, current_user.id)
+
+    if not success:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="行程不存在"
+        )
+
+    return None
+
+
+# 修改某一天的时间、预算或出发地
+@router.patch("/{trip_id}/days/{day_index}", response_model=TripDaysResponse)
+async def update_trip_day(
+    trip_id: UUID,
+    day_index: int,
+    day_data: TripDayUpdate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """修改行程日设置，只重新计算这一天"""
+    trip_service = TripService(db)
+    try:
+        result = await trip_service.update_day(trip_id, current_user.id, day_index, day_data)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return _days_response(result)
+
+
+# 在某一天添加途经点
+@router.post("/{trip_id}/days/{day_index}/stops", response_model=TripDaysResponse, status_code=status.HTTP_201_CREATED)
+async def add_trip_stop(
+    trip_id: UUID,
+    day_index: int,
+    stop_data: TripStopCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """在指定位置插入途经点，只重新计算这一天"""
+    trip_service = TripService(db)
+    try:
+        result = await trip_service.add_stop(trip_id, current_user.id, day_index, stop_data)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return _days_response(result)
+
+
+# 修改或移动途经点
+@router.patch("/{trip_id}/stops/{stop_id}", response_model=TripDaysResponse)
+async def update_trip_stop(
+    trip_id: UUID,
+    stop_id: UUID,
+    stop_data: TripStopUpdate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """修改途经点或调整顺序，跨天移动时重新计算移出和移入的两天"""
+    trip_service = TripService(db)
+    try:
+        result = await trip_service.update_stop(trip_id, current_user.id, stop_id, stop_data)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    return _days_response(result)
+
+
+# 删除途经点
+@router.delete("/{trip_id}/stops/{stop_id}", response_model=TripDaysResponse)
+async def delete_trip_stop(
+    trip_id: UUID,
+    stop_id: UUID,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """删除途经点，只重新计算这一天"""
+    trip_service = TripService(db)
+    result = await trip_service.delete_stop(trip_id, current_user.id, stop_id)
+    return _days_response(result)
+
+
+# 优化已保存行程的游览顺序
+@router.post("/{trip_id}/optimize", response_model=TripDaysResponse)
+async def optimize_trip(
+    trip_id: UUID,
+    day_index: Optional[int] = None,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """重新排列某一天或所有天的途经点，无法安排的途经点排在当天末尾并标记为冲突"""
+    trip_service = TripService(db)
+    result = await trip_service.optimize_trip(trip_id, current_user.id, day_index)
+    return _days_response(result)
+
+
+# 获取行程预算
+@router.get("/{trip_id}/budget", response_model=TripBudgetResponse)
+async def get_trip_budget(
+    trip_id: UUID,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """按分类和行程日汇总行程花费，金额为行程币种"""
+    trip_service = TripService(db)
+    budget = trip_service.get_budget(trip_id, current_user.id)
+
+    if not budget:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="行程不存在"
+        )
+
+    return budget
+
+
+# 添加行程花费
+@router.post("/{trip_id}/expenses", response_model=TripBudgetResponse, status_code=status.HTTP_201_CREATED)
+async def add_trip_expense(
+    trip_id: UUID,
+    expense_data: TripExpenseCreate,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """添加住宿、餐饮等不在路线上的花费，只重新计算所属的那一天"""
+    trip_service = TripService(db)
+    try:
+        budget = trip_service.add_expense(trip_id, current_user.id, expense_data)
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+
+    if not budget:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="行程不存在"
+        )
+
+    return budget
+
+
+# 删除行程花费
+@router.delete("/{trip_id}/expenses/{expense_id}", response_model=TripBudgetResponse)
+async def delete_trip_expense(
+    trip_id: UUID,
+    expense_id: UUID,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """删除花费并重新计算预算"""
+    trip_service = TripService(db)
+    budget = trip_service.delete_expense(trip_id, current_user.id, expense_id)
+
+    if not budget:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="行程或花费不存在"
+        )
+
+    return budget
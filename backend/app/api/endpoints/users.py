@@ -1,17 +1,23 @@
+import logging
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, Query, status, UploadFile, File
 from sqlalchemy.orm import Session
 
+from ...core.container import get_auth_service
 from ...core.database import get_db
 from ...models.user import User
 from ...schemas.user import (
     User, UserUpdate, AvatarUploadResponse,
-    MessageResponse, PasswordResetRequest
+    MessageResponse, PasswordResetRequest, TokenUsageResponse
 )
+from ...services.auth_service import AuthService
+from ...services.token_usage_service import TokenUsageService
 from ...services.user_service import UserService
 from ...utils.auth import get_current_active_user
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 @router.get("/me", response_model=User)
@@ -36,6 +42,15 @@ def update_current_user(
         )
     return user
 
+@router.get("/me/token-usage", response_model=TokenUsageResponse)
+def get_token_usage(
+    days: int = Query(7, ge=1, le=90, description="统计最近几天（UTC自然日）"),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+) -> Any:
+    """获取当前用户的AI token用量和配额使用情况"""
+    return TokenUsageService(db).get_usage(current_user.id, current_user.is_guest, days)
+
 @router.post("/me/avatar", response_model=AvatarUploadResponse)
 def upload_avatar(
     file: UploadFile = File(...),
@@ -71,15 +86,15 @@ def upload_avatar(
 @router.post("/reset-password", response_model=MessageResponse)
 def reset_password(
     password_reset: PasswordResetRequest,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    auth_service: AuthService = Depends(get_auth_service)
 ) -> Any:
     """重置密码（使用Supabase Auth）"""
     try:
         # 使用Supabase发送密码重置邮件
-        auth_service = AuthService()
         auth_service.reset_password(email=password_reset.email)
         return {"message": "密码重置邮件已发送"}
     except Exception as e:
-        print(f"发送密码重置邮件失败: {str(e)}")
+        logger.warning("发送密码重置邮件失败: %s", e)
         # 为了安全，即使发送失败也返回成功消息
         return {"message": "密码重置邮件已发送"}
\ No newline at end of file
@@ -1,24 +1,28 @@
+import logging
 from typing import Dict, Any
 from uuid import UUID
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Depends
 from sqlalchemy.orm import Session
 
+from ...core.container import get_auth_service, get_realtime_service
 from ...core.database import get_db
 from ...core.security import get_current_user
 from ...models.user import User
 from ...services.analytics_service import RealtimeService
+from ...services.auth_service import AuthService
 
-router = APIRouter()
+logger = logging.getLogger(__name__)
 
-# 创建实时服务实例
-realtime_service = RealtimeService()
+router = APIRouter()
 
 @router.websocket("/ws/{chat_id}")
 async def websocket_endpoint(
     websocket: WebSocket, 
     chat_id: str,
     token: str = None,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    auth_service: AuthService = Depends(get_auth_service),
+    realtime_service: RealtimeService = Depends(get_realtime_service)
 ):
     """WebSocket端点，用于实时聊天"""
     # 验证用户身份
@@ -28,8 +32,6 @@ async def websocket_endpoint(
 
     try:
         # 使用Supabase验证令牌
-        from ...services.auth_service import AuthService
-        auth_service = AuthService()
         # 添加refresh_token参数，暂时使用空字符串
         supabase_user = auth_service.get_current_user(access_token=token, refresh_token="")
 
@@ -58,5 +60,6 @@ async def websocket_endpoint(
             # 客户端断开连接
             realtime_service.disconnect(websocket, chat_id)
     except Exception as e:
-        print(f"WebSocket连接错误: {str(e)}")
+        logger.exception("WebSocket连接错误")
+        realtime_service.disconnect(websocket, chat_id)
         await websocket.close(code=4000, reason="连接错误")
@@ -19,6 +19,42 @@ class Settings:
 
     # 应用配置
     DEBUG: bool = config("DEBUG", default=True, cast=bool)
+    # 是否提供Prometheus格式的/metrics端点（应只对内网开放）
+    METRICS_ENABLED: bool = config("METRICS_ENABLED", default=True, cast=bool)
+    # 日志：级别、格式（json或text）、队列长度（队列满时丢弃），DEBUG日志同一位置每N条保留1条
+    LOG_LEVEL: str = config("LOG_LEVEL", default="INFO")
+    LOG_FORMAT: str = config("LOG_FORMAT", default="json")
+    LOG_QUEUE_SIZE: int = config("LOG_QUEUE_SIZE", default=10000, cast=int)
+    LOG_DEBUG_SAMPLE_EVERY: int = config("LOG_DEBUG_SAMPLE_EVERY", default=100, cast=int)
+    # 管理接口令牌（请求头X-Admin-Token），为空时不开放管理接口
+    ADMIN_TOKEN: str = config("ADMIN_TOKEN", default="")
+    # 采样分析：默认采样间隔（毫秒）和单次最长采样时间（秒）
+    PROFILER_INTERVAL_MS: float = config("PROFILER_INTERVAL_MS", default=10.0, cast=float)
+    PROFILER_MAX_DURATION_SECONDS: int = config("PROFILER_MAX_DURATION_SECONDS", default=300, cast=int)
+    # 慢请求记录：耗时超过阈值（毫秒，0表示关闭）的请求保存各阶段耗时，最多保留最近的若干条
+    SLOW_REQUEST_THRESHOLD_MS: float = config("SLOW_REQUEST_THRESHOLD_MS", default=2000.0, cast=float)
+    SLOW_REQUEST_CAPTURE_LIMIT: int = config("SLOW_REQUEST_CAPTURE_LIMIT", default=100, cast=int)
+    # 分布式追踪：none（关闭）、memory（保存在进程内，可通过管理接口查看）、otel（转发给OpenTelemetry SDK，需安装opentelemetry-api）
+    TRACING_BACKEND: str = config("TRACING_BACKEND", default="none")
+    TRACING_MEMORY_MAX_SPANS: int = config("TRACING_MEMORY_MAX_SPANS", default=10000, cast=int)
+
+    # 大模型token配额：每个用户在滑动窗口（秒）内可使用的token数，访客更少；每个进程单独计算
+    LLM_QUOTA_ENABLED: bool = config("LLM_QUOTA_ENABLED", default=True, cast=bool)
+    LLM_QUOTA_WINDOW_SECONDS: int = config("LLM_QUOTA_WINDOW_SECONDS", default=3600, cast=int)
+    LLM_QUOTA_TOKENS: int = config("LLM_QUOTA_TOKENS", default=200000, cast=int)
+    LLM_QUOTA_GUEST_TOKENS: int = config("LLM_QUOTA_GUEST_TOKENS", default=20000, cast=int)
+    # token用量写入数据库的间隔（秒）
+    TOKEN_USAGE_FLUSH_INTERVAL_SECONDS: float = config("TOKEN_USAGE_FLUSH_INTERVAL_SECONDS", default=30.0, cast=float)
+
+    # 统计事件配置
+    ANALYTICS_ENABLED: bool = config("ANALYTICS_ENABLED", default=True, cast=bool)
+    # 进程内事件缓冲区容量，写入跟不上时丢弃最早的事件
+    ANALYTICS_BUFFER_SIZE: int = config("ANALYTICS_BUFFER_SIZE", default=50000, cast=int)
+    # 缓冲区写入数据库的间隔（秒）及每批条数
+    ANALYTICS_FLUSH_INTERVAL_SECONDS: float = config("ANALYTICS_FLUSH_INTERVAL_SECONDS", default=2.0, cast=float)
+    ANALYTICS_FLUSH_BATCH: int = config("ANALYTICS_FLUSH_BATCH", default=1000, cast=int)
+    # 汇总到每小时、每日统计表的间隔（秒）
+    ANALYTICS_ROLLUP_INTERVAL_SECONDS: int = config("ANALYTICS_ROLLUP_INTERVAL_SECONDS", default=60, cast=int)
 
     # 项目信息
     PROJECT_NAME: str = "Trip Master API"
@@ -27,12 +63,136 @@ class Settings:
     # AI服务配置
     AI_MODEL: str = config("AI_MODEL", default="glm-4")
     AI_API_KEY: str = config("AI_API_KEY", default="")
+    # 智谱GLM接口地址（OpenAI兼容），基准测试时可指向本地模拟服务
+    AI_API_BASE_URL: str = config("AI_API_BASE_URL", default="https://open.bigmodel.cn/api/paas/v4")
+    # 在指标中单独统计的其他模型名（逗号分隔），AI_MODEL总是单独统计，其余模型归为other，避免客户端传入任意模型名撑大标签数
+    LLM_METRIC_MODELS: str = config("LLM_METRIC_MODELS", default="deepseek-chat")
+    # 调用大模型接口的共享连接池大小（每个进程）
+    LLM_MAX_CONNECTIONS: int = config("LLM_MAX_CONNECTIONS", default=100, cast=int)
     SYSTEM_PROMPT: str = config("SYSTEM_PROMPT", default="你是一个旅行规划师，帮助用户制定个性化的旅行计划。")
+    # 要求AI在回复中附带结构化行程，流式回复时边生成边解析并推送地点
+    CHAT_ITINERARY_ENABLED: bool = config("CHAT_ITINERARY_ENABLED", default=True, cast=bool)
+    ITINERARY_PROMPT: str = config(
+        "ITINERARY_PROMPT",
+        default=(
+            "当回复包含具体的行程安排时，先输出一个```itinerary代码块，内容为JSON数组，"
+            "按游览顺序每个地点一个对象：{\"day\": 第几天, \"time\": \"HH:MM\", \"name\": \"地点名称\", "
+            "\"city\": \"所在城市\", \"duration_minutes\": 游览时长, \"note\": \"一句话说明\"}，"
+            "代码块中不要有注释；然后再用文字详细说明行程。"
+        )
+    )
+    # 行程地点攒够该数量或等待超过该时长（毫秒）后批量匹配兴趣点
+    ITINERARY_RESOLVE_BATCH: int = config("ITINERARY_RESOLVE_BATCH", default=5, cast=int)
+    ITINERARY_RESOLVE_WAIT_MS: int = config("ITINERARY_RESOLVE_WAIT_MS", default=300, cast=int)
     
     
+    # 高德地图Web服务API配置
+    AMAP_API_KEY: str = config("AMAP_API_KEY", default="")
+    AMAP_BASE_URL: str = config("AMAP_BASE_URL", default="https://restapi.amap.com")
+    # 每个进程的请求速率（次/秒）及突发上限，多进程部署时按进程数分摊配额
+    AMAP_QPS: float = config("AMAP_QPS", default=20.0, cast=float)
+    AMAP_BURST: int = config("AMAP_BURST", default=20, cast=int)
+    AMAP_MAX_CONNECTIONS: int = config("AMAP_MAX_CONNECTIONS", default=20, cast=int)
+    # 查询结果缓存：内存条目数、持久化有效期（秒）
+    AMAP_MEMORY_CACHE_ITEMS: int = config("AMAP_MEMORY_CACHE_ITEMS", default=10000, cast=int)
+    AMAP_CACHE_TTL_SECONDS: int = config("AMAP_CACHE_TTL_SECONDS", default=7 * 24 * 3600, cast=int)
+
+    # 兴趣点空间查询配置
+    # 进程内缓存的热点区域（约4.9km见方）数量及有效期（秒）
+    MAP_HOT_REGIONS: int = config("MAP_HOT_REGIONS", default=64, cast=int)
+    MAP_HOT_REGION_TTL_SECONDS: int = config("MAP_HOT_REGION_TTL_SECONDS", default=300, cast=int)
+    # 单次查询覆盖的区域数超过该值时直接查询数据库
+    MAP_HOT_MAX_REGIONS_PER_QUERY: int = config("MAP_HOT_MAX_REGIONS_PER_QUERY", default=12, cast=int)
+    # 大范围查询最多返回的候选兴趣点数
+    MAP_MAX_CANDIDATES: int = config("MAP_MAX_CANDIDATES", default=2000, cast=int)
+    # 距离矩阵：进程内缓存的点对数量，单次矩阵最多点数
+    MAP_PAIR_CACHE_ITEMS: int = config("MAP_PAIR_CACHE_ITEMS", default=100000, cast=int)
+    MAP_MATRIX_MAX_POINTS: int = config("MAP_MATRIX_MAX_POINTS", default=100, cast=int)
+
+    # 静态地图代理配置
+    # 图片磁盘缓存目录及容量上限（MB）
+    STATIC_MAP_CACHE_DIR: str = config("STATIC_MAP_CACHE_DIR", default="cache/staticmap")
+    STATIC_MAP_CACHE_MAX_MB: int = config("STATIC_MAP_CACHE_MAX_MB", default=512, cast=int)
+    # 客户端缓存有效期（秒），相同参数的图片内容不变
+    STATIC_MAP_MAX_AGE_SECONDS: int = config("STATIC_MAP_MAX_AGE_SECONDS", default=7 * 24 * 3600, cast=int)
+    # 设置后通过Nginx的X-Accel-Redirect发送文件（值为映射到缓存目录的internal location，如 /_staticmap/）
+    STATIC_MAP_ACCEL_PREFIX: str = config("STATIC_MAP_ACCEL_PREFIX", default="")
+
+    # 兴趣点名称联想配置
+    # 内存索引中的热门兴趣点数量（按评分）及索引有效期（秒）
+    AUTOCOMPLETE_HOT_POIS: int = config("AUTOCOMPLETE_HOT_POIS", default=20000, cast=int)
+    AUTOCOMPLETE_INDEX_TTL_SECONDS: int = config("AUTOCOMPLETE_INDEX_TTL_SECONDS", default=600, cast=int)
+    # 匹配过多时，参与距离排序的候选兴趣点数（按评分保留）
+    AUTOCOMPLETE_MAX_CANDIDATES: int = config("AUTOCOMPLETE_MAX_CANDIDATES", default=500, cast=int)
+    # 内存索引结果不足时，查询至少有这么多字符才查数据库
+    AUTOCOMPLETE_DB_MIN_CHARS: int = config("AUTOCOMPLETE_DB_MIN_CHARS", default=2, cast=int)
+    # 距地图中心该距离（米）时距离得分减半
+    AUTOCOMPLETE_DISTANCE_SCALE_M: float = config("AUTOCOMPLETE_DISTANCE_SCALE_M", default=5000.0, cast=float)
+    # 启动时是否在后台预先构建联想索引
+    AUTOCOMPLETE_WARMUP: bool = config("AUTOCOMPLETE_WARMUP", default=True, cast=bool)
+
+    # 兴趣点批量导入配置
+    # 每次提交的记录数
+    POI_IMPORT_CHUNK_SIZE: int = config("POI_IMPORT_CHUNK_SIZE", default=5000, cast=int)
+    # 同名兴趣点相距不超过该距离（米）时视为重复
+    POI_IMPORT_DEDUP_RADIUS_M: float = config("POI_IMPORT_DEDUP_RADIUS_M", default=50.0, cast=float)
+
+    # 行程优化配置
+    # 每日途经点不超过该数量时用动态规划求精确解
+    TRIP_OPT_EXACT_MAX_STOPS: int = config("TRIP_OPT_EXACT_MAX_STOPS", default=12, cast=int)
+    # 单次优化请求的响应时间预算（毫秒）
+    TRIP_OPT_LATENCY_MS: int = config("TRIP_OPT_LATENCY_MS", default=2000, cast=int)
+    # 优化计算进程池大小
+    TRIP_OPT_WORKERS: int = config("TRIP_OPT_WORKERS", default=2, cast=int)
+
+    # 预算配置
+    # 汇率表的基准币种，及汇率表中没有的币种的默认汇率（1单位折合基准币种）
+    CURRENCY_BASE: str = config("CURRENCY_BASE", default="CNY")
+    CURRENCY_DEFAULT_RATES: str = config(
+        "CURRENCY_DEFAULT_RATES",
+        default="CNY:1,USD:7.1,EUR:7.7,GBP:9.0,JPY:0.048,HKD:0.91,KRW:0.0052,THB:0.2,SGD:5.3"
+    )
+    # 进程内汇率缓存有效期（秒）
+    CURRENCY_RATE_TTL_SECONDS: int = config("CURRENCY_RATE_TTL_SECONDS", default=3600, cast=int)
+    # 自驾交通费（基准币种/公里），按整车计算；步行不计交通费
+    TRIP_DRIVING_COST_PER_KM: float = config("TRIP_DRIVING_COST_PER_KM", default=1.0, cast=float)
+    # 比较预算方案时最多的方案数
+    BUDGET_MAX_ALTERNATIVES: int = config("BUDGET_MAX_ALTERNATIVES", default=200, cast=int)
+
     # 科大讯飞语音识别API配置
     XUNFEI_APP_ID: str = config("XUNFEI_APP_ID", default="")
     XUNFEI_API_KEY: str = config("XUNFEI_API_KEY", default="")
     XUNFEI_API_SECRET: str = config("XUNFEI_API_SECRET", default="")
+    # 语音听写和语音合成WebSocket接口地址，基准测试时可指向本地模拟服务
+    XUNFEI_IAT_URL: str = config("XUNFEI_IAT_URL", default="wss://iat-api.xfyun.cn/v2/iat")
+    XUNFEI_TTS_URL: str = config("XUNFEI_TTS_URL", default="wss://tts-api.xfyun.cn/v2/tts")
+    # 语音识别上传文件大小上限（MB）
+    SPEECH_MAX_UPLOAD_MB: int = config("SPEECH_MAX_UPLOAD_MB", default=10, cast=int)
+    # 启动时是否在后台预加载并预热音频处理依赖（numpy、librosa等），默认按需加载
+    SPEECH_WARMUP: bool = config("SPEECH_WARMUP", default=False, cast=bool)
+
+    # 语音端点检测配置，识别前去除首尾静音
+    SPEECH_VAD_ENABLED: bool = config("SPEECH_VAD_ENABLED", default=True, cast=bool)
+    # 帧能量（16位PCM均方根）的绝对下限，以及相对底噪的倍数
+    SPEECH_VAD_MIN_ENERGY: float = config("SPEECH_VAD_MIN_ENERGY", default=200.0, cast=float)
+    SPEECH_VAD_ENERGY_RATIO: float = config("SPEECH_VAD_ENERGY_RATIO", default=3.0, cast=float)
+    # 语句间静音超过该时长才切分（毫秒）
+    SPEECH_VAD_MIN_SILENCE_MS: int = config("SPEECH_VAD_MIN_SILENCE_MS", default=700, cast=int)
+    # 去除静音后超过该时长的录音按语句切分并并行识别
+    SPEECH_VAD_SPLIT: bool = config("SPEECH_VAD_SPLIT", default=True, cast=bool)
+    SPEECH_VAD_SPLIT_MIN_SECONDS: int = config("SPEECH_VAD_SPLIT_MIN_SECONDS", default=15, cast=int)
+    # 长录音切分后每段的目标时长（秒，不超过55），强制切分处的重叠时长（毫秒）
+    SPEECH_SEGMENT_SECONDS: int = config("SPEECH_SEGMENT_SECONDS", default=15, cast=int)
+    SPEECH_SEGMENT_OVERLAP_MS: int = config("SPEECH_SEGMENT_OVERLAP_MS", default=400, cast=int)
+    # 每个进程同时打开的科大讯飞识别会话数上限
+    SPEECH_MAX_CONCURRENT_SESSIONS: int = config("SPEECH_MAX_CONCURRENT_SESSIONS", default=8, cast=int)
+
+    # 科大讯飞语音合成配置
+    TTS_VOICE: str = config("TTS_VOICE", default="xiaoyan")
+    TTS_SPEED: int = config("TTS_SPEED", default=50, cast=int)
+    # 合成音频缓存：磁盘目录及大小上限、进程内存缓存大小上限（MB）
+    TTS_CACHE_DIR: str = config("TTS_CACHE_DIR", default="cache/tts")
+    TTS_CACHE_MAX_MB: int = config("TTS_CACHE_MAX_MB", default=256, cast=int)
+    TTS_MEMORY_CACHE_MB: int = config("TTS_MEMORY_CACHE_MB", default=32, cast=int)
 
 settings = Settings()
@@ -0,0 +1,159 @@
+"""
+应用级共享资源容器
+
+数据库引擎、Supabase客户端、认证和实时服务、HTTP连接池、缓存、进程池和后台任务
+在应用启动时（main.py的lifespan）创建一次，关闭时按相反顺序释放。
+未经lifespan使用时（脚本、测试），各组件在首次使用时创建。
+"""
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from .config import settings
+from .database import dispose_engine, get_engine, get_supabase
+from .profiler import sampler
+from ..services.amap_client import AMapClient
+from ..services.analytics_service import AnalyticsService, RealtimeService
+from ..services.auth_service import AuthService
+from ..services.map_service import MapService
+from ..services.speech_service import SpeechService
+from ..services.static_map_service import StaticMapService
+from ..services.token_usage_service import TokenUsageService
+from ..services.trip_service import TripService
+
+logger = logging.getLogger(__name__)
+
+
+class AppContainer:
+    """应用级共享资源，每个进程一个实例"""
+
+    def __init__(self):
+        self._auth_service: Optional[AuthService] = None
+        self._realtime_service: Optional[RealtimeService] = None
+        self._llm_client: Optional[httpx.AsyncClient] = None
+        self._lock = threading.Lock()
+        # 后台预热任务：名称 -> Future
+        self.warmups: Dict[str, "asyncio.Future[Any]"] = {}
+        # 最近一次启动时各组件的初始化耗时（秒）
+        self.init_seconds: Dict[str, float] = {}
+
+    @property
+    def auth_service(self) -> AuthService:
+        """共享的认证服务"""
+        if self._auth_service is None:
+            with self._lock:
+                if self._auth_service is None:
+                    self._auth_service = AuthService()
+        return self._auth_service
+
+    @property
+    def realtime_service(self) -> RealtimeService:
+        """共享的实时服务，WebSocket连接和消息广播使用同一个实例"""
+        if self._realtime_service is None:
+            with self._lock:
+                if self._realtime_service is None:
+                    self._realtime_service = RealtimeService()
+        return self._realtime_service
+
+    @property
+    def llm_client(self) -> httpx.AsyncClient:
+        """调用大模型接口的共享HTTP连接池"""
+        if self._llm_client is None:
+            self._llm_client = httpx.AsyncClient(
+                timeout=60.0,
+                limits=httpx.Limits(
+                    max_connections=settings.LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.LLM_MAX_CONNECTIONS
+                )
+            )
+        return self._llm_client
+
+    def _components(self) -> List[Tuple[str, Callable[[], Any]]]:
+        """按启动顺序排列的组件及其初始化函数"""
+        return [
+            ("database", get_engine),
+            ("supabase", _optional_supabase),
+            ("auth_service", lambda: self.auth_service),
+            ("realtime_service", lambda: self.realtime_service),
+            ("llm_client", lambda: self.llm_client),
+            ("amap_client", AMapClient.http_client),
+            ("tts_cache", SpeechService._tts_caches),
+            ("static_map_cache", StaticMapService.cache),
+            ("trip_executor", TripService.executor),
+            ("analytics", AnalyticsService.start),
+            ("token_usage", TokenUsageService.start),
+        ]
+
+    async def start(self) -> Dict[str, float]:
+        """
+        创建所有组件并按配置在后台预热音频处理依赖和兴趣点联想索引
+        :return: 各组件的初始化耗时（秒）
+        """
+        self.init_seconds = {}
+        for name, create in self._components():
+            started = time.perf_counter()
+            create()
+            self.init_seconds[name] = time.perf_counter() - started
+        logger.info(
+            "组件初始化耗时: " + ", ".join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in self.init_seconds.items())
+        )
+
+        # 预热在线程池中执行，不阻塞服务开始接受请求
+        loop = asyncio.get_running_loop()
+        if settings.SPEECH_WARMUP:
+            self.warmups["speech"] = loop.run_in_executor(None, SpeechService.warm_up)
+        if settings.AUTOCOMPLETE_WARMUP:
+            self.warmups["autocomplete"] = loop.run_in_executor(None, MapService.warm_autocomplete)
+        return self.init_seconds
+
+    async def stop(self) -> None:
+        """
+        写入剩余的token用量和统计事件，关闭共享的HTTP连接池和行程优化进程池，停止采样分析，释放数据库连接。
+        单个组件关闭失败不影响其他组件
+        """
+        steps: List[Tuple[str, Callable[[], Any]]] = [
+            ("token_usage", TokenUsageService.stop),
+            ("analytics", AnalyticsService.stop),
+            ("llm_client", self._close_llm_client),
+            ("amap_client", AMapClient.close),
+            ("trip_executor", TripService.shutdown),
+            ("profiler", sampler.stop),
+            ("database", dispose_engine),
+        ]
+        for name, close in steps:
+            try:
+                result = close()
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception:
+                logger.exception("关闭组件 %s 失败", name)
+
+    async def _close_llm_client(self) -> None:
+        if self._llm_client is not None:
+            await self._llm_client.aclose()
+            self._llm_client = None
+
+
+def _optional_supabase() -> None:
+    """Supabase未配置或不可用时不影响启动，由依赖它的认证和实时服务记录警告"""
+    try:
+        get_supabase()
+    except Exception:
+        pass
+
+
+container = AppContainer()
+
+
+# 依赖函数：获取共享的服务实例
+
+def get_auth_service() -> AuthService:
+    return container.auth_service
+
+
+def get_realtime_service() -> RealtimeService:
+    return container.realtime_service
@@ -1,23 +1,135 @@
-from sqlalchemy import create_engine
+import logging
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from .config import settings
+from .metrics import DB_QUERY_DURATION
+from .profiler import add_span
+from . import tracing
 from supabase import create_client, Client
+from supabase.lib.client_options import ClientOptions
+
+logger = logging.getLogger(__name__)
+
+# 数据库引擎和Supabase客户端在首次使用时创建（通常由应用启动时的AppContainer触发），
+# 导入本模块不连接任何服务，未配置DATABASE_URL时也可以导入
+_engine: Optional[Engine] = None
+_supabase: Optional[Client] = None
+_supabase_created = False
+_lock = threading.Lock()
 
-# 创建Supabase客户端（仅在配置存在时）
-supabase: Client = None
-if settings.SUPABASE_URL and settings.SUPABASE_KEY:
+
+def _create_supabase() -> Optional[Client]:
+    """创建Supabase客户端（仅在配置存在时）"""
+    if not (settings.SUPABASE_URL and settings.SUPABASE_KEY):
+        return None
     try:
-        print(f"初始化Supabase客户端: {settings.SUPABASE_URL}")
-        supabase = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
-        print("Supabase客户端初始化成功")
+        # 服务端共用一个客户端、按请求设置用户令牌，不保存会话也不自动刷新令牌
+        # （自动刷新会为每个会话启动非守护的定时线程，导致进程退出时等待到令牌过期）
+        client = create_client(
+            settings.SUPABASE_URL,
+            settings.SUPABASE_KEY,
+            options=ClientOptions(auto_refresh_token=False, persist_session=False)
+        )
+        logger.info("Supabase客户端初始化成功: %s", settings.SUPABASE_URL)
+        return client
     except Exception as e:
-        print(f"创建Supabase客户端失败: {str(e)}")
-        supabase = None
+        logger.error("创建Supabase客户端失败: %s", e)
+        return None
+
+
+# 按语句类型统计的执行耗时指标
+_DB_OPERATIONS = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "COPY")
+
+
+def _operation(statement: str) -> str:
+    operation = statement.split(None, 1)[0].upper() if statement.strip() else ""
+    return operation if operation in _DB_OPERATIONS else "OTHER"
+
+
+def _query_started(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+    if tracing.enabled:
+        operation = _operation(statement)
+        conn.info.setdefault("query_spans", []).append(tracing.tracer.start_span(
+            f"db.{operation}",
+            {"db.system": conn.dialect.name, "db.operation": operation, "db.statement": statement[:500]},
+            kind=tracing.SPAN_KIND_CLIENT
+        ))
+
+
+def _query_finished(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    DB_QUERY_DURATION.labels(_operation(statement)).observe(elapsed)
+    add_span("db", elapsed)
+    if conn.info.get("query_spans"):
+        conn.info["query_spans"].pop().end()
+
+
+def _query_failed(context):
+    # 语句失败时不会触发after_cursor_execute，丢弃对应的开始时间和span
+    if context.connection is None:
+        return
+    if context.connection.info.get("query_started"):
+        context.connection.info["query_started"].pop()
+    if context.connection.info.get("query_spans"):
+        query_span = context.connection.info["query_spans"].pop()
+        query_span.record_exception(context.original_exception)
+        query_span.end()
+
+
+def get_engine() -> Engine:
+    """获取SQLAlchemy引擎，首次调用时创建并注册语句耗时统计"""
+    global _engine
+    if _engine is None:
+        with _lock:
+            if _engine is None:
+                if not settings.DATABASE_URL:
+                    raise RuntimeError("未配置DATABASE_URL")
+                engine = create_engine(settings.DATABASE_URL)
+                event.listen(engine, "before_cursor_execute", _query_started)
+                event.listen(engine, "after_cursor_execute", _query_finished)
+                event.listen(engine, "handle_error", _query_failed)
+                _engine = engine
+    return _engine
+
+
+def dispose_engine(close: bool = True) -> None:
+    """
+    释放连接池中的连接
+    :param close: 为False时只丢弃连接而不关闭，用于fork出的子进程（连接属于父进程）
+    """
+    if _engine is not None:
+        _engine.dispose(close=close)
+
+
+class _Session(Session):
+    """未指定bind的会话在第一次执行语句时才获取引擎"""
+
+    def get_bind(self, *args, **kwargs):
+        if self.bind is None:
+            self.bind = get_engine()
+        return super().get_bind(*args, **kwargs)
+
+
+SessionLocal = sessionmaker(class_=_Session, autocommit=False, autoflush=False)
+
 
-# 保留SQLAlchemy引擎和会话
-engine = create_engine(settings.DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def upsert(db: Session, model):
+    """
+    按会话的数据库方言创建支持ON CONFLICT的insert语句（生产使用PostgreSQL，基准测试可使用SQLite）
+    :param model: 模型类或表
+    :return: 可调用on_conflict_do_update/on_conflict_do_nothing的insert语句
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        return sqlite.insert(model)
+    return postgresql.insert(model)
 
 Base = declarative_base()
 
@@ -29,8 +141,14 @@ def get_db():
     finally:
         db.close()
 
-# 新增：获取Supabase客户端
-def get_supabase():
-    if supabase is None:
+# 新增：获取Supabase客户端，首次调用时创建，创建失败后不再重试
+def get_supabase() -> Client:
+    global _supabase, _supabase_created
+    if not _supabase_created:
+        with _lock:
+            if not _supabase_created:
+                _supabase = _create_supabase()
+                _supabase_created = True
+    if _supabase is None:
         raise Exception("Supabase客户端未初始化，请检查配置")
-    return supabase
+    return _supabase
@@ -12,7 +12,8 @@ async def trip_master_exception_handler(request: Request, exc: TripMasterExcepti
                 "code": exc.detail["code"],
                 "message": exc.detail["message"]
             }
-        }
+        },
+        headers=exc.headers
     )
 
 async def http_exception_handler(request: Request, exc: HTTPException):
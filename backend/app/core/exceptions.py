@@ -71,6 +71,16 @@ class GuestAccountException(AuthException):
             message=message
         )
 
+class QuotaExceededException(TripMasterException):
+    """用量超出配额异常"""
+    def __init__(self, message: str = "使用量已超出限额，请稍后再试", retry_after: int = 60):
+        super().__init__(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            code="QUOTA_EXCEEDED",
+            message=message,
+            headers={"Retry-After": str(retry_after)}
+        )
+
 class ValidationException(TripMasterException):
     """验证相关异常"""
     pass
@@ -132,3 +142,12 @@ class FileUploadException(ServerException):
             code="FILE_UPLOAD_ERROR",
             message=message
         )
+
+class ExternalServiceException(ServerException):
+    """第三方服务异常"""
+    def __init__(self, message: str = "第三方服务调用失败"):
+        super().__init__(
+            status_code=status.HTTP_502_BAD_GATEWAY,
+            code="EXTERNAL_SERVICE_ERROR",
+            message=message
+        )
@@ -0,0 +1,22 @@
+"""
+gunicorn使用的uvicorn worker，见backend/gunicorn.conf.py
+"""
+from uvicorn.workers import UvicornWorker as _UvicornWorker
+
+# 优雅退出时为应用关闭（写入剩余的token用量和统计事件、关闭连接池）预留的秒数
+LIFESPAN_SHUTDOWN_RESERVE_SECONDS = 5
+
+
+class UvicornWorker(_UvicornWorker):
+    """
+    在uvicorn自带worker的基础上限定优雅退出的等待时间：
+    收到退出信号（或达到max_requests）后停止接受新连接，等待进行中的请求（包括SSE流式回复）完成，
+    超过graceful_timeout减去预留时间后取消剩余请求，保证应用关闭在gunicorn强制结束进程前完成。
+    uvicorn会立即以1012（服务重启）关闭已建立的WebSocket连接，由客户端重连
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.config.timeout_graceful_shutdown = max(
+            1, self.cfg.graceful_timeout - LIFESPAN_SHUTDOWN_RESERVE_SECONDS
+        )
@@ -0,0 +1,168 @@
+import atexit
+import copy
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+
+from .config import settings
+from .metrics import LOG_RECORDS_DROPPED
+from .tracing import TraceContextFilter
+
+# 当前请求的ID，由RequestIdMiddleware设置
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+# LogRecord自带的属性，其余属性（通过extra传入）作为结构化字段输出
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "request_id", "trace_id", "span_id"}
+
+
+class RequestIdFilter(logging.Filter):
+    """为日志记录加上当前请求的ID，不在请求中时为“-”"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get() or "-"
+        return True
+
+
+class DebugSamplingFilter(logging.Filter):
+    """
+    高频DEBUG日志采样：同一调用位置的DEBUG日志每N条只保留1条，
+    INFO及以上级别不受影响
+    """
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(1, every)
+        self._counts: Dict[Tuple[str, int], int] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.every == 1:
+            return True
+        key = (record.pathname, record.lineno)
+        with self._lock:
+            count = self._counts.get(key, 0)
+            self._counts[key] = count + 1
+        return count % self.every == 0
+
+
+class JsonFormatter(logging.Formatter):
+    """每条日志输出为一行JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+        }
+        trace_id = getattr(record, "trace_id", "-")
+        if trace_id != "-":
+            entry["trace_id"] = trace_id
+            entry["span_id"] = record.span_id
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+_exception_formatter = logging.Formatter()
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    写入有界队列的日志处理器，调用方只负责格式化消息并入队，不等待输出；
+    队列满时丢弃日志并计数，日志量再大也不会阻塞请求
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # 只合并消息参数、提前格式化异常（异常对象不能跨线程保留），其余格式化交给输出线程
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        if record.exc_info:
+            record.exc_text = _exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+
+_listener: Optional[QueueListener] = None
+_handler: Optional[DroppingQueueHandler] = None
+
+
+def setup_logging() -> None:
+    """
+    配置根日志记录器：日志经有界队列交给后台线程输出到stderr，
+    LOG_FORMAT为json时输出结构化JSON，为text时输出原有的文本格式
+    """
+    global _listener, _handler
+    if _listener is not None:
+        return
+
+    if settings.LOG_FORMAT == "json":
+        formatter: logging.Formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(
+            "%(asctime)s - %(name)s - %(levelname)s - [request_id=%(request_id)s trace_id=%(trace_id)s] %(message)s"
+        )
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(formatter)
+
+    handler = _handler = DroppingQueueHandler(queue.Queue(settings.LOG_QUEUE_SIZE))
+    # 上下文相关的字段须在产生日志的线程中取值
+    handler.addFilter(DebugSamplingFilter(settings.LOG_DEBUG_SAMPLE_EVERY))
+    handler.addFilter(RequestIdFilter())
+    handler.addFilter(TraceContextFilter())
+
+    root = logging.getLogger()
+    # supabase依赖的realtime包在导入时已调用过basicConfig，替换掉它添加的处理器
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(settings.LOG_LEVEL.upper())
+
+    _listener = QueueListener(handler.queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def _restart_after_fork() -> None:
+    """
+    fork出的子进程（如gunicorn预加载应用后的worker）中没有输出线程，
+    换一个新队列（旧队列的锁可能在fork时被占用）并重新启动输出线程
+    """
+    global _listener
+    if _listener is None:
+        return
+    _handler.queue = queue.Queue(settings.LOG_QUEUE_SIZE)
+    _listener = QueueListener(_handler.queue, *_listener.handlers, respect_handler_level=True)
+    _listener.start()
+
+
+os.register_at_fork(after_in_child=_restart_after_fork)
+
+
+def shutdown_logging() -> None:
+    """输出队列中剩余的日志并停止后台线程"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,352 @@
+"""
+Prometheus文本格式的进程内指标
+
+热路径上不加锁：计数器和直方图的数值按线程分片累加，每个线程只写自己的分片，
+采集（/metrics）时再对所有分片求和。只有线程第一次写某个指标时才加锁登记分片。
+"""
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Prometheus文本格式的Content-Type（Response会补充charset=utf-8）
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+# 默认的耗时分桶（秒）
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _Shards:
+    """每个线程独立的累加数组，写入不加锁，读取时求和"""
+
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._shards: List[List[float]] = []
+        self._lock = threading.Lock()
+
+    def local(self) -> List[float]:
+        try:
+            return self._local.values
+        except AttributeError:
+            values = [0.0] * self._size
+            with self._lock:
+                self._shards.append(values)
+            self._local.values = values
+            return values
+
+    def total(self) -> List[float]:
+        with self._lock:
+            shards = list(self._shards)
+        totals = [0.0] * self._size
+        for values in shards:
+            for i, value in enumerate(values):
+                totals[i] += value
+        return totals
+
+
+class _Metric:
+    """带标签的指标，labels()返回的子指标会被缓存，热路径上应保存子指标直接使用"""
+
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lookup: Dict[Tuple[Any, ...], Any] = {}
+        self._lock = threading.Lock()
+        if not self.labelnames:
+            # 无标签的指标在没有数据时也导出0
+            self.labels()
+        REGISTRY.register(self)
+
+    def labels(self, *values: Any) -> Any:
+        # 先按原始标签值查找，避免每次都转换为字符串
+        child = self._lookup.get(values)
+        if child is not None:
+            return child
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"指标 {self.name} 需要标签: {', '.join(self.labelnames)}")
+        key = tuple(str(value) for value in values)
+        with self._lock:
+            child = self._children.get(key)
+            if child is None:
+                child = self._children[key] = self._new_child()
+            self._lookup[values] = child
+        return child
+
+    def _new_child(self) -> Any:
+        raise NotImplementedError
+
+    def _label_text(self, values: Tuple[str, ...], extra: Optional[Tuple[str, str]] = None) -> str:
+        pairs = list(zip(self.labelnames, values))
+        if extra is not None:
+            pairs.append(extra)
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+    def samples(self) -> Iterator[str]:
+        raise NotImplementedError
+
+
+class _ValueChild:
+    __slots__ = ("_shards", "_function")
+
+    def __init__(self):
+        self._shards = _Shards(1)
+        self._function: Optional[Callable[[], float]] = None
+
+    def inc(self, amount: float = 1) -> None:
+        self._shards.local()[0] += amount
+
+    def set_function(self, function: Callable[[], float]) -> None:
+        """采集时调用function取值，用于连接数、缓存命中数等已有的统计"""
+        self._function = function
+
+    def value(self) -> float:
+        if self._function is not None:
+            return float(self._function())
+        return self._shards.total()[0]
+
+
+class Counter(_Metric):
+    """只增不减的计数器，名称以_total结尾"""
+
+    kind = "counter"
+
+    def _new_child(self) -> _ValueChild:
+        return _ValueChild()
+
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+    def samples(self) -> Iterator[str]:
+        for values, child in list(self._children.items()):
+            yield f"{self.name}{self._label_text(values)} {_number(child.value())}"
+
+
+class _GaugeChild(_ValueChild):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1) -> None:
+        self._shards.local()[0] -= amount
+
+
+class Gauge(_Metric):
+    """可增可减的当前值"""
+
+    kind = "gauge"
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1) -> None:
+        self.labels().dec(amount)
+
+    def samples(self) -> Iterator[str]:
+        for values, child in list(self._children.items()):
+            yield f"{self.name}{self._label_text(values)} {_number(child.value())}"
+
+
+class _HistogramChild:
+    __slots__ = ("_bounds", "_shards")
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self._bounds = bounds
+        # 各分桶的计数（最后一个为+Inf）以及观测值之和
+        self._shards = _Shards(len(bounds) + 2)
+
+    def observe(self, value: float) -> None:
+        values = self._shards.local()
+        values[bisect.bisect_left(self._bounds, value)] += 1
+        values[-1] += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """记录with块的耗时（秒）"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    def snapshot(self) -> Tuple[List[float], float]:
+        totals = self._shards.total()
+        return totals[:-1], totals[-1]
+
+
+class Histogram(_Metric):
+    """分桶直方图，导出累计分桶计数、_sum和_count"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self._bounds = tuple(sorted(float(bound) for bound in buckets if bound != math.inf))
+        super().__init__(name, documentation, labelnames)
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self._bounds)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def time(self):
+        return self.labels().time()
+
+    def samples(self) -> Iterator[str]:
+        for values, child in list(self._children.items()):
+            counts, total = child.snapshot()
+            cumulative = 0.0
+            for bound, count in zip(self._bounds + (math.inf,), counts):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else _number(bound)
+                yield f"{self.name}_bucket{self._label_text(values, ('le', le))} {_number(cumulative)}"
+            yield f"{self.name}_sum{self._label_text(values)} {_number(total)}"
+            yield f"{self.name}_count{self._label_text(values)} {_number(cumulative)}"
+
+
+class Registry:
+    """指标登记表，采集时按登记顺序输出"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> None:
+        with self._lock:
+            self._metrics.append(metric)
+
+    def render(self) -> str:
+        """Prometheus文本格式"""
+        lines: List[str] = []
+        for metric in list(self._metrics):
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == int(value) and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+# ---- 应用指标 ----
+
+HTTP_REQUEST_DURATION = Histogram(
+    "trip_master_http_request_duration_seconds",
+    "HTTP请求耗时（流式响应到最后一个数据块发送完）",
+    ("method", "route", "status")
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "trip_master_http_requests_in_progress",
+    "正在处理的HTTP请求数"
+)
+
+LLM_TIME_TO_FIRST_TOKEN = Histogram(
+    "trip_master_llm_time_to_first_token_seconds",
+    "流式大模型请求发出到收到第一个内容片段的耗时",
+    ("model",),
+    buckets=(0.1, 0.25, 0.5, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0, 20.0)
+)
+LLM_TOKENS_PER_SECOND = Histogram(
+    "trip_master_llm_tokens_per_second",
+    "流式大模型首个片段之后的生成速度",
+    ("model",),
+    buckets=(5, 10, 20, 30, 50, 75, 100, 150, 200)
+)
+LLM_TOKENS = Counter(
+    "trip_master_llm_completion_tokens_total",
+    "流式大模型生成的token数，接口未返回用量时按内容片段数计",
+    ("model",)
+)
+LLM_ERRORS = Counter(
+    "trip_master_llm_errors_total",
+    "流式大模型请求失败次数",
+    ("model",)
+)
+
+ASR_STAGE_DURATION = Histogram(
+    "trip_master_asr_stage_duration_seconds",
+    "语音识别各阶段耗时：decode解码、vad分段、recognize识别、total总计",
+    ("stage",)
+)
+
+DB_QUERY_DURATION = Histogram(
+    "trip_master_db_query_duration_seconds",
+    "数据库语句执行耗时，按语句类型统计（_count即语句数）",
+    ("operation",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0)
+)
+
+WEBSOCKET_CONNECTIONS = Gauge(
+    "trip_master_websocket_connections",
+    "当前的实时聊天WebSocket连接数"
+)
+WEBSOCKET_CONNECTIONS_OPENED = Counter(
+    "trip_master_websocket_connections_opened_total",
+    "累计建立的实时聊天WebSocket连接数"
+)
+
+ANALYTICS_EVENTS_DROPPED = Counter(
+    "trip_master_analytics_events_dropped_total",
+    "缓冲区已满或写入失败而丢弃的统计事件数"
+)
+ANALYTICS_EVENTS_BUFFERED = Gauge(
+    "trip_master_analytics_events_buffered",
+    "等待写入数据库的统计事件数"
+)
+
+LOG_RECORDS_DROPPED = Counter("trip_master_log_records_dropped_total", "日志队列已满而丢弃的日志条数")
+
+CACHE_HITS = Counter("trip_master_cache_hits_total", "缓存命中次数", ("cache",))
+CACHE_MISSES = Counter("trip_master_cache_misses_total", "缓存未命中次数", ("cache",))
+CACHE_ENTRIES = Gauge("trip_master_cache_entries", "进程内缓存的条目数", ("cache",))
+
+# 登记的缓存：名称 -> 缓存对象（LRUCache或DiskCache），同名缓存重建时替换
+_caches: Dict[str, Any] = {}
+# 已替换掉的同名缓存的命中/未命中数，保证导出的计数器不减少
+_retired_counts: Dict[str, List[int]] = {}
+
+
+def register_cache(name: str, cache: Any) -> None:
+    """登记带hits/misses计数的缓存，采集时导出命中和未命中次数"""
+    previous = _caches.get(name)
+    if previous is None:
+        CACHE_HITS.labels(name).set_function(lambda: _retired_counts.get(name, (0, 0))[0] + _caches[name].hits)
+        CACHE_MISSES.labels(name).set_function(lambda: _retired_counts.get(name, (0, 0))[1] + _caches[name].misses)
+        if hasattr(cache, "__len__"):
+            CACHE_ENTRIES.labels(name).set_function(lambda: len(_caches[name]))
+    elif previous is not cache:
+        retired = _retired_counts.setdefault(name, [0, 0])
+        retired[0] += previous.hits
+        retired[1] += previous.misses
+    _caches[name] = cache
+
+
+def render() -> str:
+    return REGISTRY.render()
@@ -0,0 +1,249 @@
+import os
+import sys
+import threading
+import time
+import logging
+from collections import Counter, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+# 采样时栈顶位于这些模块表示线程空闲（等待锁、队列或事件循环select），默认不计入
+_IDLE_MODULES = ("threading.py", "selectors.py", "queue.py")
+# 单个栈最多保留的帧数，以及最多保留的不同栈数量，防止长时间采样占用过多内存
+MAX_STACK_DEPTH = 128
+MAX_DISTINCT_STACKS = 20000
+
+
+def _frame_label(code) -> str:
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class SamplingProfiler:
+    """
+    定时采样的栈分析器：后台线程按固定间隔读取所有线程的Python调用栈，
+    按折叠栈格式（flamegraph.pl / speedscope可直接读取）累计采样次数。
+    只在当前工作进程内生效，未开启时没有任何开销
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._stacks: Counter = Counter()
+        self._labels: Dict[Any, str] = {}
+        self.samples = 0
+        self.interval = 0.0
+        self.include_idle = False
+        self.started_at: Optional[datetime] = None
+        self.stopped_at: Optional[datetime] = None
+        self.deadline: Optional[float] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, interval: float, duration: float, include_idle: bool = False) -> None:
+        """
+        开始采样，已在运行时抛出ValueError
+        :param interval: 采样间隔（秒）
+        :param duration: 最长采样时间（秒），到期自动停止
+        :param include_idle: 是否计入空闲线程的采样
+        """
+        with self._lock:
+            if self.running:
+                raise ValueError("采样分析已在运行")
+            self._stacks = Counter()
+            self._labels = {}
+            self.samples = 0
+            self.interval = interval
+            self.include_idle = include_idle
+            self.started_at = datetime.now(timezone.utc)
+            self.stopped_at = None
+            self.deadline = time.monotonic() + duration
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+            self._thread.start()
+        logger.info(f"采样分析已开始，间隔 {interval * 1000:.1f}ms，最长 {duration:.0f}s")
+
+    def stop(self) -> None:
+        """停止采样，保留已采集的结果"""
+        thread = self._thread
+        if thread is None:
+            return
+        self._stop_event.set()
+        if thread is not threading.current_thread():
+            thread.join()
+        logger.info(f"采样分析已停止，共 {self.samples} 次采样")
+
+    def collapsed(self) -> str:
+        """折叠栈格式的结果：每行为“线程;外层帧;...;内层帧 采样次数”"""
+        with self._lock:
+            stacks = list(self._stacks.items())
+        stacks.sort(key=lambda item: -item[1])
+        return "".join(f"{stack} {count}\n" for stack, count in stacks)
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "pid": os.getpid(),
+            "running": self.running,
+            "interval_ms": self.interval * 1000,
+            "include_idle": self.include_idle,
+            "samples": self.samples,
+            "distinct_stacks": len(self._stacks),
+            "started_at": self.started_at,
+            "stopped_at": self.stopped_at,
+        }
+
+    def _run(self) -> None:
+        own_ident = threading.get_ident()
+        try:
+            while not self._stop_event.wait(self.interval):
+                if time.monotonic() >= self.deadline:
+                    break
+                self._sample(own_ident)
+        finally:
+            self.stopped_at = datetime.now(timezone.utc)
+
+    def _sample(self, own_ident: int) -> None:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        labels = self._labels
+        samples = []
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            code = frame.f_code
+            if not self.include_idle and code.co_filename.endswith(_IDLE_MODULES):
+                continue
+            frames = []
+            while frame is not None and len(frames) < MAX_STACK_DEPTH:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = _frame_label(code)
+                frames.append(label)
+                frame = frame.f_back
+            frames.append(names.get(ident, "thread"))
+            frames.reverse()
+            samples.append(";".join(frames))
+
+        with self._lock:
+            self.samples += 1
+            for stack in samples:
+                if stack not in self._stacks and len(self._stacks) >= MAX_DISTINCT_STACKS:
+                    stack = "[truncated]"
+                self._stacks[stack] += 1
+
+
+# 当前进程的采样分析器
+sampler = SamplingProfiler()
+
+
+class RequestTimings:
+    """一次请求内各阶段（鉴权、数据库、大模型、语音识别等）的累计耗时"""
+
+    __slots__ = ("spans",)
+
+    def __init__(self):
+        # 阶段路径（嵌套阶段按外层到内层排列） -> [累计秒数, 次数]
+        self.spans: Dict[Tuple[str, ...], List[float]] = {}
+
+    def add(self, path: Tuple[str, ...], seconds: float) -> None:
+        entry = self.spans.get(path)
+        if entry is None:
+            self.spans[path] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+
+_request_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+_span_path: ContextVar[Tuple[str, ...]] = ContextVar("span_path", default=())
+
+# 最近的慢请求记录
+_slow_requests: Deque[Dict[str, Any]] = deque(maxlen=settings.SLOW_REQUEST_CAPTURE_LIMIT)
+
+
+def begin_request() -> RequestTimings:
+    """开始记录当前请求的阶段耗时"""
+    timings = RequestTimings()
+    _request_timings.set(timings)
+    _span_path.set(())
+    return timings
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """
+    记录一个阶段的耗时，不在请求内时不做任何事；
+    阶段可以嵌套，并发执行的阶段（如分段识别）各自计时
+    """
+    timings = _request_timings.get()
+    if timings is None:
+        yield
+        return
+    path = _span_path.get() + (name,)
+    token = _span_path.set(path)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(path, time.perf_counter() - started)
+        _span_path.reset(token)
+
+
+def add_span(name: str, seconds: float) -> None:
+    """记录一个已经计时完成的阶段（如数据库事件回调中测得的语句耗时）"""
+    timings = _request_timings.get()
+    if timings is not None:
+        timings.add(_span_path.get() + (name,), seconds)
+
+
+def finish_request(timings: RequestTimings, method: str, route: str, status_code: int, seconds: float) -> None:
+    """请求结束时调用，耗时超过阈值则保存各阶段耗时"""
+    if seconds * 1000 < settings.SLOW_REQUEST_THRESHOLD_MS:
+        return
+    spans = [
+        {"name": ";".join(path), "ms": round(total * 1000, 3), "count": count}
+        for path, (total, count) in timings.spans.items()
+    ]
+    _slow_requests.append({
+        "method": method,
+        "route": route,
+        "status": status_code,
+        "duration_ms": round(seconds * 1000, 3),
+        "finished_at": datetime.now(timezone.utc),
+        "spans": spans,
+    })
+    top = sorted((s for s in spans if ";" not in s["name"]), key=lambda s: -s["ms"])[:3]
+    summary = "，".join(f"{s['name']} {s['ms']:.0f}ms×{s['count']}" for s in top) or "无阶段记录"
+    logger.warning(f"慢请求 {method} {route} {status_code} 耗时 {seconds * 1000:.0f}ms（{summary}）")
+
+
+def slow_requests() -> List[Dict[str, Any]]:
+    """最近的慢请求，最新的在前"""
+    return list(reversed(_slow_requests))
+
+
+def slow_requests_collapsed() -> str:
+    """
+    慢请求各阶段耗时的折叠栈格式（单位微秒），根帧为“方法 路由”，
+    每个阶段只计自身耗时（减去嵌套阶段），未记录到任何阶段的耗时计入根帧
+    """
+    totals: Counter = Counter()
+    for request in list(_slow_requests):
+        root = f"{request['method']} {request['route']}"
+        spans = {tuple(s["name"].split(";")): s["ms"] for s in request["spans"]}
+        children: Counter = Counter()
+        for path, ms in spans.items():
+            children[path[:-1]] += ms
+        # 并发的子阶段之和可能超过外层耗时，此时自身耗时按0计
+        totals[root] += max(0.0, request["duration_ms"] - children[()])
+        for path, ms in spans.items():
+            totals[f"{root};{';'.join(path)}"] += max(0.0, ms - children[path])
+    return "".join(f"{stack} {round(ms * 1000)}\n" for stack, ms in totals.items() if ms > 0)
@@ -0,0 +1,37 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .metrics_middleware import UNMATCHED_ROUTE
+from .profiler import begin_request, finish_request
+
+
+class SlowRequestMiddleware:
+    """
+    慢请求记录中间件（纯ASGI）：为每个请求记录各阶段耗时，
+    请求（含流式响应的发送）耗时超过阈值时保存，可在管理接口中查看
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        timings = begin_request()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+            finish_request(timings, scope["method"], route, status_code, time.perf_counter() - started)
@@ -1,18 +1,24 @@
+import logging
+import secrets
 from datetime import datetime, timedelta
 from typing import Optional
 from uuid import UUID
 
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from sqlalchemy.orm import Session
 
 from .config import settings
+from .container import get_auth_service
 from .database import get_db, get_supabase
+from .tracing import start_span
 from ..models.user import User
 from ..services.auth_service import AuthService
 
+logger = logging.getLogger(__name__)
+
 # OAuth2配置
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
@@ -92,7 +98,8 @@ def should_refresh_token(payload: dict) -> bool:
 
 async def get_current_user(
     token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    auth_service: AuthService = Depends(get_auth_service)
 ) -> User:
     """获取当前用户（使用Supabase Auth）"""
     credentials_exception = HTTPException(
@@ -101,30 +108,39 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    try:
-        # 使用Supabase验证令牌
-        auth_service = AuthService()
-        # 尝试从请求头中获取refresh_token
-        # 这里暂时使用空字符串，因为从请求中获取refresh_token需要额外的实现
-        supabase_user = auth_service.get_current_user(access_token=token, refresh_token="")
+    # Supabase令牌校验和用户查询计入慢请求的auth阶段
+    with start_span("get_current_user", {"auth.method": "supabase"}, stage="auth") as auth_span:
+        try:
+            # 使用Supabase验证令牌
+            # 尝试从请求头中获取refresh_token
+            # 这里暂时使用空字符串，因为从请求中获取refresh_token需要额外的实现
+            supabase_user = auth_service.get_current_user(access_token=token, refresh_token="")
         
-        if supabase_user is None:
-            raise credentials_exception
+            if supabase_user is None:
+                raise credentials_exception
         
-        # 从数据库获取用户
-        user_id = UUID(supabase_user["id"])
-        user = db.query(User).filter(User.id == user_id).first()
+            # 从数据库获取用户
+            user_id = UUID(supabase_user["id"])
+            user = db.query(User).filter(User.id == user_id).first()
         
-        if user is None:
-            # 如果用户不在本地数据库中，尝试同步
-            user = auth_service.sync_supabase_user_to_db(
-                db=db,
-                supabase_user_id=supabase_user["id"],
-                email=supabase_user["email"],
-                user_data=supabase_user["user_metadata"] or {}
-            )
+            if user is None:
+                # 如果用户不在本地数据库中，尝试同步
+                user = auth_service.sync_supabase_user_to_db(
+                    db=db,
+                    supabase_user_id=supabase_user["id"],
+                    email=supabase_user["email"],
+                    user_data=supabase_user["user_metadata"] or {}
+                )
         
-        return user
-    except Exception as e:
-        print(f"验证用户失败: {str(e)}")
-        raise credentials_exception
\ No newline at end of file
+            auth_span.set_attribute("enduser.id", str(user_id))
+            return user
+        except Exception as e:
+            logger.info("验证用户失败: %s", e)
+            raise credentials_exception
+
+def verify_admin_token(x_admin_token: Optional[str] = Header(None)) -> None:
+    """校验管理接口令牌，未配置ADMIN_TOKEN时管理接口不存在"""
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, settings.ADMIN_TOKEN):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="管理令牌无效")
@@ -1,29 +1,53 @@
-from typing import Callable
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
 from contextvars import ContextVar
+from typing import Dict, Optional
 import logging
 
-# 创建上下文变量来存储新令牌
-new_token_context: ContextVar = ContextVar('new_token')
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-class TokenRefreshMiddleware(BaseHTTPMiddleware):
-    """令牌刷新中间件，用于在响应中添加新的访问令牌"""
+logger = logging.getLogger(__name__)
 
-    async def dispatch(self, request: Request, call_next: Callable) -> Response:
-        # 处理请求
-        response = await call_next(request)
+# 当前请求的续期令牌容器，由中间件在请求开始时设置。
+# 依赖可能在复制的上下文中执行（如线程池），因此存放可变容器而不是令牌本身，
+# 在任何上下文中写入的令牌中间件都能读到
+new_token_context: ContextVar[Optional[Dict[str, str]]] = ContextVar("new_token", default=None)
+
+
+def set_new_token(token: str) -> None:
+    """记录当前请求的续期令牌，由中间件添加到响应头X-New-Token"""
+    holder = new_token_context.get()
+    if holder is None:
+        logger.debug("当前请求未经过令牌刷新中间件，续期令牌不会返回")
+        return
+    holder["token"] = token
+
+
+class TokenRefreshMiddleware:
+    """
+    令牌刷新中间件，用于在响应中添加新的访问令牌。
+    纯ASGI实现：只修改http.response.start消息的响应头，响应体（包括SSE流）原样透传
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        holder: Dict[str, str] = {}
+        reset_token = new_token_context.set(holder)
+
+        async def send_with_token(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                token = holder.get("token")
+                if token:
+                    MutableHeaders(scope=message).append("X-New-Token", token)
+                    logger.debug("Added new token to response headers")
+            await send(message)
 
-        # 检查是否有新令牌需要添加到响应头中
         try:
-            new_token = new_token_context.get(None)
-            if new_token:
-                response.headers["X-New-Token"] = new_token
-                logging.info(f"Added new token to response headers")
-        except LookupError:
-            # 没有新令牌，不需要处理
-            pass
-        except Exception as e:
-            logging.error(f"Error adding new token to response: {str(e)}")
-
-        return response
+            await self.app(scope, receive, send_with_token)
+        finally:
+            new_token_context.reset(reset_token)
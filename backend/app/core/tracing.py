@@ -0,0 +1,347 @@
+import logging
+import random
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, List, Optional, Tuple
+
+from .config import settings
+from .profiler import span as stage_span
+
+logger = logging.getLogger(__name__)
+
+# W3C Trace Context请求头
+TRACEPARENT_HEADER = "traceparent"
+
+# 服务端（处理请求）、客户端（调用外部服务）和内部span
+SPAN_KIND_SERVER = "server"
+SPAN_KIND_CLIENT = "client"
+SPAN_KIND_INTERNAL = "internal"
+
+_random = random.SystemRandom()
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[Tuple[int, int]]:
+    """解析traceparent请求头，返回(trace_id, 上游span_id)，格式不正确时返回None"""
+    if not value:
+        return None
+    parts = value.strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        trace_id, span_id = int(parts[1], 16), int(parts[2], 16)
+    except ValueError:
+        return None
+    if not trace_id or not span_id:
+        return None
+    return trace_id, span_id
+
+
+class Span:
+    """
+    一次操作的span，字段与OpenTelemetry的span数据模型一致：
+    trace_id（128位）、span_id（64位）、父span、起止时间（纳秒）、属性、事件和状态
+    """
+
+    __slots__ = (
+        "name", "kind", "trace_id", "span_id", "parent_id", "start_ns", "end_ns",
+        "attributes", "events", "status", "status_message", "_tracer"
+    )
+
+    def __init__(self, tracer: "Tracer", name: str, kind: str, trace_id: int, parent_id: Optional[int], attributes: Optional[Dict[str, Any]]):
+        self._tracer = tracer
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = _random.getrandbits(64) or 1
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = dict(attributes) if attributes else {}
+        self.events: List[Dict[str, Any]] = []
+        self.status = "unset"
+        self.status_message: Optional[str] = None
+
+    def is_recording(self) -> bool:
+        return self.end_ns is None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None) -> None:
+        self.events.append({"name": name, "timestamp_ns": time.time_ns(), "attributes": attributes or {}})
+
+    def update_name(self, name: str) -> None:
+        self.name = name
+
+    def set_error(self, description: str) -> None:
+        self.status = "error"
+        self.status_message = description
+
+    def record_exception(self, exc: BaseException) -> None:
+        self.add_event("exception", {"exception.type": type(exc).__name__, "exception.message": str(exc)})
+        self.set_error(str(exc))
+
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id:032x}-{self.span_id:016x}-01"
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            self._tracer.exporter.export(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "kind": self.kind,
+            "trace_id": f"{self.trace_id:032x}",
+            "span_id": f"{self.span_id:016x}",
+            "parent_id": f"{self.parent_id:016x}" if self.parent_id else None,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": (self.end_ns - self.start_ns) / 1e6 if self.end_ns else None,
+            "attributes": self.attributes,
+            "events": self.events,
+            "status": self.status,
+            "status_message": self.status_message,
+        }
+
+
+class _NoopSpan:
+    """未开启追踪时使用的span，所有操作均为空"""
+
+    __slots__ = ()
+    trace_id = 0
+    span_id = 0
+
+    def is_recording(self) -> bool:
+        return False
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None) -> None:
+        pass
+
+    def update_name(self, name: str) -> None:
+        pass
+
+    def set_error(self, description: str) -> None:
+        pass
+
+    def record_exception(self, exc: BaseException) -> None:
+        pass
+
+    def traceparent(self) -> Optional[str]:
+        return None
+
+    def end(self) -> None:
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class InMemorySpanExporter:
+    """把结束的span保存在内存中（保留最近的若干个），用于测试和通过管理接口查看"""
+
+    def __init__(self, max_spans: int):
+        self._spans: Deque[Span] = deque(maxlen=max_spans)
+
+    def export(self, span: Span) -> None:
+        self._spans.append(span)
+
+    def get_finished_spans(self, trace_id: Optional[int] = None) -> List[Span]:
+        spans = list(self._spans)
+        if trace_id is not None:
+            spans = [s for s in spans if s.trace_id == trace_id]
+        return spans
+
+    def clear(self) -> None:
+        self._spans.clear()
+
+
+class Tracer:
+    """创建span的追踪器，结束的span交给导出器"""
+
+    def __init__(self, exporter: Any):
+        self.exporter = exporter
+
+    def start_span(
+        self,
+        name: str,
+        attributes: Optional[Dict[str, Any]] = None,
+        kind: str = SPAN_KIND_INTERNAL,
+        parent: Any = None,
+        remote_parent: Optional[Tuple[int, int]] = None
+    ) -> Span:
+        """
+        创建span（不设为当前span）
+        :param parent: 父span，为空时使用当前span
+        :param remote_parent: 上游服务传入的(trace_id, span_id)，优先于parent
+        """
+        if remote_parent is not None:
+            trace_id, parent_id = remote_parent
+        else:
+            parent = parent if parent is not None else _current_span.get()
+            if parent.trace_id:
+                trace_id, parent_id = parent.trace_id, parent.span_id
+            else:
+                trace_id, parent_id = _random.getrandbits(128) or 1, None
+        return Span(self, name, kind, trace_id, parent_id, attributes)
+
+
+class _NoopTracer:
+    def start_span(self, name: str, attributes: Optional[Dict[str, Any]] = None, kind: str = SPAN_KIND_INTERNAL, parent: Any = None, remote_parent: Optional[Tuple[int, int]] = None) -> _NoopSpan:
+        return NOOP_SPAN
+
+
+class _OTelSpan:
+    """OpenTelemetry span的包装，接口与Span一致"""
+
+    __slots__ = ("_span", "trace_id", "span_id")
+
+    def __init__(self, otel_span: Any):
+        self._span = otel_span
+        context = otel_span.get_span_context()
+        self.trace_id = context.trace_id
+        self.span_id = context.span_id
+
+    def is_recording(self) -> bool:
+        return self._span.is_recording()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self._span.set_attribute(key, value)
+
+    def add_event(self, name: str, attributes: Optional[Dict[str, Any]] = None) -> None:
+        self._span.add_event(name, attributes or {})
+
+    def update_name(self, name: str) -> None:
+        self._span.update_name(name)
+
+    def set_error(self, description: str) -> None:
+        from opentelemetry.trace import Status, StatusCode
+        self._span.set_status(Status(StatusCode.ERROR, description))
+
+    def record_exception(self, exc: BaseException) -> None:
+        self._span.record_exception(exc)
+        self.set_error(str(exc))
+
+    def traceparent(self) -> Optional[str]:
+        return f"00-{self.trace_id:032x}-{self.span_id:016x}-01" if self.trace_id else None
+
+    def end(self) -> None:
+        self._span.end()
+
+
+class _OTelTracer:
+    """
+    转发给opentelemetry-api的追踪器，导出方式由部署时配置的OpenTelemetry SDK决定
+    （如opentelemetry-instrument和OTEL_*环境变量）
+    """
+
+    def __init__(self):
+        from opentelemetry import trace
+        self._trace = trace
+        self._tracer = trace.get_tracer("trip_master")
+        self._kinds = {
+            SPAN_KIND_SERVER: trace.SpanKind.SERVER,
+            SPAN_KIND_CLIENT: trace.SpanKind.CLIENT,
+            SPAN_KIND_INTERNAL: trace.SpanKind.INTERNAL,
+        }
+
+    def start_span(self, name: str, attributes: Optional[Dict[str, Any]] = None, kind: str = SPAN_KIND_INTERNAL, parent: Any = None, remote_parent: Optional[Tuple[int, int]] = None) -> _OTelSpan:
+        trace = self._trace
+        if remote_parent is not None:
+            parent_context = trace.set_span_in_context(trace.NonRecordingSpan(trace.SpanContext(
+                trace_id=remote_parent[0], span_id=remote_parent[1], is_remote=True,
+                trace_flags=trace.TraceFlags(trace.TraceFlags.SAMPLED)
+            )))
+        else:
+            parent = parent if parent is not None else _current_span.get()
+            parent_context = trace.set_span_in_context(parent._span) if isinstance(parent, _OTelSpan) else None
+        return _OTelSpan(self._tracer.start_span(
+            name, context=parent_context, kind=self._kinds[kind], attributes=attributes
+        ))
+
+
+def _create_tracer(backend: str) -> Tuple[Any, Optional[InMemorySpanExporter]]:
+    if backend == "memory":
+        exporter = InMemorySpanExporter(settings.TRACING_MEMORY_MAX_SPANS)
+        return Tracer(exporter), exporter
+    if backend == "otel":
+        try:
+            return _OTelTracer(), None
+        except ImportError:
+            logger.warning("未安装opentelemetry-api，追踪已关闭")
+    elif backend != "none":
+        logger.warning(f"未知的追踪方式: {backend}，追踪已关闭")
+    return _NoopTracer(), None
+
+
+# 当前进程的追踪器；内存导出器仅在TRACING_BACKEND=memory时存在
+tracer, memory_exporter = _create_tracer(settings.TRACING_BACKEND)
+enabled = not isinstance(tracer, _NoopTracer)
+
+_current_span: ContextVar[Any] = ContextVar("current_span", default=NOOP_SPAN)
+
+
+def current_span() -> Any:
+    return _current_span.get()
+
+
+@contextmanager
+def use_span(span: Any, end_on_exit: bool = True) -> Iterator[Any]:
+    """把span设为当前span，期间的异常记录到span中"""
+    token = _current_span.set(span)
+    try:
+        yield span
+    except BaseException as e:
+        if not isinstance(e, GeneratorExit):
+            span.record_exception(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        if end_on_exit:
+            span.end()
+
+
+@contextmanager
+def start_span(
+    name: str,
+    attributes: Optional[Dict[str, Any]] = None,
+    kind: str = SPAN_KIND_INTERNAL,
+    stage: Optional[str] = None
+) -> Iterator[Any]:
+    """
+    创建span并设为当前span，结束时自动结束span
+    :param stage: 同时作为慢请求记录中的阶段名称（如auth、asr_decode）
+    """
+    with stage_span(stage) if stage else nullcontext():
+        if not enabled:
+            yield NOOP_SPAN
+            return
+        with use_span(tracer.start_span(name, attributes, kind)) as span:
+            yield span
+
+
+def inject_headers(headers: Dict[str, str], span: Any = None) -> Dict[str, str]:
+    """在调用外部服务的请求头中加入traceparent"""
+    traceparent = (span or _current_span.get()).traceparent()
+    if traceparent:
+        headers[TRACEPARENT_HEADER] = traceparent
+    return headers
+
+
+class TraceContextFilter(logging.Filter):
+    """为日志记录加上当前的trace_id和span_id，未在追踪中时为“-”"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        span = _current_span.get()
+        if span.trace_id:
+            record.trace_id = f"{span.trace_id:032x}"
+            record.span_id = f"{span.span_id:016x}"
+        else:
+            record.trace_id = record.span_id = "-"
+        return True
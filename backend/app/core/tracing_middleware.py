@@ -0,0 +1,46 @@
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .metrics_middleware import UNMATCHED_ROUTE
+from .tracing import SPAN_KIND_SERVER, TRACEPARENT_HEADER, parse_traceparent, tracer, use_span
+
+
+class TracingMiddleware:
+    """
+    追踪中间件（纯ASGI）：每个请求创建一个服务端span，沿用请求头traceparent中的trace_id，
+    并在响应头X-Trace-Id中返回trace_id，便于按trace_id查找日志和span
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        method = scope.get("method", "WEBSOCKET")
+        request_span = tracer.start_span(
+            f"{method} {UNMATCHED_ROUTE}",
+            {"http.request.method": method, "url.path": scope["path"]},
+            kind=SPAN_KIND_SERVER,
+            remote_parent=parse_traceparent(Headers(scope=scope).get(TRACEPARENT_HEADER))
+        )
+
+        async def send_with_trace_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                request_span.set_attribute("http.response.status_code", message["status"])
+                if message["status"] >= 500:
+                    request_span.set_error(f"HTTP {message['status']}")
+                MutableHeaders(scope=message).append("X-Trace-Id", f"{request_span.trace_id:032x}")
+            await send(message)
+
+        try:
+            with use_span(request_span, end_on_exit=False):
+                await self.app(scope, receive, send_with_trace_id)
+        finally:
+            route = getattr(scope.get("route"), "path", None)
+            if route:
+                request_span.set_attribute("http.route", route)
+            request_span.update_name(f"{method} {route or UNMATCHED_ROUTE}")
+            request_span.end()
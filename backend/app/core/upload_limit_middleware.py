@@ -0,0 +1,51 @@
+from typing import Dict
+
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+
+class UploadLimitMiddleware:
+    """
+    上传大小限制中间件（纯ASGI）：对指定路径的请求体限制大小。
+    声明的Content-Length超限时直接返回413，不读取请求体；
+    未声明或声明不实时边接收边计数，超限时立即中止解析，避免整个请求体先被写入临时文件
+    """
+
+    def __init__(self, app: ASGIApp, limits: Dict[str, int]):
+        """
+        :param limits: 请求路径到请求体字节数上限的映射
+        """
+        self.app = app
+        self.limits = limits
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        max_bytes = self.limits.get(scope["path"]) if scope["type"] == "http" else None
+        if max_bytes is None:
+            await self.app(scope, receive, send)
+            return
+
+        detail = "请求体过大"
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > max_bytes:
+            response = JSONResponse(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                content={"detail": {"code": "HTTP_ERROR", "message": detail}}
+            )
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def receive_with_limit() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > max_bytes:
+                    # FastAPI解析请求体时会原样抛出HTTPException，交由全局异常处理器返回413
+                    raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=detail)
+            return message
+
+        await self.app(scope, receive_with_limit, send)
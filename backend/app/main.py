@@ -1,33 +1,60 @@
+import time
+
+# 记录应用模块导入起始时间，用于统计冷启动耗时
+_import_started_at = time.perf_counter()
+
 import logging
-from fastapi import FastAPI, HTTPException
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
 
 from .api import api_router
 from .core.config import settings
+from .core.container import container
 from .core.exceptions import TripMasterException
 from .core.exception_handlers import (
     trip_master_exception_handler,
     http_exception_handler,
     validation_exception_handler
 )
+from .core.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, render as render_metrics
+from .core.logging_config import setup_logging, shutdown_logging
+from .core.metrics_middleware import MetricsMiddleware
+from .core.profiler_middleware import SlowRequestMiddleware
+from .core.request_id_middleware import RequestIdMiddleware
 from .core.token_refresh_middleware import TokenRefreshMiddleware
+from .core.upload_limit_middleware import UploadLimitMiddleware
+from .core import tracing
+from .core.tracing_middleware import TracingMiddleware
+
+# 配置日志：经队列由后台线程输出，日志带请求ID（开启追踪时还带trace_id）
+setup_logging()
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    启动时报告导入耗时，创建共享资源（数据库引擎、Supabase客户端、HTTP连接池、缓存、进程池、后台任务）并报告各组件初始化耗时；
+    关闭时按相反顺序释放，最后输出剩余日志
+    """
+    logger.info(f"app.main 导入耗时: {import_seconds * 1000:.0f}ms")
+    await container.start()
+    app.state.container = container
+    yield
+    await container.stop()
+    shutdown_logging()
 
-# 配置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-    ]
-)
 
 # 创建FastAPI应用实例
 app = FastAPI(
     title=settings.PROJECT_NAME,
     description="Trip Master API - 旅行规划师后端服务",
     version="1.0.0",
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
 # 注册全局异常处理器
@@ -47,9 +74,34 @@ app.add_middleware(
 # 添加令牌刷新中间件
 app.add_middleware(TokenRefreshMiddleware)
 
+# 上传大小限制中间件，超限的语音上传在写入临时文件前就被拒绝（额外64KB留给multipart表单头）
+app.add_middleware(
+    UploadLimitMiddleware,
+    limits={f"{settings.API_V1_STR}/speech/speech-to-text": settings.SPEECH_MAX_UPLOAD_MB * 1024 * 1024 + 64 * 1024}
+)
+
+# 慢请求记录中间件
+if settings.SLOW_REQUEST_THRESHOLD_MS > 0:
+    app.add_middleware(SlowRequestMiddleware)
+
+# 追踪中间件，为每个请求创建服务端span
+if tracing.enabled:
+    app.add_middleware(TracingMiddleware)
+
+# 请求耗时指标中间件，放在最外层以统计完整耗时
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
+# 请求ID中间件，放在最外层使所有日志都能带上请求ID
+app.add_middleware(RequestIdMiddleware)
+
 # 包含API路由
 app.include_router(api_router, prefix=settings.API_V1_STR)
 
+# 应用模块导入耗时（秒）
+import_seconds = time.perf_counter() - _import_started_at
+
+
 # 根路径
 @app.get("/")
 async def root():
@@ -59,3 +111,9 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+# Prometheus指标端点
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
@@ -2,5 +2,11 @@ from .user import User
 from .chat import Chat
 from .message import Message, SenderType
 from .poi import PointOfInterest
+from .map_cache import MapQueryCache
+from .distance_matrix import DistanceMatrix
+from .trip import Trip, TripDay, TripStop, TripExpense
+from .exchange_rate import ExchangeRate
+from .analytics import AnalyticsEvent, AnalyticsHourly, AnalyticsDaily
+from .token_usage import TokenUsage
 
-__all__ = ["User", "Chat", "Message", "SenderType", "PointOfInterest"]
\ No newline at end of file
+__all__ = ["User", "Chat", "Message", "SenderType", "PointOfInterest", "MapQueryCache", "DistanceMatrix", "Trip", "TripDay", "TripStop", "TripExpense", "ExchangeRate", "AnalyticsEvent", "AnalyticsHourly", "AnalyticsDaily", "TokenUsage"]
\ No newline at end of file
@@ -0,0 +1,37 @@
+from sqlalchemy import BigInteger, Column, DateTime, Float, Index, Integer, String, Text
+from sqlalchemy.dialects.postgresql import UUID
+
+from ..core.database import Base
+
+class AnalyticsEvent(Base):
+    """统计事件原始记录，只追加不修改，由进程内缓冲区批量写入"""
+    __tablename__ = "analytics_events"
+
+    # SQLite只有INTEGER主键支持自增
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    event_type = Column(String(50), nullable=False)  # 如chat_turn、llm_tokens、voice_request、poi_view
+    user_id = Column(UUID(as_uuid=True))  # 不关联用户表，删除用户不影响历史统计
+    occurred_at = Column(DateTime(timezone=True), nullable=False)
+    value = Column(Float, nullable=False, default=1)  # 计量值，如token数
+    properties = Column(Text)  # 附加属性JSON
+
+    __table_args__ = (
+        # 汇总按时间段和事件类型查询
+        Index("ix_analytics_events_occurred_at_type", "occurred_at", "event_type"),
+    )
+
+class _RollupColumns:
+    """按时间段汇总的统计：事件数、计量值之和、去重用户数"""
+    bucket_start = Column(DateTime(timezone=True), primary_key=True)
+    event_type = Column(String(50), primary_key=True)
+    count = Column(BigInteger, nullable=False, default=0)
+    value_sum = Column(Float, nullable=False, default=0)
+    unique_users = Column(Integer, nullable=False, default=0)
+
+class AnalyticsHourly(_RollupColumns, Base):
+    """每小时汇总"""
+    __tablename__ = "analytics_hourly"
+
+class AnalyticsDaily(_RollupColumns, Base):
+    """每日汇总（UTC自然日）"""
+    __tablename__ = "analytics_daily"
@@ -0,0 +1,24 @@
+from sqlalchemy import Column, String, Text, DateTime, Integer, ForeignKey, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.sql import func
+import uuid
+
+from ..core.database import Base
+
+class DistanceMatrix(Base):
+    """行程途经点之间的距离/时间矩阵，每个行程日保存最近一次的结果，重新规划时直接复用"""
+    __tablename__ = "distance_matrices"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    trip_id = Column(UUID(as_uuid=True), ForeignKey("trips.id", ondelete="CASCADE"), nullable=False)
+    day_index = Column(Integer, nullable=False, default=0)
+    signature = Column(String(64), nullable=False)  # 出行方式和去重排序后点位坐标的SHA-256
+    mode = Column(String(20), nullable=False)
+    points = Column(Text, nullable=False)  # 去重排序后的 [[纬度, 经度], ...] JSON，矩阵按此顺序存储
+    distances = Column(Text, nullable=False)  # 距离矩阵（米）JSON
+    durations = Column(Text, nullable=False)  # 时间矩阵（秒）JSON
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("trip_id", "day_index", name="uq_distance_matrices_trip_day_index"),
+    )
@@ -0,0 +1,12 @@
+from sqlalchemy import Column, String, Numeric, DateTime
+from sqlalchemy.sql import func
+
+from ..core.database import Base
+
+class ExchangeRate(Base):
+    """汇率表：1单位该币种折合的基准币种（CURRENCY_BASE）金额"""
+    __tablename__ = "exchange_rates"
+
+    currency = Column(String(3), primary_key=True)  # ISO 4217币种代码，如USD
+    rate = Column(Numeric(18, 8), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
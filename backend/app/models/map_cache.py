@@ -0,0 +1,14 @@
+from sqlalchemy import Column, String, Text, DateTime
+from sqlalchemy.sql import func
+
+from ..core.database import Base
+
+class MapQueryCache(Base):
+    """高德地图API查询结果的持久化缓存，以规范化后的查询参数为键"""
+    __tablename__ = "map_query_cache"
+
+    key = Column(String(64), primary_key=True)  # 规范化查询参数的SHA-256
+    kind = Column(String(32), nullable=False)  # 查询类型，如geocode、poi_search
+    response = Column(Text, nullable=False)  # 结果JSON
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
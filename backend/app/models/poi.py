@@ -1,10 +1,13 @@
-
-from sqlalchemy import Column, String, Text, Numeric, DateTime
+from sqlalchemy import DDL, Column, String, Text, Numeric, DateTime, Index, event
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.sql import func
 import uuid
 
 from ..core.database import Base
+from ..utils.geo import geohash_encode
+
+# 存储的geohash精度，12位约为3.7cm x 1.9cm
+POI_GEOHASH_PRECISION = 12
 
 class PointOfInterest(Base):
     __tablename__ = "points_of_interest"
@@ -14,10 +17,40 @@ class PointOfInterest(Base):
     category = Column(String(100))
     latitude = Column(Numeric(10, 8), nullable=False)
     longitude = Column(Numeric(11, 8), nullable=False)
+    # 经纬度的geohash编码，B-tree索引支持按单元格前缀范围做空间查询
+    geohash = Column(String(12), index=True)
     address = Column(String(500))
     description = Column(Text)
     rating = Column(Numeric(3, 2))
     image_url = Column(String(500))
-    external_id = Column(String(100))  # 高德地图ID
+    external_id = Column(String(100), unique=True, index=True)  # 高德地图ID
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        # 按分类筛选的附近搜索
+        Index("ix_points_of_interest_category_geohash", "category", "geohash"),
+        # 名称模糊查询（联想），PostgreSQL下为pg_trgm GIN索引
+        Index(
+            "ix_points_of_interest_name_trgm",
+            "name",
+            postgresql_using="gin",
+            postgresql_ops={"name": "gin_trgm_ops"}
+        ),
+    )
+
+
+# 建表前启用pg_trgm扩展
+event.listen(
+    PointOfInterest.__table__,
+    "before_create",
+    DDL("CREATE EXTENSION IF NOT EXISTS pg_trgm").execute_if(dialect="postgresql")
+)
+
+
+@event.listens_for(PointOfInterest, "before_insert")
+@event.listens_for(PointOfInterest, "before_update")
+def _update_geohash(mapper, connection, target: PointOfInterest):
+    """经纬度变化时同步更新geohash"""
+    if target.latitude is not None and target.longitude is not None:
+        target.geohash = geohash_encode(float(target.latitude), float(target.longitude), POI_GEOHASH_PRECISION)
@@ -0,0 +1,15 @@
+from sqlalchemy import BigInteger, Column, Date, ForeignKey, Integer, String
+from sqlalchemy.dialects.postgresql import UUID
+
+from ..core.database import Base
+
+class TokenUsage(Base):
+    """每个用户每天每个模型的大模型token用量，由进程内累计定期写入"""
+    __tablename__ = "llm_token_usage"
+
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)  # UTC日期
+    model = Column(String(50), primary_key=True)
+    prompt_tokens = Column(BigInteger, nullable=False, default=0)
+    completion_tokens = Column(BigInteger, nullable=False, default=0)
+    requests = Column(Integer, nullable=False, default=0)
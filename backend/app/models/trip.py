@@ -0,0 +1,104 @@
+from sqlalchemy import Boolean, Column, Date, DateTime, Float, ForeignKey, Integer, Numeric, String, Time, UniqueConstraint
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import relationship
+from sqlalchemy.sql import func
+import uuid
+
+from ..core.database import Base
+
+class Trip(Base):
+    __tablename__ = "trips"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    title = Column(String(255), nullable=False)
+    destination = Column(String(255))
+    start_date = Column(Date)
+    mode = Column(String(20), nullable=False, default="driving")  # 出行方式：driving/walking
+    travelers = Column(Integer, nullable=False, default=1)  # 出行人数
+    currency = Column(String(3), nullable=False, default="CNY")  # 预算币种
+    total_cost = Column(Numeric(12, 2), nullable=False, default=0)  # 各天花费与整个行程的花费之和
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    # 关系
+    user = relationship("User", back_populates="trips")
+    days = relationship("TripDay", back_populates="trip", cascade="all, delete-orphan", order_by="TripDay.day_index")
+    expenses = relationship("TripExpense", back_populates="trip", cascade="all, delete-orphan", order_by="TripExpense.created_at")
+
+class TripDay(Base):
+    __tablename__ = "trip_days"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    trip_id = Column(UUID(as_uuid=True), ForeignKey("trips.id", ondelete="CASCADE"), nullable=False)
+    day_index = Column(Integer, nullable=False)  # 从0开始
+    start_time = Column(Time, nullable=False)
+    end_time = Column(Time, nullable=False)
+    budget = Column(Numeric(12, 2))
+    # 当日出发地（如酒店），为空时从第一个途经点开始
+    start_latitude = Column(Numeric(10, 8))
+    start_longitude = Column(Numeric(11, 8))
+    return_to_start = Column(Boolean, nullable=False, default=False)
+    # 按当前顺序计算的路线汇总
+    travel_seconds = Column(Integer, nullable=False, default=0)
+    travel_meters = Column(Integer, nullable=False, default=0)
+    finish_time = Column(Time)
+    # 当日各分类花费（行程币种，已按人数展开），途经点或当日花费变化时只重新计算这一天
+    tickets_cost = Column(Numeric(12, 2), nullable=False, default=0)
+    transport_cost = Column(Numeric(12, 2), nullable=False, default=0)
+    lodging_cost = Column(Numeric(12, 2), nullable=False, default=0)
+    food_cost = Column(Numeric(12, 2), nullable=False, default=0)
+    other_cost = Column(Numeric(12, 2), nullable=False, default=0)
+    total_cost = Column(Numeric(12, 2), nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("trip_id", "day_index", name="uq_trip_days_trip_day_index"),
+    )
+
+    # 关系
+    trip = relationship("Trip", back_populates="days")
+    stops = relationship("TripStop", back_populates="day", cascade="all, delete-orphan", order_by="TripStop.position")
+
+class TripStop(Base):
+    __tablename__ = "trip_stops"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    day_id = Column(UUID(as_uuid=True), ForeignKey("trip_days.id", ondelete="CASCADE"), nullable=False, index=True)
+    poi_id = Column(UUID(as_uuid=True), ForeignKey("points_of_interest.id", ondelete="SET NULL"))
+    position = Column(Integer, nullable=False)  # 当日游览顺序，从0开始
+    name = Column(String(255), nullable=False)
+    latitude = Column(Numeric(10, 8), nullable=False)
+    longitude = Column(Numeric(11, 8), nullable=False)
+    dwell_minutes = Column(Integer, nullable=False, default=60)
+    open_time = Column(Time)
+    close_time = Column(Time)
+    cost = Column(Numeric(10, 2), nullable=False, default=0)
+    category = Column(String(20), nullable=False, default="tickets")  # 花费分类
+    currency = Column(String(3))  # 为空时与行程币种相同
+    per_person = Column(Boolean, nullable=False, default=True)  # 花费是否按人数计算
+    priority = Column(Float, nullable=False, default=1.0)
+    # 按当前顺序计算的时间表
+    arrival_time = Column(Time)
+    departure_time = Column(Time)
+    travel_seconds = Column(Integer, nullable=False, default=0)  # 从上一地点出发的交通时间
+    conflict = Column(Boolean, nullable=False, default=False)  # 无法在营业时间或当日结束前游览完
+
+    # 关系
+    day = relationship("TripDay", back_populates="stops")
+
+class TripExpense(Base):
+    """不在路线上的花费，如住宿、餐饮、机票"""
+    __tablename__ = "trip_expenses"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    trip_id = Column(UUID(as_uuid=True), ForeignKey("trips.id", ondelete="CASCADE"), nullable=False, index=True)
+    day_index = Column(Integer)  # 为空时属于整个行程（如签证、保险）
+    category = Column(String(20), nullable=False)
+    amount = Column(Numeric(12, 2), nullable=False)
+    currency = Column(String(3))  # 为空时与行程币种相同
+    per_person = Column(Boolean, nullable=False, default=False)
+    note = Column(String(255))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # 关系
+    trip = relationship("Trip", back_populates="expenses")
@@ -25,3 +25,4 @@ class User(Base):
 
     # 关系
     chats = relationship("Chat", back_populates="user", cascade="all, delete-orphan")
+    trips = relationship("Trip", back_populates="user", cascade="all, delete-orphan")
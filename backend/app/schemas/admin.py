@@ -0,0 +1,39 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from pydantic import BaseModel
+
+# 采样分析状态
+class ProfilerStatus(BaseModel):
+    pid: int  # 处理本次请求的工作进程，多进程部署时每个进程单独开启
+    running: bool
+    interval_ms: float
+    include_idle: bool
+    samples: int
+    distinct_stacks: int
+    started_at: Optional[datetime] = None
+    stopped_at: Optional[datetime] = None
+
+# 慢请求中的一个阶段，嵌套阶段以分号连接，如llm;db
+class SlowRequestSpan(BaseModel):
+    name: str
+    ms: float
+    count: int
+
+# 慢请求记录
+class SlowRequest(BaseModel):
+    method: str
+    route: str
+    status: int
+    duration_ms: float
+    finished_at: datetime
+    spans: List[SlowRequestSpan]
+
+# 汇率：币种 -> 1单位折合基准币种的金额
+class ExchangeRates(BaseModel):
+    base: str
+    rates: Dict[str, float]
+
+# 更新汇率，未列出的币种保持不变
+class ExchangeRatesUpdate(BaseModel):
+    rates: Dict[str, float]
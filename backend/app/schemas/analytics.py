@@ -0,0 +1,38 @@
+from datetime import datetime
+from typing import Any, Dict, List, Literal, Optional
+from uuid import UUID
+from pydantic import BaseModel, Field
+
+# 客户端可以上报的事件类型，其他事件由服务端记录
+ClientEventType = Literal["poi_view"]
+
+# 客户端上报的事件
+class AnalyticsEventCreate(BaseModel):
+    event_type: ClientEventType
+    poi_id: Optional[UUID] = None
+    properties: Optional[Dict[str, Any]] = Field(None, max_length=20)
+
+# 批量上报请求模型
+class AnalyticsEventBatch(BaseModel):
+    events: List[AnalyticsEventCreate] = Field(..., min_length=1, max_length=100)
+
+# 某个时间段某类事件的统计
+class AnalyticsBucket(BaseModel):
+    bucket_start: datetime
+    event_type: str
+    count: int
+    value_sum: float
+    unique_users: int
+
+# 某类事件在查询范围内的合计
+class AnalyticsTotal(BaseModel):
+    count: int
+    value_sum: float
+
+# 统计查询响应模型
+class AnalyticsSeriesResponse(BaseModel):
+    granularity: Literal["hour", "day"]
+    start: datetime
+    end: datetime
+    buckets: List[AnalyticsBucket]
+    totals: Dict[str, AnalyticsTotal]
@@ -0,0 +1,58 @@
+from datetime import datetime
+from typing import List, Literal, Optional
+from uuid import UUID
+from pydantic import BaseModel, Field
+
+# 兴趣点响应模型
+class PoiResponse(BaseModel):
+    id: UUID
+    name: str
+    category: Optional[str] = None
+    latitude: float
+    longitude: float
+    address: Optional[str] = None
+    description: Optional[str] = None
+    rating: Optional[float] = None
+    image_url: Optional[str] = None
+    external_id: Optional[str] = None
+    # 距查询中心的距离（米），仅附近搜索返回
+    distance: Optional[float] = None
+
+    class Config:
+        from_attributes = True
+
+# 兴趣点列表响应模型
+class PoiListResponse(BaseModel):
+    pois: List[PoiResponse]
+
+# 地理编码结果模型
+class GeocodeResult(BaseModel):
+    formatted_address: Optional[str] = None
+    province: Optional[str] = None
+    city: Optional[str] = None
+    district: Optional[str] = None
+    level: Optional[str] = None
+    latitude: float
+    longitude: float
+
+# 地理编码响应模型
+class GeocodeListResponse(BaseModel):
+    results: List[GeocodeResult]
+
+# 坐标点模型
+class LatLng(BaseModel):
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+
+# 距离矩阵请求模型
+class DistanceMatrixRequest(BaseModel):
+    points: List[LatLng] = Field(..., min_length=2, max_length=100)
+    mode: Literal["driving", "walking"] = "driving"
+
+# 距离矩阵响应模型
+class DistanceMatrixResponse(BaseModel):
+    # 距离（米）和时间（秒），第i行第j列为第i个点到第j个点
+    distances: List[List[float]]
+    durations: List[List[float]]
+    # amap: 全部来自高德；estimate: 全部为直线距离估算；mixed: 两者都有
+    source: str
@@ -0,0 +1,5 @@
+from pydantic import BaseModel, Field
+
+# 语音合成请求模型
+class TextToSpeechRequest(BaseModel):
+    text: str = Field(..., min_length=1, max_length=2000)
@@ -0,0 +1,293 @@
+from datetime import date, datetime, time
+from typing import Dict, List, Literal, Optional
+from uuid import UUID
+from pydantic import BaseModel, Field
+
+from .poi import LatLng
+
+# 花费分类：门票、交通、住宿、餐饮、其他
+BudgetCategory = Literal["tickets", "transport", "lodging", "food", "other"]
+# ISO 4217币种代码
+CURRENCY_PATTERN = "^[A-Z]{3}$"
+
+# 待规划的途经点模型，提供poi_id时可省略经纬度
+class PlanStop(BaseModel):
+    poi_id: Optional[UUID] = None
+    name: Optional[str] = None
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
+    dwell_minutes: int = Field(60, ge=0, le=720)
+    open_time: Optional[time] = None
+    close_time: Optional[time] = None
+    cost: float = Field(0, ge=0)
+    priority: float = Field(1, gt=0)
+
+# 单日规划请求模型
+class PlanDay(BaseModel):
+    start_time: time = time(9, 0)
+    end_time: time = time(21, 0)
+    budget: Optional[float] = Field(None, ge=0)
+    start: Optional[LatLng] = None
+    return_to_start: bool = False
+    stops: List[PlanStop] = Field(..., max_length=60)
+
+# 行程优化请求模型
+class TripOptimizeRequest(BaseModel):
+    mode: Literal["driving", "walking"] = "driving"
+    days: List[PlanDay] = Field(..., min_length=1, max_length=30)
+
+# 规划后的途经点模型
+class ScheduledStop(BaseModel):
+    # 在请求中该日stops里的下标
+    index: int
+    poi_id: Optional[UUID] = None
+    name: Optional[str] = None
+    arrival_time: time
+    departure_time: time
+    # 从上一地点出发的交通时间（秒）
+    travel_seconds: float
+
+# 单日规划结果模型
+class PlannedDay(BaseModel):
+    stops: List[ScheduledStop]
+    # 因时间或预算无法安排的途经点下标
+    dropped: List[int]
+    total_travel_seconds: float
+    total_cost: float
+    finish_time: Optional[time] = None
+    # exact: 动态规划精确解；local_search: 局部搜索近似解；greedy: 超时后的贪心解
+    method: str
+    optimal: bool
+
+# 行程优化响应模型
+class TripOptimizeResponse(BaseModel):
+    days: List[PlannedDay]
+    # 交通时间来源，见距离矩阵
+    source: str
+
+# 创建行程请求模型
+class TripCreate(BaseModel):
+    title: str = Field(..., min_length=1, max_length=255)
+    destination: Optional[str] = Field(None, max_length=255)
+    start_date: Optional[date] = None
+    days: int = Field(1, ge=1, le=30)
+    mode: Literal["driving", "walking"] = "driving"
+    travelers: int = Field(1, ge=1, le=100)
+    currency: str = Field("CNY", pattern=CURRENCY_PATTERN)
+    # 每天的默认游览时间和预算
+    day_start_time: time = time(9, 0)
+    day_end_time: time = time(21, 0)
+    daily_budget: Optional[float] = Field(None, ge=0)
+
+# 更新行程请求模型
+class TripUpdate(BaseModel):
+    title: Optional[str] = Field(None, min_length=1, max_length=255)
+    destination: Optional[str] = Field(None, max_length=255)
+    start_date: Optional[date] = None
+    mode: Optional[Literal["driving", "walking"]] = None
+    travelers: Optional[int] = Field(None, ge=1, le=100)
+    currency: Optional[str] = Field(None, pattern=CURRENCY_PATTERN)
+
+# 更新行程日请求模型
+class TripDayUpdate(BaseModel):
+    start_time: Optional[time] = None
+    end_time: Optional[time] = None
+    budget: Optional[float] = Field(None, ge=0)
+    start: Optional[LatLng] = None
+    return_to_start: Optional[bool] = None
+
+# 添加途经点请求模型，提供poi_id时可省略名称和经纬度
+class TripStopCreate(BaseModel):
+    poi_id: Optional[UUID] = None
+    name: Optional[str] = Field(None, max_length=255)
+    latitude: Optional[float] = Field(None, ge=-90, le=90)
+    longitude: Optional[float] = Field(None, ge=-180, le=180)
+    dwell_minutes: int = Field(60, ge=0, le=720)
+    open_time: Optional[time] = None
+    close_time: Optional[time] = None
+    cost: float = Field(0, ge=0)
+    category: BudgetCategory = "tickets"
+    # 为空时与行程币种相同
+    currency: Optional[str] = Field(None, pattern=CURRENCY_PATTERN)
+    per_person: bool = True
+    priority: float = Field(1, gt=0)
+    # 插入位置，为空时追加到当天末尾
+    position: Optional[int] = Field(None, ge=0)
+
+# 修改或移动途经点请求模型
+class TripStopUpdate(BaseModel):
+    name: Optional[str] = Field(None, max_length=255)
+    dwell_minutes: Optional[int] = Field(None, ge=0, le=720)
+    open_time: Optional[time] = None
+    close_time: Optional[time] = None
+    cost: Optional[float] = Field(None, ge=0)
+    category: Optional[BudgetCategory] = None
+    currency: Optional[str] = Field(None, pattern=CURRENCY_PATTERN)
+    per_person: Optional[bool] = None
+    priority: Optional[float] = Field(None, gt=0)
+    # 移动到指定的行程日和位置
+    day_index: Optional[int] = Field(None, ge=0)
+    position: Optional[int] = Field(None, ge=0)
+
+# 途经点响应模型
+class TripStopResponse(BaseModel):
+    id: UUID
+    poi_id: Optional[UUID] = None
+    position: int
+    name: str
+    latitude: float
+    longitude: float
+    dwell_minutes: int
+    open_time: Optional[time] = None
+    close_time: Optional[time] = None
+    cost: float
+    category: str
+    currency: Optional[str] = None
+    per_person: bool
+    priority: float
+    arrival_time: Optional[time] = None
+    departure_time: Optional[time] = None
+    travel_seconds: int
+    conflict: bool
+
+    class Config:
+        from_attributes = True
+
+# 行程日响应模型
+class TripDayResponse(BaseModel):
+    id: UUID
+    day_index: int
+    start_time: time
+    end_time: time
+    budget: Optional[float] = None
+    start_latitude: Optional[float] = None
+    start_longitude: Optional[float] = None
+    return_to_start: bool
+    travel_seconds: int
+    travel_meters: int
+    tickets_cost: float
+    transport_cost: float
+    lodging_cost: float
+    food_cost: float
+    other_cost: float
+    total_cost: float
+    finish_time: Optional[time] = None
+    stops: List[TripStopResponse]
+
+    class Config:
+        from_attributes = True
+
+# 行程响应模型
+class TripResponse(BaseModel):
+    id: UUID
+    title: str
+    destination: Optional[str] = None
+    start_date: Optional[date] = None
+    mode: str
+    travelers: int
+    currency: str
+    total_cost: float
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+# 行程详情响应模型
+class TripDetailResponse(TripResponse):
+    days: List[TripDayResponse]
+
+# 行程列表响应模型
+class TripListResponse(BaseModel):
+    trips: List[TripResponse]
+
+# 行程编辑结果模型，只返回受影响的行程日
+class TripDaysResponse(BaseModel):
+    total_cost: float
+    days: List[TripDayResponse]
+
+# 添加行程花费请求模型
+class TripExpenseCreate(BaseModel):
+    # 为空时属于整个行程
+    day_index: Optional[int] = Field(None, ge=0)
+    category: BudgetCategory
+    amount: float = Field(..., ge=0)
+    currency: Optional[str] = Field(None, pattern=CURRENCY_PATTERN)
+    per_person: bool = False
+    note: Optional[str] = Field(None, max_length=255)
+
+# 行程花费响应模型
+class TripExpenseResponse(BaseModel):
+    id: UUID
+    day_index: Optional[int] = None
+    category: str
+    amount: float
+    currency: Optional[str] = None
+    per_person: bool
+    note: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+# 单日预算模型
+class DayBudget(BaseModel):
+    day_index: int
+    categories: Dict[str, float]
+    total_cost: float
+    budget: Optional[float] = None
+    over_budget: bool
+
+# 行程预算响应模型，金额均为行程币种
+class TripBudgetResponse(BaseModel):
+    currency: str
+    travelers: int
+    total_cost: float
+    per_person_cost: float
+    categories: Dict[str, float]
+    days: List[DayBudget]
+    # 不属于某一天的花费合计
+    trip_level_cost: float
+    expenses: List[TripExpenseResponse]
+
+# 预算方案中的一笔花费
+class BudgetItem(BaseModel):
+    # 为空时属于整个行程
+    day_index: Optional[int] = Field(None, ge=0)
+    category: BudgetCategory
+    amount: float = Field(..., ge=0)
+    currency: Optional[str] = Field(None, pattern=CURRENCY_PATTERN)
+    per_person: bool = True
+
+# 预算方案模型
+class BudgetAlternative(BaseModel):
+    name: Optional[str] = Field(None, max_length=100)
+    # 为空时使用请求中的出行人数
+    travelers: Optional[int] = Field(None, ge=1, le=100)
+    items: List[BudgetItem] = Field(..., max_length=2000)
+
+# 预算方案比较请求模型
+class BudgetCompareRequest(BaseModel):
+    currency: str = Field("CNY", pattern=CURRENCY_PATTERN)
+    travelers: int = Field(1, ge=1, le=100)
+    days: int = Field(1, ge=1, le=30)
+    # 每日和总预算，超出时标记over_budget
+    daily_budget: Optional[float] = Field(None, ge=0)
+    total_budget: Optional[float] = Field(None, ge=0)
+    alternatives: List[BudgetAlternative] = Field(..., min_length=1)
+
+# 单个方案的预算结果
+class BudgetAlternativeResult(BaseModel):
+    name: Optional[str] = None
+    travelers: int
+    total_cost: float
+    per_person_cost: float
+    categories: Dict[str, float]
+    days: List[float]
+    over_budget: bool
+
+# 预算方案比较响应模型
+class BudgetCompareResponse(BaseModel):
+    currency: str
+    alternatives: List[BudgetAlternativeResult]
+    # 总花费最低的方案下标
+    cheapest: int
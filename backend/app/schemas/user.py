@@ -1,5 +1,5 @@
-from datetime import datetime
-from typing import Optional
+from datetime import date, datetime
+from typing import List, Optional
 from uuid import UUID
 
 from pydantic import BaseModel, EmailStr
@@ -74,6 +74,21 @@ class AvatarUploadResponse(BaseModel):
 class MessageResponse(BaseModel):
     message: str
 
+# 单日单模型的token用量
+class TokenUsageDay(BaseModel):
+    day: date
+    model: str
+    prompt_tokens: int
+    completion_tokens: int
+    requests: int
+
+# token用量响应模型
+class TokenUsageResponse(BaseModel):
+    days: List[TokenUsageDay]
+    window_seconds: int  # 配额滑动窗口长度
+    window_used: int  # 窗口内已使用的token数
+    window_limit: int  # 窗口内的token上限
+
 # 错误响应模型
 class ErrorResponse(BaseModel):
     code: str
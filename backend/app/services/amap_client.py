@@ -0,0 +1,280 @@
+import json
+import logging
+import unicodedata
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.database import upsert
+from ..core.exceptions import ExternalServiceException
+from ..models.map_cache import MapQueryCache
+from ..models.poi import PointOfInterest
+from ..services.map_service import MapService
+from ..utils.cache import LRUCache, content_key
+from ..utils.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+class AMapClient:
+    """高德地图Web服务API客户端，带限流和两级缓存"""
+
+    # 进程内共享的连接池、限流器和内存缓存
+    _http_client: Optional[httpx.AsyncClient] = None
+    _rate_limiter = TokenBucket(settings.AMAP_QPS, settings.AMAP_BURST)
+    _memory_cache = LRUCache(max_items=settings.AMAP_MEMORY_CACHE_ITEMS, name="amap")
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @classmethod
+    def http_client(cls) -> httpx.AsyncClient:
+        """获取共享的HTTP连接池"""
+        if cls._http_client is None:
+            cls._http_client = httpx.AsyncClient(
+                base_url=settings.AMAP_BASE_URL,
+                timeout=10.0,
+                limits=httpx.Limits(
+                    max_connections=settings.AMAP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.AMAP_MAX_CONNECTIONS
+                )
+            )
+        return cls._http_client
+
+    @classmethod
+    async def close(cls) -> None:
+        """关闭共享的HTTP连接池"""
+        if cls._http_client is not None:
+            await cls._http_client.aclose()
+            cls._http_client = None
+
+    @staticmethod
+    def normalize(value: Any) -> str:
+        """规范化查询参数：全角转半角、去除首尾空白、合并连续空白、转小写"""
+        text = unicodedata.normalize("NFKC", str(value))
+        return " ".join(text.split()).lower()
+
+    # 地理编码：地址转经纬度
+    async def geocode(self, address: str, city: Optional[str] = None) -> List[Dict[str, Any]]:
+        params = {"address": address}
+        if city:
+            params["city"] = city
+
+        data, _ = await self._cached_get("geocode", "/v3/geocode/geo", params)
+        results = []
+        for item in data.get("geocodes") or []:
+            location = self._parse_location(item.get("location"))
+            if location is None:
+                continue
+            results.append({
+                "formatted_address": self._text(item.get("formatted_address")),
+                "province": self._text(item.get("province")),
+                "city": self._text(item.get("city")),
+                "district": self._text(item.get("district")),
+                "level": self._text(item.get("level")),
+                "latitude": location[0],
+                "longitude": location[1],
+            })
+        return results
+
+    # 关键字搜索兴趣点，结果写入本地兴趣点表
+    async def search_pois(
+        self,
+        keywords: str,
+        city: Optional[str] = None,
+        types: Optional[str] = None,
+        page: int = 1,
+        page_size: int = 20
+    ) -> List[Dict[str, Any]]:
+        params = {
+            "keywords": keywords,
+            "offset": page_size,
+            "page": page,
+            "extensions": "all",
+        }
+        if city:
+            params["city"] = city
+            params["citylimit"] = "true"
+        if types:
+            params["types"] = types
+
+        data, fresh = await self._cached_get("poi_search", "/v3/place/text", params)
+
+        records = []
+        for item in data.get("pois") or []:
+            record = self._poi_record(item)
+            if record is not None:
+                records.append(record)
+
+        map_service = MapService(self.db)
+        if fresh:
+            pois = map_service.upsert_pois(records)
+            return [MapService.poi_to_dict(poi) for poi in pois]
+
+        # 缓存命中时结果已在首次请求时写入，只读取；不写入也不使热点区域失效
+        existing = {
+            poi.external_id: poi
+            for poi in self.db.query(PointOfInterest).filter(
+                PointOfInterest.external_id.in_([record["external_id"] for record in records])
+            )
+        } if records else {}
+        # 兴趣点被删除等少见情况下补写缺失的部分
+        missing = [record for record in records if record["external_id"] not in existing]
+        for poi in map_service.upsert_pois(missing):
+            existing[poi.external_id] = poi
+        return [MapService.poi_to_dict(existing[record["external_id"]]) for record in records]
+
+    # 批量测距：多个起点到同一终点
+    async def distance(
+        self,
+        origins: List[Tuple[float, float]],
+        destination: Tuple[float, float],
+        distance_type: int = 1
+    ) -> List[Tuple[float, float]]:
+        """
+        :param origins: 起点列表 [(纬度, 经度), ...]，最多100个
+        :param destination: 终点 (纬度, 经度)
+        :param distance_type: 0直线距离，1驾车导航距离，3步行距离
+        :return: 与起点顺序一致的 [(距离米, 时间秒), ...]
+        """
+        params = {
+            "origins": "|".join(f"{lng:.6f},{lat:.6f}" for lat, lng in origins),
+            "destination": f"{destination[1]:.6f},{destination[0]:.6f}",
+            "type": distance_type,
+        }
+        data = await self._request("/v3/distance", params)
+
+        results: List[Tuple[float, float]] = [None] * len(origins)
+        for item in data.get("results") or []:
+            index = int(item["origin_id"]) - 1
+            results[index] = (float(item["distance"]), float(item.get("duration") or 0))
+        if any(result is None for result in results):
+            raise ExternalServiceException("高德地图测距结果不完整")
+        return results
+
+    async def _cached_get(self, kind: str, path: str, params: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        """
+        依次查询内存缓存、持久化缓存，都未命中时请求高德API
+        :return: (结果, 是否为本次从高德API获取)
+        """
+        key = content_key(kind, *sorted(f"{k}={self.normalize(v)}" for k, v in params.items()))
+
+        data = self._memory_cache.get(key)
+        if data is not None:
+            return data, False
+
+        now = datetime.now(timezone.utc)
+        cached = self.db.query(MapQueryCache).filter(MapQueryCache.key == key).first()
+        if cached is not None and self._aware(cached.expires_at) > now:
+            data = json.loads(cached.response)
+            self._memory_cache.set(key, data)
+            return data, False
+
+        data = await self._request(path, params)
+
+        # 并发请求可能同时未命中同一个键，以upsert写入，后写入的覆盖先写入的
+        statement = upsert(self.db, MapQueryCache).values(
+            key=key,
+            kind=kind,
+            response=json.dumps(data, ensure_ascii=False),
+            expires_at=now + timedelta(seconds=settings.AMAP_CACHE_TTL_SECONDS)
+        )
+        self.db.execute(statement.on_conflict_do_update(
+            index_elements=[MapQueryCache.key],
+            set_={"response": statement.excluded.response, "expires_at": statement.excluded.expires_at}
+        ))
+        self.db.commit()
+
+        self._memory_cache.set(key, data)
+        return data, True
+
+    # 静态地图图片
+    @classmethod
+    async def static_map(cls, params: Dict[str, Any]) -> bytes:
+        """
+        :param params: 高德静态地图参数（location、zoom、size、markers、paths等）
+        :return: PNG图片数据
+        """
+        response = await cls._send("/v3/staticmap", params)
+        if response.headers.get("content-type", "").startswith("image/"):
+            return response.content
+
+        # 参数错误等情况下返回JSON格式的错误信息
+        try:
+            data = response.json()
+        except ValueError:
+            data = {}
+        logger.error(f"高德静态地图错误: {data.get('infocode')} - {data.get('info')}")
+        raise ExternalServiceException(f"高德静态地图错误: {data.get('info', '未知错误')}")
+
+    async def _request(self, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """限流后请求高德API"""
+        response = await self._send(path, params)
+        data = response.json()
+        if data.get("status") != "1":
+            logger.error(f"高德地图API错误: {data.get('infocode')} - {data.get('info')}")
+            raise ExternalServiceException(f"高德地图API错误: {data.get('info', '未知错误')}")
+        return data
+
+    @classmethod
+    async def _send(cls, path: str, params: Dict[str, Any]) -> httpx.Response:
+        """限流后发送请求，网络错误或状态码异常时抛出异常"""
+        if not settings.AMAP_API_KEY:
+            raise ExternalServiceException("高德地图API密钥未配置")
+
+        await cls._rate_limiter.acquire()
+        try:
+            response = await cls.http_client().get(path, params=dict(params, key=settings.AMAP_API_KEY))
+        except httpx.HTTPError as e:
+            logger.error(f"请求高德地图API失败: {str(e)}")
+            raise ExternalServiceException(f"请求高德地图API失败: {str(e)}")
+
+        if response.status_code != 200:
+            logger.error(f"高德地图API返回错误状态码: {response.status_code}")
+            raise ExternalServiceException(f"高德地图API返回错误状态码: {response.status_code}")
+        return response
+
+    @classmethod
+    def _poi_record(cls, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """把高德POI转换为兴趣点字段"""
+        location = cls._parse_location(item.get("location"))
+        if location is None or not item.get("id"):
+            return None
+
+        rating = cls._text((item.get("biz_ext") or {}).get("rating"))
+        photos = item.get("photos") or []
+        poi_type = cls._text(item.get("type")) or ""
+
+        return {
+            "external_id": item["id"],
+            "name": item.get("name"),
+            "category": poi_type.split(";")[0] or None,
+            "latitude": location[0],
+            "longitude": location[1],
+            "address": cls._text(item.get("address")),
+            "rating": float(rating) if rating else None,
+            "image_url": photos[0].get("url") if photos else None,
+        }
+
+    @staticmethod
+    def _text(value: Any) -> Optional[str]:
+        """高德API对空字段返回空列表，统一转换为None"""
+        if isinstance(value, str) and value:
+            return value
+        return None
+
+    @staticmethod
+    def _parse_location(location: Any):
+        """解析"经度,纬度"格式的坐标，返回(纬度, 经度)"""
+        if not isinstance(location, str) or "," not in location:
+            return None
+        lng, lat = location.split(",", 1)
+        return float(lat), float(lng)
+
+    @staticmethod
+    def _aware(value: datetime) -> datetime:
+        # SQLite不保存时区信息
+        return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
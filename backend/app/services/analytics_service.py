@@ -1,13 +1,38 @@
-from typing import Dict, Any, List
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import Deque, Dict, Any, List, Optional, Sequence, Tuple, Type
+from uuid import UUID
 import asyncio
 import json
+import logging
+import time
 from fastapi import WebSocket, WebSocketDisconnect
+from sqlalchemy import distinct, func, insert
+from sqlalchemy.orm import Session
 from supabase import Client
 
-from ..core.database import get_supabase
+from ..core.config import settings
+from ..core.database import SessionLocal, get_supabase
+from ..core.metrics import (
+    ANALYTICS_EVENTS_BUFFERED,
+    ANALYTICS_EVENTS_DROPPED,
+    WEBSOCKET_CONNECTIONS,
+    WEBSOCKET_CONNECTIONS_OPENED
+)
+from ..models.analytics import AnalyticsDaily, AnalyticsEvent, AnalyticsHourly
 from ..models.message import Message, SenderType
 from ..schemas.message import MessageResponse
 
+logger = logging.getLogger(__name__)
+
+# 汇总粒度 -> (汇总表, 时间段长度)
+ROLLUPS = {
+    "hour": (AnalyticsHourly, timedelta(hours=1)),
+    "day": (AnalyticsDaily, timedelta(days=1)),
+}
+# 单次查询最多返回的时间段数
+MAX_QUERY_BUCKETS = 2000
+
 
 class RealtimeService:
     """实时服务类，处理Supabase的实时功能"""
@@ -16,7 +41,7 @@ class RealtimeService:
         try:
             self.supabase: Client = get_supabase()
         except Exception as e:
-            print(f"Supabase客户端不可用，实时功能将被禁用: {str(e)}")
+            logger.warning("Supabase客户端不可用，实时功能将被禁用: %s", e)
             self.supabase = None
         self.active_connections: Dict[str, List[WebSocket]] = {}
     
@@ -28,6 +53,8 @@ class RealtimeService:
         if chat_id not in self.active_connections:
             self.active_connections[chat_id] = []
         self.active_connections[chat_id].append(websocket)
+        WEBSOCKET_CONNECTIONS.inc()
+        WEBSOCKET_CONNECTIONS_OPENED.inc()
         
         # 只有在Supabase可用时才订阅实时消息
         if self.supabase is not None:
@@ -38,13 +65,14 @@ class RealtimeService:
                     callback=lambda payload: self._handle_new_message(chat_id, payload)
                 )
             except Exception as e:
-                print(f"订阅实时消息失败: {str(e)}")
+                logger.warning("订阅实时消息失败: %s", e)
     
     def disconnect(self, websocket: WebSocket, chat_id: str):
         """断开WebSocket连接"""
         if chat_id in self.active_connections:
             if websocket in self.active_connections[chat_id]:
                 self.active_connections[chat_id].remove(websocket)
+                WEBSOCKET_CONNECTIONS.dec()
             
             # 如果没有更多连接，取消订阅
             if not self.active_connections[chat_id]:
@@ -77,9 +105,9 @@ class RealtimeService:
                             try:
                                 await connection.send_text(message_json)
                             except Exception as e:
-                                print(f"发送消息失败: {str(e)}")
+                                logger.warning("发送消息失败: %s", e)
         except Exception as e:
-            print(f"处理实时消息失败: {str(e)}")
+            logger.exception("处理实时消息失败")
     
     async def broadcast_message(self, chat_id: str, message: MessageResponse):
         """向聊天室广播消息（用于本地消息）"""
@@ -94,4 +122,232 @@ class RealtimeService:
                 try:
                     await connection.send_text(message_json)
                 except Exception as e:
-                    print(f"发送消息失败: {str(e)}")
\ No newline at end of file
+                    logger.warning("发送消息失败: %s", e)
+
+
+class AnalyticsService:
+    """
+    统计事件：record()只写入进程内环形缓冲区，后台任务定期批量写入只追加的事件表，
+    再汇总到每小时、每日统计表；查询只读取汇总表，不扫描原始事件
+    """
+
+    # 进程内共享的事件缓冲区：(事件类型, 用户ID, 发生时间, 计量值, 附加属性)，序列化在写入时进行
+    _buffer: Deque[Tuple[str, Optional[UUID], datetime, float, Optional[Dict[str, Any]]]] = deque(
+        maxlen=settings.ANALYTICS_BUFFER_SIZE
+    )
+    _task: Optional["asyncio.Task[None]"] = None
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @classmethod
+    def record(cls, event_type: str, user_id: Optional[UUID] = None, value: float = 1, **properties: Any) -> None:
+        """
+        记录一个事件，不访问数据库，可在任意线程调用
+        :param value: 计量值，如token数，默认为1
+        :param properties: 附加属性，需可JSON序列化
+        """
+        if not settings.ANALYTICS_ENABLED:
+            return
+        if len(cls._buffer) == cls._buffer.maxlen:
+            ANALYTICS_EVENTS_DROPPED.inc()
+        cls._buffer.append((
+            event_type,
+            user_id,
+            datetime.now(timezone.utc),
+            float(value),
+            properties or None
+        ))
+
+    @classmethod
+    def flush(cls) -> int:
+        """把缓冲区中的事件分批写入事件表（阻塞操作），返回写入条数"""
+        written = 0
+        while cls._buffer:
+            batch = []
+            while cls._buffer and len(batch) < settings.ANALYTICS_FLUSH_BATCH:
+                batch.append(cls._buffer.popleft())
+            rows = [
+                {
+                    "event_type": event_type,
+                    "user_id": user_id,
+                    "occurred_at": occurred_at,
+                    "value": value,
+                    "properties": json.dumps(properties, ensure_ascii=False, default=str) if properties else None,
+                }
+                for event_type, user_id, occurred_at, value, properties in batch
+            ]
+            try:
+                with SessionLocal() as db:
+                    db.execute(insert(AnalyticsEvent), rows)
+                    db.commit()
+            except Exception as e:
+                # 不重试，避免数据库不可用时缓冲区和日志无限增长
+                ANALYTICS_EVENTS_DROPPED.inc(len(rows))
+                logger.error(f"写入统计事件失败，丢弃 {len(rows)} 条: {str(e)}")
+                break
+            written += len(rows)
+        return written
+
+    @classmethod
+    def rollup(cls, now: Optional[datetime] = None) -> None:
+        """汇总上次汇总的时间段（可能有迟到的事件）到当前时间段（阻塞操作）"""
+        now = now or datetime.now(timezone.utc)
+        with SessionLocal() as db:
+            for granularity in ROLLUPS:
+                cls._rollup(db, granularity, now)
+
+    @classmethod
+    def _rollup(cls, db: Session, granularity: str, now: datetime) -> None:
+        model, width = ROLLUPS[granularity]
+        current = _bucket_start(now, width)
+        last = db.query(func.max(model.bucket_start)).scalar()
+        if last is None:
+            last = db.query(func.min(AnalyticsEvent.occurred_at)).scalar()
+            if last is None:
+                return
+        bucket = _bucket_start(_as_utc(last), width)
+
+        while bucket <= current:
+            end = bucket + width
+            if granularity == "day" and end > now:
+                # 当天未结束时由每小时汇总累加，避免反复扫描当天的原始事件；
+                # 去重用户数暂取各小时的最大值（下限），当天结束后按原始事件重新计算
+                rows = cls._aggregate_hours(db, bucket, end)
+            else:
+                rows = cls._aggregate_events(db, bucket, end)
+
+            db.query(model).filter(model.bucket_start == bucket).delete(synchronize_session=False)
+            db.add_all(
+                model(bucket_start=bucket, event_type=event_type, count=count, value_sum=value_sum or 0, unique_users=users)
+                for event_type, count, value_sum, users in rows
+            )
+            try:
+                db.commit()
+            except Exception as e:
+                # 多个进程同时汇总同一时间段时，以先提交的为准
+                db.rollback()
+                logger.info(f"统计汇总冲突，跳过 {granularity} {bucket.isoformat()}: {str(e)}")
+            bucket = end
+
+    @staticmethod
+    def _aggregate_events(db: Session, start: datetime, end: datetime) -> List[Tuple[str, int, float, int]]:
+        return (
+            db.query(
+                AnalyticsEvent.event_type,
+                func.count(),
+                func.sum(AnalyticsEvent.value),
+                func.count(distinct(AnalyticsEvent.user_id))
+            )
+            .filter(AnalyticsEvent.occurred_at >= start, AnalyticsEvent.occurred_at < end)
+            .group_by(AnalyticsEvent.event_type)
+            .all()
+        )
+
+    @staticmethod
+    def _aggregate_hours(db: Session, start: datetime, end: datetime) -> List[Tuple[str, int, float, int]]:
+        return (
+            db.query(
+                AnalyticsHourly.event_type,
+                func.sum(AnalyticsHourly.count),
+                func.sum(AnalyticsHourly.value_sum),
+                func.max(AnalyticsHourly.unique_users)
+            )
+            .filter(AnalyticsHourly.bucket_start >= start, AnalyticsHourly.bucket_start < end)
+            .group_by(AnalyticsHourly.event_type)
+            .all()
+        )
+
+    @classmethod
+    def start(cls) -> None:
+        """启动后台写入和汇总任务"""
+        if settings.ANALYTICS_ENABLED and cls._task is None:
+            ANALYTICS_EVENTS_BUFFERED.labels().set_function(lambda: len(cls._buffer))
+            cls._task = asyncio.ensure_future(cls._run())
+
+    @classmethod
+    async def stop(cls) -> None:
+        """停止后台任务，并写入缓冲区中剩余的事件"""
+        if cls._task is None:
+            return
+        cls._task.cancel()
+        try:
+            await cls._task
+        except asyncio.CancelledError:
+            pass
+        cls._task = None
+        await asyncio.to_thread(cls.flush)
+        await asyncio.to_thread(cls.rollup)
+
+    @classmethod
+    async def _run(cls) -> None:
+        last_rollup = time.monotonic()
+        while True:
+            await asyncio.sleep(settings.ANALYTICS_FLUSH_INTERVAL_SECONDS)
+            try:
+                await asyncio.to_thread(cls.flush)
+                if time.monotonic() - last_rollup >= settings.ANALYTICS_ROLLUP_INTERVAL_SECONDS:
+                    last_rollup = time.monotonic()
+                    await asyncio.to_thread(cls.rollup)
+            except Exception as e:
+                logger.error(f"统计事件后台任务出错: {str(e)}", exc_info=True)
+
+    def series(
+        self,
+        granularity: str,
+        start: datetime,
+        end: datetime,
+        event_types: Optional[Sequence[str]] = None
+    ) -> Dict[str, Any]:
+        """
+        读取汇总表中的统计
+        :param granularity: hour或day
+        :return: {"granularity", "start", "end", "buckets": 各时间段各事件类型的统计, "totals": 各事件类型的合计}
+        """
+        model, width = ROLLUPS[granularity]
+        start = _bucket_start(_as_utc(start), width)
+        end = _as_utc(end)
+        if end <= start:
+            raise ValueError("结束时间必须晚于开始时间")
+        if (end - start) / width > MAX_QUERY_BUCKETS:
+            raise ValueError(f"查询范围过大，最多{MAX_QUERY_BUCKETS}个时间段")
+
+        query = self.db.query(model).filter(model.bucket_start >= start, model.bucket_start < end)
+        if event_types:
+            query = query.filter(model.event_type.in_(list(event_types)))
+        rows = query.order_by(model.bucket_start, model.event_type).all()
+
+        totals: Dict[str, Dict[str, float]] = {}
+        for row in rows:
+            total = totals.setdefault(row.event_type, {"count": 0, "value_sum": 0.0})
+            total["count"] += row.count
+            total["value_sum"] += row.value_sum
+        return {
+            "granularity": granularity,
+            "start": start,
+            "end": end,
+            "buckets": [
+                {
+                    "bucket_start": _as_utc(row.bucket_start),
+                    "event_type": row.event_type,
+                    "count": row.count,
+                    "value_sum": row.value_sum,
+                    "unique_users": row.unique_users,
+                }
+                for row in rows
+            ],
+            "totals": totals,
+        }
+
+
+def _as_utc(value: datetime) -> datetime:
+    """SQLite返回不带时区的时间，按UTC处理"""
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _bucket_start(value: datetime, width: timedelta) -> datetime:
+    """所在时间段的开始时间（UTC整点或UTC零点）"""
+    value = value.astimezone(timezone.utc)
+    if width >= timedelta(days=1):
+        return value.replace(hour=0, minute=0, second=0, microsecond=0)
+    return value.replace(minute=0, second=0, microsecond=0)
@@ -1,3 +1,4 @@
+import logging
 from typing import Optional, Dict, Any
 from uuid import UUID
 
@@ -9,6 +10,8 @@ from ..schemas.user import UserCreate, UserUpdate
 from ..core.database import get_supabase
 from ..core.config import settings
 
+logger = logging.getLogger(__name__)
+
 
 class AuthService:
     """认证服务类，整合Supabase Auth功能"""
@@ -17,7 +20,7 @@ class AuthService:
         try:
             self.supabase: Client = get_supabase()
         except Exception as e:
-            print(f"Supabase客户端不可用: {str(e)}")
+            logger.warning("Supabase客户端不可用: %s", e)
             self.supabase = None
     
     def _check_supabase(self):
@@ -31,7 +34,7 @@ class AuthService:
             
         try:
             # 在Supabase中创建用户
-            print(f"尝试注册用户: {email}")
+            logger.debug("尝试注册用户: %s", email)
             response = self.supabase.auth.sign_up({
                 "email": email,
                 "password": password,
@@ -40,7 +43,6 @@ class AuthService:
                     "email_confirm": True  # 禁用邮箱验证要求
                 }
             })
-            print(f"注册响应: {response}")
             
             if response.user:
                 # 用户创建成功，返回用户信息和会话
@@ -58,16 +60,15 @@ class AuthService:
         self._check_supabase()
         try:
             # 使用Supabase进行身份验证
-            print(f"尝试登录用户: {email}")
+            logger.debug("尝试登录用户: %s", email)
             response = self.supabase.auth.sign_in_with_password({
                 "email": email,
                 "password": password
             })
-            print(f"登录响应: {response}")
             
             if response.user:
                 # 登录成功，返回用户信息和会话
-                print(f"用户 {email} 登录成功")
+                logger.info("用户登录成功: %s", response.user.id)
                 return {
                     "user": response.user,
                     "session": response.session
@@ -77,7 +78,7 @@ class AuthService:
         except Exception as e:
             # 提供更详细的错误信息
             error_message = str(e)
-            print(f"登录失败详情: {error_message}")
+            logger.info("登录失败: %s", error_message)
 
             # 根据错误类型提供更具体的错误信息
             if "Invalid login credentials" in error_message:
@@ -1,5 +1,8 @@
 import json
-import httpx
+import logging
+import time
+import asyncio
+from collections import deque
 from typing import List, Optional, AsyncGenerator, Dict, Any
 from uuid import UUID
 from sqlalchemy.orm import Session
@@ -10,13 +13,27 @@ from ..models.message import Message, SenderType
 from ..schemas.chat import ChatCreate, ChatCompletionRequest
 from ..schemas.message import MessageCreate, MessageResponse
 from ..core.config import settings
-from ..services.analytics_service import RealtimeService
+from ..core.container import container
+from ..core.profiler import add_span
+from ..core.tracing import SPAN_KIND_CLIENT, inject_headers, start_span, tracer
+from ..core.metrics import LLM_ERRORS, LLM_TIME_TO_FIRST_TOKEN, LLM_TOKENS, LLM_TOKENS_PER_SECOND
+from ..services.analytics_service import AnalyticsService
+from ..services.token_usage_service import TokenUsageService
+from ..services.amap_client import AMapClient
+from ..services.map_service import MapService
+from ..utils.itinerary_parser import ItineraryStreamParser
+from ..utils.text import estimate_tokens
+
+logger = logging.getLogger(__name__)
 
 
 class ChatService:
+    # 指标中单独统计的模型名，进程内共享
+    _METRIC_MODELS = frozenset(name.strip() for name in settings.LLM_METRIC_MODELS.split(",") if name.strip())
+
     def __init__(self, db: Session):
         self.db = db
-        self.realtime_service = RealtimeService()
+        self.realtime_service = container.realtime_service
 
     # 获取用户的所有聊天
     def get_user_chats(self, user_id: UUID) -> List[Chat]:
@@ -39,7 +56,8 @@ class ChatService:
 
     # 获取特定聊天
     def get_chat(self, chat_id: UUID, user_id: UUID) -> Optional[Chat]:
-        return self.db.query(Chat).filter(Chat.id == chat_id, Chat.user_id == user_id).first()
+        with start_span("ChatService.get_chat"):
+            return self.db.query(Chat).filter(Chat.id == chat_id, Chat.user_id == user_id).first()
 
     # 更新聊天标题
     def update_chat_title(self, chat_id: UUID, user_id: UUID, title: str) -> Optional[Chat]:
@@ -72,7 +90,10 @@ class ChatService:
                 detail="聊天不存在"
             )
 
-        return self.db.query(Message).filter(Message.chat_id == chat_id).order_by(Message.timestamp.asc()).all()
+        with start_span("ChatService.get_chat_messages") as query_span:
+            messages = self.db.query(Message).filter(Message.chat_id == chat_id).order_by(Message.timestamp.asc()).all()
+            query_span.set_attribute("chat.message_count", len(messages))
+        return messages
 
     # 保存消息到数据库
     def save_message(self, chat_id: UUID, content: str, sender: SenderType) -> Message:
@@ -81,12 +102,12 @@ class ChatService:
             content=content,
             sender=sender
         )
-        self.db.add(db_message)
-        self.db.commit()
-        self.db.refresh(db_message)
+        with start_span("ChatService.save_message", {"chat.sender": sender.value}):
+            self.db.add(db_message)
+            self.db.commit()
+            self.db.refresh(db_message)
         
         # 广播消息到连接的客户端
-        import asyncio
         from ..schemas.message import MessageResponse
         
         message_response = MessageResponse(
@@ -105,8 +126,28 @@ class ChatService:
         
         return db_message
 
+    @staticmethod
+    def _with_system_prompt(messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """在消息列表前添加系统提示，开启结构化行程时附加行程输出格式要求"""
+        if settings.SYSTEM_PROMPT and messages and isinstance(messages, list) and messages[0].get("role") != "system":
+            prompt = settings.SYSTEM_PROMPT
+            if settings.CHAT_ITINERARY_ENABLED:
+                prompt = f"{prompt}\n{settings.ITINERARY_PROMPT}"
+            messages = [{"role": "system", "content": prompt}] + messages
+        return messages
+
+    @staticmethod
+    def _estimate_prompt_tokens(messages: List[Dict[str, str]]) -> int:
+        """估算请求消息的token数，每条消息另计4个token的格式开销"""
+        return sum(estimate_tokens(msg.get("content") or "") + 4 for msg in messages)
+
     # 调用AI API (GLM)
-    async def call_ai_api(self, messages: List[Dict[str, str]], model: str = None) -> Dict[str, Any]:
+    async def call_ai_api(
+        self,
+        messages: List[Dict[str, str]],
+        model: str = None,
+        user_id: Optional[UUID] = None
+    ) -> Dict[str, Any]:
         if not settings.AI_API_KEY:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -121,8 +162,7 @@ class ChatService:
         }
 
         # 添加系统提示
-        if settings.SYSTEM_PROMPT and messages and isinstance(messages, list) and messages[0].get("role") != "system":
-            messages = [{"role": "system", "content": settings.SYSTEM_PROMPT}] + messages
+        messages = self._with_system_prompt(messages)
 
         payload = {
             "model": model,
@@ -130,23 +170,40 @@ class ChatService:
             "stream": False  # 非流式请求
         }
 
-        async with httpx.AsyncClient() as client:
+        client = container.llm_client
+        with start_span("llm.chat_completions", {"gen_ai.request.model": model, "llm.stream": False}, kind=SPAN_KIND_CLIENT, stage="llm") as llm_span:
             response = await client.post(
-                "https://open.bigmodel.cn/api/paas/v4/chat/completions",
-                headers=headers,
+                f"{settings.AI_API_BASE_URL}/chat/completions",
+                headers=inject_headers(headers),
                 json=payload,
                 timeout=60.0
             )
+            llm_span.set_attribute("http.response.status_code", response.status_code)
 
             if response.status_code != 200:
                 error_detail = f"调用AI API失败 (状态码: {response.status_code}): {response.text}"
-                print(f"API调用错误: {error_detail}")  # 添加日志记录
+                logger.error("API调用错误: %s", error_detail)
                 raise HTTPException(
                     status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                     detail=error_detail
                 )
 
-            return response.json()
+            # 用量属性在span结束前设置，否则不会被导出
+            result = response.json()
+            usage = result.get("usage") or {}
+            if usage.get("total_tokens"):
+                prompt_tokens = usage.get("prompt_tokens") or 0
+                completion_tokens = usage.get("completion_tokens") or usage["total_tokens"] - prompt_tokens
+                llm_span.set_attribute("gen_ai.usage.input_tokens", prompt_tokens)
+                llm_span.set_attribute("gen_ai.usage.output_tokens", completion_tokens)
+                TokenUsageService.record(user_id, model, prompt_tokens, completion_tokens)
+            else:
+                choices = result.get("choices") or [{}]
+                content = (choices[0].get("message") or {}).get("content") or ""
+                TokenUsageService.record(
+                    user_id, model, self._estimate_prompt_tokens(messages), estimate_tokens(content), estimated=True
+                )
+        return result
 
     # 调用DeepSeek API
     async def call_deepseek_api(self, messages: List[Dict[str, str]], model: str = None) -> Dict[str, Any]:
@@ -169,26 +226,42 @@ class ChatService:
             "stream": False  # 非流式请求
         }
 
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                settings.DEEPSEEK_API_URL,
-                headers=headers,
-                json=payload,
-                timeout=60.0
-            )
+        client = container.llm_client
+        response = await client.post(
+            settings.DEEPSEEK_API_URL,
+            headers=headers,
+            json=payload,
+            timeout=60.0
+        )
 
-            if response.status_code != 200:
-                error_detail = f"调用DeepSeek API失败 (状态码: {response.status_code}): {response.text}"
-                print(f"API调用错误: {error_detail}")  # 添加日志记录
-                raise HTTPException(
-                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                    detail=error_detail
-                )
+        if response.status_code != 200:
+            error_detail = f"调用DeepSeek API失败 (状态码: {response.status_code}): {response.text}"
+            logger.error("API调用错误: %s", error_detail)
+            raise HTTPException(
+                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                detail=error_detail
+            )
 
-            return response.json()
+        return response.json()
 
     # 流式调用AI API (GLM)
-    async def stream_ai_api(self, messages: List[Dict[str, str]], model: str = None) -> AsyncGenerator[str, None]:
+    @staticmethod
+    def _metric_model(model: str) -> str:
+        """
+        指标的模型标签：模型名来自客户端请求，只有配置过的模型单独统计，其余归为other
+        :param model: 请求使用的模型名
+        :return: 指标标签值
+        """
+        if model == settings.AI_MODEL or model in ChatService._METRIC_MODELS:
+            return model
+        return "other"
+
+    async def stream_ai_api(
+        self,
+        messages: List[Dict[str, str]],
+        model: str = None,
+        user_id: Optional[UUID] = None
+    ) -> AsyncGenerator[str, None]:
         if not settings.AI_API_KEY:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -196,6 +269,7 @@ class ChatService:
             )
 
         model = model or settings.AI_MODEL
+        metric_model = self._metric_model(model)
 
         headers = {
             "Authorization": f"Bearer {settings.AI_API_KEY}",
@@ -203,8 +277,7 @@ class ChatService:
         }
 
         # 添加系统提示
-        if settings.SYSTEM_PROMPT and messages and isinstance(messages, list) and messages[0].get("role") != "system":
-            messages = [{"role": "system", "content": settings.SYSTEM_PROMPT}] + messages
+        messages = self._with_system_prompt(messages)
 
         payload = {
             "model": model,
@@ -212,46 +285,98 @@ class ChatService:
             "stream": True  # 流式请求
         }
 
-        async with httpx.AsyncClient() as client:
+        # 首个内容片段耗时和生成速度指标
+        started = time.perf_counter()
+        first_token_at = None
+        content_chunks = 0
+        completion_tokens = None
+        prompt_tokens = None
+        # 接口未返回用量时（如客户端中途断开）按已生成的内容估算
+        generated = []
+
+        # 流式生成器可能在其他上下文中被关闭，span不设为当前span，手动结束
+        llm_span = tracer.start_span(
+            "llm.chat_completions", {"gen_ai.request.model": model, "llm.stream": True}, kind=SPAN_KIND_CLIENT
+        )
+        try:
+            client = container.llm_client
             async with client.stream(
                 "POST",
-                "https://open.bigmodel.cn/api/paas/v4/chat/completions",
-                headers=headers,
+                f"{settings.AI_API_BASE_URL}/chat/completions",
+                headers=inject_headers(headers, llm_span),
                 json=payload,
                 timeout=60.0
             ) as response:
+                llm_span.set_attribute("http.response.status_code", response.status_code)
                 if response.status_code != 200:
                     error_text = await response.aread()
                     error_detail = f"调用AI API失败 (状态码: {response.status_code}): {error_text}"
-                    print(f"流式API调用错误: {error_detail}")  # 添加日志记录
+                    logger.error("流式API调用错误: %s", error_detail)
+                    LLM_ERRORS.labels(metric_model).inc()
                     raise HTTPException(
                         status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
                         detail=error_detail
                     )
 
-                async for line in response.aiter_lines():
-                    if line.startswith("data: "):
-                        data = line[6:]  # 去掉 "data: " 前缀
-                        if data == "[DONE]":
-                            break
-                        try:
-                            # 解析JSON并检查内容
-                            parsed_data = json.loads(data)
-                            # GLM API可能返回不同的结构，确保我们提取正确的内容
-                            if "choices" in parsed_data and parsed_data["choices"]:
-                                choice = parsed_data["choices"][0]
-                                if "delta" in choice and "content" in choice["delta"]:
-                                    # 构造与前端期望的格式一致的响应
-                                    formatted_data = {
-                                        "choices": [{
-                                            "delta": {
-                                                "content": choice["delta"]["content"]
-                                            }
-                                        }]
-                                    }
-                                    yield json.dumps(formatted_data)
-                        except (json.JSONDecodeError, KeyError):
-                            continue
+                try:
+                    async for line in response.aiter_lines():
+                        if line.startswith("data: "):
+                            data = line[6:]  # 去掉 "data: " 前缀
+                            if data == "[DONE]":
+                                break
+                            try:
+                                # 解析JSON并检查内容
+                                parsed_data = json.loads(data)
+                                # 最后一个数据块带有用量统计
+                                usage = parsed_data.get("usage")
+                                if usage and usage.get("completion_tokens"):
+                                    completion_tokens = usage["completion_tokens"]
+                                    prompt_tokens = usage.get("prompt_tokens")
+                                # GLM API可能返回不同的结构，确保我们提取正确的内容
+                                if "choices" in parsed_data and parsed_data["choices"]:
+                                    choice = parsed_data["choices"][0]
+                                    if "delta" in choice and "content" in choice["delta"]:
+                                        content_chunks += 1
+                                        generated.append(choice["delta"]["content"])
+                                        if first_token_at is None:
+                                            first_token_at = time.perf_counter()
+                                            LLM_TIME_TO_FIRST_TOKEN.labels(metric_model).observe(first_token_at - started)
+                                            llm_span.add_event("first_token", {"ttft_ms": (first_token_at - started) * 1000})
+                                        # 构造与前端期望的格式一致的响应
+                                        formatted_data = {
+                                            "choices": [{
+                                                "delta": {
+                                                    "content": choice["delta"]["content"]
+                                                }
+                                            }]
+                                        }
+                                        yield json.dumps(formatted_data)
+                            except (json.JSONDecodeError, KeyError):
+                                continue
+                finally:
+                    # 慢请求记录中的llm阶段，同样不使用上下文管理器
+                    add_span("llm", time.perf_counter() - started)
+                    # 客户端断开时生成器被关闭，同样记入用量
+                    estimated = completion_tokens is None
+                    if estimated:
+                        completion_tokens = estimate_tokens("".join(generated))
+                        prompt_tokens = self._estimate_prompt_tokens(messages)
+                    TokenUsageService.record(user_id, model, prompt_tokens or 0, completion_tokens, estimated=estimated)
+                    llm_span.set_attribute("gen_ai.usage.input_tokens", prompt_tokens or 0)
+                    llm_span.set_attribute("gen_ai.usage.output_tokens", completion_tokens)
+                    llm_span.set_attribute("gen_ai.usage.estimated", estimated)
+        except Exception as e:
+            llm_span.record_exception(e)
+            raise
+        finally:
+            llm_span.end()
+
+        if first_token_at is not None:
+            tokens = completion_tokens or content_chunks
+            LLM_TOKENS.labels(metric_model).inc(tokens)
+            generation_seconds = time.perf_counter() - first_token_at
+            if generation_seconds > 0 and tokens > 1:
+                LLM_TOKENS_PER_SECOND.labels(metric_model).observe((tokens - 1) / generation_seconds)
 
     # 流式调用DeepSeek API
     async def stream_deepseek_api(self, messages: List[Dict[str, str]], model: str = None) -> AsyncGenerator[str, None]:
@@ -274,32 +399,32 @@ class ChatService:
             "stream": True  # 流式请求
         }
 
-        async with httpx.AsyncClient() as client:
-            async with client.stream(
-                "POST",
-                settings.DEEPSEEK_API_URL,
-                headers=headers,
-                json=payload,
-                timeout=60.0
-            ) as response:
-                if response.status_code != 200:
-                    error_text = await response.aread()
-                    error_detail = f"调用DeepSeek API失败 (状态码: {response.status_code}): {error_text}"
-                    print(f"流式API调用错误: {error_detail}")  # 添加日志记录
-                    raise HTTPException(
-                        status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                        detail=error_detail
-                    )
+        client = container.llm_client
+        async with client.stream(
+            "POST",
+            settings.DEEPSEEK_API_URL,
+            headers=headers,
+            json=payload,
+            timeout=60.0
+        ) as response:
+            if response.status_code != 200:
+                error_text = await response.aread()
+                error_detail = f"调用DeepSeek API失败 (状态码: {response.status_code}): {error_text}"
+                logger.error("流式API调用错误: %s", error_detail)
+                raise HTTPException(
+                    status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+                    detail=error_detail
+                )
 
-                async for line in response.aiter_lines():
-                    if line.startswith("data: "):
-                        data = line[6:]  # 去掉 "data: " 前缀
-                        if data == "[DONE]":
-                            break
-                        try:
-                            yield data
-                        except json.JSONDecodeError:
-                            continue
+            async for line in response.aiter_lines():
+                if line.startswith("data: "):
+                    data = line[6:]  # 去掉 "data: " 前缀
+                    if data == "[DONE]":
+                        break
+                    try:
+                        yield data
+                    except json.JSONDecodeError:
+                        continue
 
     # 处理聊天完成请求
     async def complete_chat(self, chat_id: UUID, user_id: UUID, request: ChatCompletionRequest):
@@ -311,6 +436,9 @@ class ChatService:
                 detail="聊天不存在"
             )
 
+        # 超出配额时不保存消息，也不调用大模型
+        TokenUsageService.check_quota(user_id, db_chat.user.is_guest)
+
         # 保存用户消息
         if request.messages and request.messages[-1].role == "user":
             user_message = request.messages[-1].content
@@ -324,6 +452,7 @@ class ChatService:
 
         # 准备发送给DeepSeek API的消息
         api_messages = [{"role": msg.role, "content": msg.content} for msg in request.messages]
+        AnalyticsService.record("chat_turn", user_id, stream=request.stream, model=request.model)
 
         if request.stream:
             # 流式响应
@@ -332,35 +461,130 @@ class ChatService:
             
             async def generator():
                 nonlocal ai_content
-                async for chunk in self.stream_ai_api(api_messages, request.model):
-                    # 解析chunk并提取内容
-                    try:
-                        parsed_chunk = json.loads(chunk)
-                        if "choices" in parsed_chunk and parsed_chunk["choices"]:
-                            choice = parsed_chunk["choices"][0]
-                            if "delta" in choice and "content" in choice["delta"]:
-                                ai_content += choice["delta"]["content"]
-                    except json.JSONDecodeError:
-                        pass
-                    
-                    yield chunk
-                
-                # 流式响应完成后，保存完整的AI回复
+                # 从回复中增量解析结构化行程，攒批后在后台匹配兴趣点，匹配完成后按顺序推送itinerary_delta事件，
+                # 不阻塞正文的输出
+                parser = ItineraryStreamParser() if settings.CHAT_ITINERARY_ENABLED else None
+                pending_stops = []
+                pending_since = 0.0
+                resolving = deque()
+                try:
+                    async for chunk in self.stream_ai_api(api_messages, request.model, user_id):
+                        # 解析chunk并提取内容
+                        content = ""
+                        try:
+                            parsed_chunk = json.loads(chunk)
+                            if "choices" in parsed_chunk and parsed_chunk["choices"]:
+                                choice = parsed_chunk["choices"][0]
+                                if "delta" in choice and "content" in choice["delta"]:
+                                    content = choice["delta"]["content"]
+                                    ai_content += content
+                        except json.JSONDecodeError:
+                            pass
+
+                        yield chunk
+
+                        if parser is None:
+                            continue
+                        while resolving and resolving[0].done():
+                            yield json.dumps(resolving.popleft().result(), ensure_ascii=False)
+                        stops = parser.feed(content) if content else []
+                        if stops and not pending_stops:
+                            pending_since = time.monotonic()
+                        pending_stops.extend(stops)
+                        if pending_stops and (
+                            len(pending_stops) >= settings.ITINERARY_RESOLVE_BATCH
+                            or time.monotonic() - pending_since >= settings.ITINERARY_RESOLVE_WAIT_MS / 1000
+                            or not parser.in_block
+                        ):
+                            resolving.append(self._resolve_in_background(pending_stops))
+                            pending_stops = []
+
+                    if pending_stops:
+                        resolving.append(self._resolve_in_background(pending_stops))
+                    while resolving:
+                        await asyncio.wait([resolving[0]])
+                        yield json.dumps(resolving.popleft().result(), ensure_ascii=False)
+                finally:
+                    for task in resolving:
+                        task.cancel()
+
+                # 流式响应完成后，保存完整的AI回复（不含行程代码块）
                 if ai_content:
-                    self.save_message(chat_id, ai_content, SenderType.AI)
+                    self.save_message(chat_id, self._message_text(ai_content), SenderType.AI)
             
             return generator()
         else:
             # 非流式响应
-            response = await self.call_ai_api(api_messages, request.model)
+            response = await self.call_ai_api(api_messages, request.model, user_id)
 
             # 保存AI回复
             if "choices" in response and response["choices"]:
                 ai_content = response["choices"][0]["message"]["content"]
-                self.save_message(chat_id, ai_content, SenderType.AI)
+                self.save_message(chat_id, self._message_text(ai_content), SenderType.AI)
+
+                if settings.CHAT_ITINERARY_ENABLED:
+                    stops = ItineraryStreamParser().feed(ai_content)
+                    if stops:
+                        response["itinerary"] = (await self.resolve_itinerary(stops))["stops"]
 
             return response
 
+    @staticmethod
+    def _message_text(ai_content: str) -> str:
+        """保存的消息只包含正文，行程代码块已作为itinerary_delta事件推送；回复只有代码块时原样保存"""
+        if not settings.CHAT_ITINERARY_ENABLED:
+            return ai_content
+        return ItineraryStreamParser.strip_blocks(ai_content) or ai_content
+
+    def _resolve_in_background(self, stops: List[Dict[str, Any]]) -> "asyncio.Task[Dict[str, Any]]":
+        """在后台任务中匹配一批行程地点，匹配失败时地点不附带兴趣点"""
+        async def resolve() -> Dict[str, Any]:
+            try:
+                return await self.resolve_itinerary(stops)
+            except Exception as e:
+                logger.warning(f"行程地点匹配失败: {str(e)}")
+                return {"type": "itinerary_delta", "stops": [dict(stop, poi=None) for stop in stops]}
+
+        return asyncio.ensure_future(resolve())
+
+    # 把行程中的地点批量匹配到兴趣点
+    async def resolve_itinerary(self, stops: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        先按名称批量查询本地兴趣点表，未找到的再通过高德地图搜索（已配置密钥时）
+        :param stops: 解析出的行程地点
+        :return: itinerary_delta事件
+        """
+        found = MapService(self.db).find_pois_by_names([stop.get("name") for stop in stops])
+
+        missing = {}
+        for stop in stops:
+            name = stop.get("name")
+            if isinstance(name, str) and name and name not in found:
+                missing.setdefault(name, stop.get("city") if isinstance(stop.get("city"), str) else None)
+        if missing and settings.AMAP_API_KEY:
+            amap_client = AMapClient(self.db)
+            results = await asyncio.gather(
+                *(amap_client.search_pois(name, city, page_size=1) for name, city in missing.items()),
+                return_exceptions=True
+            )
+            for name, result in zip(missing, results):
+                if isinstance(result, list) and result:
+                    found[name] = result[0]
+
+        resolved = []
+        for stop in stops:
+            poi = found.get(stop.get("name"))
+            resolved.append(dict(stop, poi=poi and {
+                "id": str(poi["id"]),
+                "name": poi["name"],
+                "category": poi["category"],
+                "latitude": poi["latitude"],
+                "longitude": poi["longitude"],
+                "address": poi["address"],
+                "rating": poi["rating"],
+            }))
+        return {"type": "itinerary_delta", "stops": resolved}
+
     # 重新生成最后一条AI回复
     async def regenerate_last_ai_response(self, chat_id: UUID, user_id: UUID):
         # 验证用户是否有权访问此聊天
@@ -380,6 +604,8 @@ class ChatService:
                 detail="聊天记录为空，无法重新生成"
             )
 
+        TokenUsageService.check_quota(user_id, db_chat.user.is_guest)
+
         # 删除最后一条AI回复
         if messages[-1].sender == SenderType.AI:
             self.db.delete(messages[-1])
@@ -399,11 +625,12 @@ class ChatService:
             })
 
         # 调用AI API (GLM)
-        response = await self.call_ai_api(api_messages)
+        AnalyticsService.record("chat_turn", user_id, stream=False, regenerate=True)
+        response = await self.call_ai_api(api_messages, user_id=user_id)
 
         # 保存新的AI回复
         if "choices" in response and response["choices"]:
             ai_content = response["choices"][0]["message"]["content"]
-            self.save_message(chat_id, ai_content, SenderType.AI)
+            self.save_message(chat_id, self._message_text(ai_content), SenderType.AI)
 
         return response
@@ -0,0 +1,81 @@
+import time
+import logging
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..models.exchange_rate import ExchangeRate
+
+logger = logging.getLogger(__name__)
+
+
+class CurrencyService:
+    """币种换算：汇率表加载后在进程内缓存，过期后重新读取"""
+
+    # 进程内共享的汇率：(加载时间, 币种 -> 1单位折合基准币种的金额)
+    _rates: Optional[Tuple[float, Dict[str, float]]] = None
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @staticmethod
+    def default_rates() -> Dict[str, float]:
+        """解析配置中的默认汇率，格式为 币种:汇率,币种:汇率"""
+        rates = {settings.CURRENCY_BASE: 1.0}
+        for entry in settings.CURRENCY_DEFAULT_RATES.split(","):
+            currency, _, rate = entry.partition(":")
+            if currency.strip() and rate.strip():
+                rates[currency.strip().upper()] = float(rate)
+        return rates
+
+    def rates(self) -> Dict[str, float]:
+        """各币种折合基准币种的汇率，汇率表中的值覆盖默认值"""
+        entry = self._rates
+        if entry is not None and time.monotonic() - entry[0] < settings.CURRENCY_RATE_TTL_SECONDS:
+            return entry[1]
+
+        rates = self.default_rates()
+        for row in self.db.query(ExchangeRate).all():
+            rates[row.currency] = float(row.rate)
+        CurrencyService._rates = (time.monotonic(), rates)
+        return rates
+
+    def conversion(self, target: str) -> Dict[str, float]:
+        """
+        换算到目标币种的汇率
+        :return: 币种 -> 1单位折合目标币种的金额
+        """
+        rates = self.rates()
+        if target not in rates:
+            raise ValueError(f"缺少汇率: {target}")
+        return {currency: rate / rates[target] for currency, rate in rates.items()}
+
+    def set_rates(self, rates: Dict[str, float]) -> Dict[str, float]:
+        """
+        写入汇率表并使本进程的缓存失效，其他进程在CURRENCY_RATE_TTL_SECONDS内重新读取
+        :param rates: 币种 -> 1单位折合基准币种的金额
+        :return: 更新后的全部汇率
+        """
+        rates = {currency.strip().upper(): rate for currency, rate in rates.items()}
+        for currency, rate in rates.items():
+            if not currency:
+                raise ValueError("币种不能为空")
+            if currency == settings.CURRENCY_BASE:
+                raise ValueError(f"基准币种{currency}的汇率固定为1")
+            if rate <= 0:
+                raise ValueError(f"汇率必须大于0: {currency}")
+
+        existing = {
+            row.currency: row
+            for row in self.db.query(ExchangeRate).filter(ExchangeRate.currency.in_(list(rates)))
+        }
+        for currency, rate in rates.items():
+            if currency in existing:
+                existing[currency].rate = rate
+            else:
+                self.db.add(ExchangeRate(currency=currency, rate=rate))
+        self.db.commit()
+        CurrencyService._rates = None
+        logger.info(f"已更新汇率: {', '.join(sorted(rates))}")
+        return self.rates()
@@ -0,0 +1,550 @@
+import json
+import time
+import asyncio
+import logging
+import math
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy import and_, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.database import SessionLocal
+from ..models.distance_matrix import DistanceMatrix
+from ..models.poi import PointOfInterest
+from ..utils.autocomplete import PrefixIndex, rank_pois
+from ..utils.cache import LRUCache, content_key
+from ..utils.geo import (
+    bbox_around, geohash_cell_count, geohash_cells, geohash_cover, geohash_ranges, haversine_m, haversine_matrix
+)
+from ..utils.text import name_key, normalize_name
+
+logger = logging.getLogger(__name__)
+
+# 热点区域的geohash精度，5位约为4.9km x 4.9km
+REGION_PRECISION = 5
+
+# 出行方式 -> (高德测距类型, 估算用平均速度（米/秒）, 估算用道路绕行系数)
+TRAVEL_MODES = {
+    "driving": (1, 8.3, 1.3),
+    "walking": (3, 1.2, 1.2),
+}
+# 距离矩阵的坐标精度（小数位数），约0.1米
+POINT_PRECISION = 6
+# 高德批量测距单次最多起点数
+DISTANCE_BATCH_SIZE = 100
+
+
+class MapService:
+    """地图服务：兴趣点空间查询"""
+
+    # 进程内热点区域缓存：区域geohash -> (加载时间, 区域内全部兴趣点)
+    _hot_regions = LRUCache(max_items=settings.MAP_HOT_REGIONS, name="map_hot_regions")
+    # 进程内点对距离缓存：(出行方式, 点A, 点B) -> (距离米, 时间秒)，A <= B
+    _pair_cache = LRUCache(max_items=settings.MAP_PAIR_CACHE_ITEMS, name="map_pairs")
+    # 热门兴趣点名称联想索引：(构建时间, 索引)，所有请求共享，过期后在后台线程重建
+    _autocomplete_index: Optional[Tuple[float, PrefixIndex]] = None
+    _autocomplete_lock = threading.Lock()
+    _autocomplete_refreshing = False
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @staticmethod
+    def poi_to_dict(poi: PointOfInterest) -> Dict[str, Any]:
+        """把兴趣点转换为与会话无关的字典，便于进程内缓存"""
+        return {
+            "id": poi.id,
+            "name": poi.name,
+            "category": poi.category,
+            "latitude": float(poi.latitude),
+            "longitude": float(poi.longitude),
+            "geohash": poi.geohash,
+            "address": poi.address,
+            "description": poi.description,
+            "rating": float(poi.rating) if poi.rating is not None else None,
+            "image_url": poi.image_url,
+            "external_id": poi.external_id,
+        }
+
+    @classmethod
+    def invalidate_regions(cls, geohashes: Iterable[str]) -> None:
+        """兴趣点写入后使其所在的热点区域失效"""
+        for geohash in {g[:REGION_PRECISION] for g in geohashes if g}:
+            cls._hot_regions.delete(geohash)
+
+    # 按外部ID批量写入或更新兴趣点
+    def upsert_pois(self, records: List[Dict[str, Any]]) -> List[PointOfInterest]:
+        """
+        按external_id批量写入兴趣点：已存在的更新字段，不存在的新建
+        :param records: 兴趣点字段字典列表，必须包含external_id
+        :return: 与输入顺序一致的兴趣点对象
+        """
+        if not records:
+            return []
+
+        try:
+            pois = self._merge_pois(records)
+            self.db.commit()
+        except IntegrityError:
+            # 其他进程并发写入了相同的external_id，重新读取后再合并一次
+            self.db.rollback()
+            pois = self._merge_pois(records)
+            self.db.commit()
+
+        self.invalidate_regions(poi.geohash for poi in pois)
+        return pois
+
+    def _merge_pois(self, records: List[Dict[str, Any]]) -> List[PointOfInterest]:
+        external_ids = [record["external_id"] for record in records]
+        existing = {
+            poi.external_id: poi
+            for poi in self.db.query(PointOfInterest).filter(PointOfInterest.external_id.in_(external_ids))
+        }
+
+        pois = []
+        for record in records:
+            poi = existing.get(record["external_id"])
+            if poi is None:
+                poi = PointOfInterest(**record)
+                self.db.add(poi)
+                existing[record["external_id"]] = poi
+            else:
+                for field, value in record.items():
+                    if value is not None:
+                        setattr(poi, field, value)
+            pois.append(poi)
+
+        # 触发geohash计算并获得主键
+        self.db.flush()
+        return pois
+
+    # 按名称批量查找兴趣点
+    def find_pois_by_names(self, names: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        :param names: 兴趣点名称列表
+        :return: 名称 -> 兴趣点，同名时取评分最高的
+        """
+        names = list({name for name in names if name})
+        if not names:
+            return {}
+
+        query = (
+            self.db.query(PointOfInterest)
+            .filter(PointOfInterest.name.in_(names))
+            .order_by(PointOfInterest.rating.desc().nullslast())
+        )
+        found: Dict[str, Dict[str, Any]] = {}
+        for poi in query.all():
+            found.setdefault(poi.name, self.poi_to_dict(poi))
+        return found
+
+    # 兴趣点名称联想
+    def autocomplete(
+        self,
+        query: str,
+        latitude: Optional[float] = None,
+        longitude: Optional[float] = None,
+        limit: int = 10
+    ) -> List[Dict[str, Any]]:
+        """
+        按名称、全拼或拼音首字母前缀联想兴趣点，按匹配位置、评分和与地图中心的距离排序。
+        先查内存中的热门兴趣点索引，结果不足时再到数据库模糊查询
+        :param latitude: 地图中心纬度，与longitude同时提供时参与排序
+        """
+        key = name_key(query)
+        if not key:
+            return []
+        center = (latitude, longitude) if latitude is not None and longitude is not None else None
+
+        # 索引尚未构建完成时直接查询数据库，不等待构建
+        index = self.autocomplete_index()
+        candidates = index.search(key, settings.AUTOCOMPLETE_MAX_CANDIDATES) if index is not None else []
+        if index is None or (
+            not index.complete and len(candidates) < limit and len(key) >= settings.AUTOCOMPLETE_DB_MIN_CHARS
+        ):
+            seen = {poi["id"] for poi, _, _ in candidates}
+            for poi in self._query_names(normalize_name(query), limit):
+                if poi["id"] not in seen:
+                    poi_key = name_key(poi["name"])
+                    candidates.append((poi, poi_key, poi_key.startswith(key)))
+
+        return rank_pois(candidates, key, limit, center, settings.AUTOCOMPLETE_DISTANCE_SCALE_M)
+
+    @classmethod
+    def autocomplete_index(cls) -> Optional[PrefixIndex]:
+        """
+        获取联想索引，不阻塞调用方：尚未构建或已过期时在后台线程中（重新）构建，
+        构建期间返回旧索引，首次构建完成前返回None
+        """
+        entry = cls._autocomplete_index
+        if entry is None or time.monotonic() - entry[0] > settings.AUTOCOMPLETE_INDEX_TTL_SECONDS:
+            if cls._claim_autocomplete_refresh():
+                threading.Thread(target=cls._refresh_autocomplete_index, daemon=True).start()
+        return entry[1] if entry is not None else None
+
+    @classmethod
+    def warm_autocomplete(cls) -> None:
+        """在当前线程中预先构建联想索引，已有线程在构建时直接返回"""
+        if cls._claim_autocomplete_refresh():
+            cls._refresh_autocomplete_index()
+
+    @classmethod
+    def _claim_autocomplete_refresh(cls) -> bool:
+        """同一时间只允许一个线程构建索引，返回当前调用方是否获得构建权"""
+        with cls._autocomplete_lock:
+            if cls._autocomplete_refreshing:
+                return False
+            cls._autocomplete_refreshing = True
+            return True
+
+    @classmethod
+    def _refresh_autocomplete_index(cls) -> None:
+        db = SessionLocal()
+        try:
+            cls._autocomplete_index = (time.monotonic(), cls._build_autocomplete_index(db))
+        except Exception as e:
+            logger.warning(f"构建兴趣点联想索引失败: {str(e)}")
+        finally:
+            db.close()
+            cls._autocomplete_refreshing = False
+
+    @classmethod
+    def _build_autocomplete_index(cls, db: Session) -> PrefixIndex:
+        """按评分取热门兴趣点构建索引"""
+        started = time.perf_counter()
+        query = (
+            db.query(PointOfInterest)
+            .order_by(PointOfInterest.rating.desc().nullslast())
+            .limit(settings.AUTOCOMPLETE_HOT_POIS)
+        )
+        pois = [cls.poi_to_dict(poi) for poi in query.all()]
+        index = PrefixIndex(pois, complete=len(pois) < settings.AUTOCOMPLETE_HOT_POIS)
+        logger.info(
+            f"兴趣点联想索引构建完成: {len(index.pois)} 个兴趣点，{len(index)} 个检索键，"
+            f"耗时 {(time.perf_counter() - started) * 1000:.0f}ms"
+        )
+        return index
+
+    def _query_names(self, name: str, limit: int) -> List[Dict[str, Any]]:
+        """数据库名称模糊查询，PostgreSQL下由pg_trgm GIN索引支持"""
+        pattern = "%" + name.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        query = (
+            self.db.query(PointOfInterest)
+            .filter(PointOfInterest.name.ilike(pattern, escape="\\"))
+            .order_by(PointOfInterest.rating.desc().nullslast())
+            .limit(limit)
+        )
+        return [self.poi_to_dict(poi) for poi in query.all()]
+
+    # 在矩形区域内搜索兴趣点
+    def search_bbox(
+        self,
+        min_lat: float,
+        min_lng: float,
+        max_lat: float,
+        max_lng: float,
+        category: Optional[str] = None,
+        min_rating: Optional[float] = None,
+        limit: int = 100
+    ) -> List[Dict[str, Any]]:
+        candidates = self._candidates(min_lat, min_lng, max_lat, max_lng, category, min_rating)
+        candidates.sort(key=lambda poi: poi["rating"] or 0.0, reverse=True)
+        return candidates[:limit]
+
+    # 搜索指定半径内的兴趣点，按距离排序
+    def search_nearby(
+        self,
+        latitude: float,
+        longitude: float,
+        radius_m: float,
+        category: Optional[str] = None,
+        min_rating: Optional[float] = None,
+        limit: int = 50
+    ) -> List[Dict[str, Any]]:
+        min_lat, min_lng, max_lat, max_lng = bbox_around(latitude, longitude, radius_m)
+        candidates = self._candidates(
+            min_lat, min_lng, max_lat, max_lng, category, min_rating, center=(latitude, longitude)
+        )
+
+        results = []
+        for poi in candidates:
+            distance = haversine_m(latitude, longitude, poi["latitude"], poi["longitude"])
+            if distance <= radius_m:
+                results.append(dict(poi, distance=round(distance, 1)))
+        results.sort(key=lambda poi: poi["distance"])
+        return results[:limit]
+
+    def _candidates(
+        self,
+        min_lat: float,
+        min_lng: float,
+        max_lat: float,
+        max_lng: float,
+        category: Optional[str],
+        min_rating: Optional[float],
+        center: Optional[Tuple[float, float]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        返回矩形区域内满足筛选条件的兴趣点
+        :param center: 附近搜索的中心点，范围过大查询数据库时按距离而不是评分截取
+        """
+        # 先估算单元格数，范围过大（地图缩放级别很低）时不枚举单元格，直接查询数据库
+        if geohash_cell_count(min_lat, min_lng, max_lat, max_lng, REGION_PRECISION) > settings.MAP_HOT_MAX_REGIONS_PER_QUERY:
+            return self._query_bbox(min_lat, min_lng, max_lat, max_lng, category, min_rating, center)
+
+        regions = geohash_cells(min_lat, min_lng, max_lat, max_lng, REGION_PRECISION)
+
+        results = []
+        for region_pois in self._load_regions(regions):
+            for poi in region_pois:
+                if not (min_lat <= poi["latitude"] <= max_lat and min_lng <= poi["longitude"] <= max_lng):
+                    continue
+                if category is not None and poi["category"] != category:
+                    continue
+                if min_rating is not None and (poi["rating"] is None or poi["rating"] < min_rating):
+                    continue
+                results.append(poi)
+        return results
+
+    def _load_regions(self, regions: List[str]) -> List[List[Dict[str, Any]]]:
+        """从热点区域缓存读取区域内的兴趣点，未缓存或已过期的区域一次性从数据库加载"""
+        now = time.monotonic()
+        loaded: Dict[str, List[Dict[str, Any]]] = {}
+        missing = []
+        for region in regions:
+            entry = self._hot_regions.get(region)
+            if entry is not None and now - entry[0] < settings.MAP_HOT_REGION_TTL_SECONDS:
+                loaded[region] = entry[1]
+            else:
+                missing.append(region)
+
+        if missing:
+            fetched: Dict[str, List[Dict[str, Any]]] = {region: [] for region in missing}
+            query = self.db.query(PointOfInterest).filter(self._geohash_filter(geohash_ranges(missing)))
+            for poi in query.all():
+                region = (poi.geohash or "")[:REGION_PRECISION]
+                if region in fetched:
+                    fetched[region].append(self.poi_to_dict(poi))
+
+            for region, pois in fetched.items():
+                self._hot_regions.set(region, (now, pois))
+                loaded[region] = pois
+            logger.info(f"加载热点区域 {len(missing)} 个，共 {sum(len(p) for p in fetched.values())} 个兴趣点")
+
+        return [loaded[region] for region in regions]
+
+    def _query_bbox(
+        self,
+        min_lat: float,
+        min_lng: float,
+        max_lat: float,
+        max_lng: float,
+        category: Optional[str],
+        min_rating: Optional[float],
+        center: Optional[Tuple[float, float]] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        通过geohash索引范围扫描查询矩形区域内的兴趣点，再用经纬度精确过滤；
+        最多返回MAP_MAX_CANDIDATES个，指定center时取离中心最近的，否则取评分最高的
+        """
+        ranges = geohash_ranges(geohash_cover(min_lat, min_lng, max_lat, max_lng))
+        query = self.db.query(PointOfInterest).filter(
+            self._geohash_filter(ranges),
+            PointOfInterest.latitude.between(min_lat, max_lat),
+            PointOfInterest.longitude.between(min_lng, max_lng),
+        )
+        if category is not None:
+            query = query.filter(PointOfInterest.category == category)
+        if min_rating is not None:
+            query = query.filter(PointOfInterest.rating >= min_rating)
+
+        if center is not None:
+            # 等距圆柱投影下的距离平方，排序结果与实际距离一致（小范围内）
+            center_lat, center_lng = center
+            lng_scale = math.cos(math.radians(center_lat))
+            distance_order = (
+                (PointOfInterest.latitude - center_lat) * (PointOfInterest.latitude - center_lat)
+                + (PointOfInterest.longitude - center_lng) * (PointOfInterest.longitude - center_lng) * (lng_scale * lng_scale)
+            )
+            query = query.order_by(distance_order)
+        else:
+            query = query.order_by(PointOfInterest.rating.desc().nullslast())
+        query = query.limit(settings.MAP_MAX_CANDIDATES)
+        return [self.poi_to_dict(poi) for poi in query.all()]
+
+    @staticmethod
+    def _geohash_filter(ranges: List[Tuple[str, str]]):
+        """把geohash区间转换为可使用B-tree索引的范围条件"""
+        conditions = []
+        for start, end in ranges:
+            if end:
+                conditions.append(and_(PointOfInterest.geohash >= start, PointOfInterest.geohash < end))
+            else:
+                conditions.append(PointOfInterest.geohash >= start)
+        return or_(*conditions)
+
+    # 计算途经点两两之间的距离和时间
+    async def distance_matrix(
+        self,
+        points: List[Tuple[float, float]],
+        mode: str = "driving",
+        trip_id: Optional[UUID] = None,
+        day_index: int = 0,
+        commit: bool = True
+    ) -> Dict[str, Any]:
+        """
+        计算距离/时间矩阵：优先使用行程已保存的矩阵和点对缓存，缺失的点对分组批量请求高德测距，
+        高德不可用时用直线距离估算
+        :param points: 途经点 [(纬度, 经度), ...]
+        :param mode: 出行方式，driving或walking
+        :param trip_id: 所属行程，传入时结果按行程日保存
+        :param day_index: 行程日下标
+        :param commit: 保存结果后是否提交；为False时只flush，由调用方随自身的修改一起提交
+        :return: {"distances": n x n 距离（米）, "durations": n x n 时间（秒）, "source": "amap"/"estimate"/"mixed"}
+        """
+        import numpy as np
+
+        if mode not in TRAVEL_MODES:
+            raise ValueError(f"不支持的出行方式: {mode}")
+        if len(points) > settings.MAP_MATRIX_MAX_POINTS:
+            raise ValueError(f"途经点数量不能超过{settings.MAP_MATRIX_MAX_POINTS}个")
+
+        # 去重并排序，同一组点位无论顺序如何都对应同一个矩阵
+        points = [(round(lat, POINT_PRECISION), round(lng, POINT_PRECISION)) for lat, lng in points]
+        unique = sorted(set(points))
+        position = {point: i for i, point in enumerate(unique)}
+        order = np.array([position[point] for point in points], dtype=np.intp)
+        signature = content_key(mode, *(f"{lat},{lng}" for lat, lng in unique))
+
+        stored = None
+        if trip_id is not None:
+            trip_matrices = self.db.query(DistanceMatrix).filter(DistanceMatrix.trip_id == trip_id).all()
+            for matrix in trip_matrices:
+                if matrix.day_index == day_index:
+                    stored = matrix
+            if stored is not None and stored.signature == signature:
+                distances = np.array(json.loads(stored.distances))
+                durations = np.array(json.loads(stored.durations))
+                return self._matrix_result(distances, durations, order, "amap")
+            # 途经点有增减或在天之间移动，把行程已保存的结果放回点对缓存，只需请求新增的点对
+            for matrix in trip_matrices:
+                if matrix.mode == mode:
+                    self._seed_pairs(mode, json.loads(matrix.points), json.loads(matrix.distances), json.loads(matrix.durations))
+
+        distances, durations, estimated = await self._unique_matrix(unique, mode)
+        source = "amap" if estimated == 0 else ("estimate" if estimated == len(unique) * (len(unique) - 1) // 2 else "mixed")
+
+        # 只保存完全来自高德的结果，估算值下次仍尝试请求高德
+        if trip_id is not None and estimated == 0:
+            if stored is None:
+                stored = DistanceMatrix(trip_id=trip_id, day_index=day_index)
+                self.db.add(stored)
+            stored.signature = signature
+            stored.mode = mode
+            stored.points = json.dumps(unique)
+            stored.distances = json.dumps(distances.tolist())
+            stored.durations = json.dumps(durations.tolist())
+            if commit:
+                self.db.commit()
+            else:
+                self.db.flush()
+
+        return self._matrix_result(distances, durations, order, source)
+
+    async def _unique_matrix(self, points: List[Tuple[float, float]], mode: str):
+        """
+        计算已去重排序的点位之间的矩阵
+        :return: (距离矩阵, 时间矩阵, 估算的点对数)
+        """
+        import numpy as np
+        from .amap_client import AMapClient
+
+        n = len(points)
+        distances = np.zeros((n, n))
+        durations = np.zeros((n, n))
+        known = np.eye(n, dtype=bool)
+
+        # 缺失的点对：点 -> 与其缺失的点
+        missing: Dict[int, set] = {}
+        for j in range(n):
+            for i in range(j):
+                cached = self._pair_cache.get(self._pair_key(mode, points[i], points[j]))
+                if cached is None:
+                    missing.setdefault(i, set()).add(j)
+                    missing.setdefault(j, set()).add(i)
+                else:
+                    distances[i, j] = distances[j, i] = cached[0]
+                    durations[i, j] = durations[j, i] = cached[1]
+                    known[i, j] = known[j, i] = True
+
+        # 每次选缺失点对最多的点作为终点，一次请求覆盖它的全部缺失点对；
+        # 新增一个点时只需一次请求
+        groups: Dict[int, List[int]] = {}
+        while missing:
+            j = max(missing, key=lambda k: len(missing[k]))
+            origins = sorted(missing.pop(j))
+            groups[j] = origins
+            for i in origins:
+                missing[i].discard(j)
+                if not missing[i]:
+                    del missing[i]
+
+        batches = [
+            (j, origins[start:start + DISTANCE_BATCH_SIZE])
+            for j, origins in groups.items()
+            for start in range(0, len(origins), DISTANCE_BATCH_SIZE)
+        ]
+        if batches and settings.AMAP_API_KEY:
+            amap_client = AMapClient(self.db)
+            distance_type = TRAVEL_MODES[mode][0]
+            results = await asyncio.gather(
+                *(amap_client.distance([points[i] for i in origins], points[j], distance_type) for j, origins in batches),
+                return_exceptions=True
+            )
+            for (j, origins), result in zip(batches, results):
+                if isinstance(result, Exception):
+                    logger.warning(f"批量测距失败，改用直线距离估算: {str(result)}")
+                    continue
+                # 驾车和步行距离近似对称，A到B的结果同时用于B到A
+                for i, (distance, duration) in zip(origins, result):
+                    distances[i, j] = distances[j, i] = distance
+                    durations[i, j] = durations[j, i] = duration
+                    known[i, j] = known[j, i] = True
+                    self._pair_cache.set(self._pair_key(mode, points[i], points[j]), (distance, duration))
+
+        estimated = int((~known).sum()) // 2
+        if estimated:
+            _, speed, detour = TRAVEL_MODES[mode]
+            lats, lngs = zip(*points)
+            road = haversine_matrix(lats, lngs) * detour
+            distances = np.where(known, distances, road)
+            durations = np.where(known, durations, road / speed)
+        return distances, durations, estimated
+
+    @classmethod
+    def _seed_pairs(cls, mode: str, points: List[List[float]], distances: List[List[float]], durations: List[List[float]]) -> None:
+        """把已保存的矩阵写回点对缓存"""
+        points = [tuple(point) for point in points]
+        for j in range(len(points)):
+            for i in range(j):
+                cls._pair_cache.set(cls._pair_key(mode, points[i], points[j]), (distances[i][j], durations[i][j]))
+
+    @staticmethod
+    def _pair_key(mode: str, a: Tuple[float, float], b: Tuple[float, float]) -> Tuple:
+        return (mode, a, b) if a <= b else (mode, b, a)
+
+    @staticmethod
+    def _matrix_result(distances, durations, order, source: str) -> Dict[str, Any]:
+        """按请求的点位顺序（可含重复点）展开去重后的矩阵"""
+        import numpy as np
+
+        index = np.ix_(order, order)
+        return {
+            "distances": np.round(distances[index], 1).tolist(),
+            "durations": np.round(durations[index]).tolist(),
+            "source": source,
+        }
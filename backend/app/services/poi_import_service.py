@@ -0,0 +1,508 @@
+import csv
+import io
+import json
+import math
+import sys
+import time
+import uuid
+import logging
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from sqlalchemy import bindparam, func, insert, select, update
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..models.poi import PointOfInterest, POI_GEOHASH_PRECISION
+from ..utils.cache import content_key
+from ..utils.geo import EARTH_RADIUS_M, bbox_around, geohash_cells, geohash_encode, geohash_successor
+from ..utils.json_stream import JsonArrayStreamParser
+from ..utils.text import name_key, normalize_name
+from .map_service import MapService
+
+logger = logging.getLogger(__name__)
+
+# 导入文件中可能出现的列名 -> 兴趣点字段，按顺序取第一个非空值
+FIELD_ALIASES = {
+    "external_id": ("external_id", "poi_id", "amap_id", "id"),
+    "name": ("name", "名称", "title"),
+    "category": ("category", "type", "分类"),
+    "latitude": ("latitude", "lat", "纬度"),
+    "longitude": ("longitude", "lng", "lon", "经度"),
+    "address": ("address", "地址"),
+    "description": ("description", "desc", "简介"),
+    "rating": ("rating", "评分"),
+    "image_url": ("image_url", "image", "photo"),
+}
+# 文本字段的最大长度，与表结构一致
+FIELD_LENGTHS = {
+    "external_id": 100,
+    "name": 255,
+    "category": 100,
+    "address": 500,
+    "image_url": 500,
+}
+# 写入的列，id和geohash在导入时计算（批量写入不会触发ORM事件）
+COLUMNS = (
+    "id", "external_id", "name", "category", "latitude", "longitude",
+    "geohash", "address", "description", "rating", "image_url",
+)
+# 已存在时更新的列，新值为空时保留原值
+UPDATE_COLUMNS = (
+    "name", "category", "latitude", "longitude", "geohash",
+    "address", "description", "rating", "image_url",
+)
+# 按文件扩展名识别格式
+FORMATS = {
+    ".csv": "csv",
+    ".geojson": "geojson",
+    ".json": "geojson",
+    ".ndjson": "ndjson",
+    ".jsonl": "ndjson",
+}
+# GeoJSON每次读取的字符数
+READ_CHUNK_CHARS = 64 * 1024
+# 每度纬度对应的米数
+METERS_PER_DEGREE = math.radians(EARTH_RADIUS_M)
+# 查询库中附近同名兴趣点时使用的geohash精度，6位约为1.2km x 0.6km
+DEDUP_GEOHASH_PRECISION = 6
+# 查询库中附近同名兴趣点时每条语句包含的记录数
+DEDUP_QUERY_BATCH = 500
+
+
+def detect_format(path: str) -> str:
+    """根据扩展名识别导入文件格式"""
+    for extension, file_format in FORMATS.items():
+        if path.lower().endswith(extension):
+            return file_format
+    raise ValueError(f"无法识别文件格式: {path}，请指定csv、geojson或ndjson")
+
+
+def read_records(stream: TextIO, file_format: str) -> Iterator[Optional[Dict[str, Any]]]:
+    """
+    逐条读取原始记录，内存占用与文件大小无关
+    :return: 原始字段字典，无法解析的记录为None
+    """
+    if file_format == "csv":
+        yield from csv.DictReader(stream)
+    elif file_format == "ndjson":
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"无法解析的行: {line[:100]}")
+                yield None
+                continue
+            yield record if isinstance(record, dict) else None
+    elif file_format == "geojson":
+        parser = JsonArrayStreamParser('"features"')
+        while True:
+            chunk = stream.read(READ_CHUNK_CHARS)
+            if not chunk:
+                break
+            for feature in parser.feed(chunk):
+                yield _feature_record(feature)
+    else:
+        raise ValueError(f"不支持的文件格式: {file_format}")
+
+
+def _feature_record(feature: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """把GeoJSON点要素转换为原始记录"""
+    geometry = feature.get("geometry") or {}
+    coordinates = geometry.get("coordinates")
+    if geometry.get("type") != "Point" or not isinstance(coordinates, list) or len(coordinates) < 2:
+        return None
+    record = dict(feature.get("properties") or {})
+    record["longitude"], record["latitude"] = coordinates[0], coordinates[1]
+    if feature.get("id") is not None:
+        record.setdefault("external_id", feature["id"])
+    return record
+
+
+def clean_record(raw: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    把原始记录整理为兴趣点字段：规范名称、校验经纬度和评分、截断超长文本，
+    缺少external_id时按名称和位置生成稳定的ID，重复导入同一文件结果不变
+    :return: 兴趣点字段字典，缺少名称或经纬度无效时返回None
+    """
+    if not raw:
+        return None
+
+    record = {}
+    for field, aliases in FIELD_ALIASES.items():
+        value = None
+        for alias in aliases:
+            value = raw.get(alias)
+            if value not in (None, ""):
+                break
+        if isinstance(value, str):
+            value = value.strip() or None
+        record[field] = value
+
+    # 高德数据的location字段为 "经度,纬度"
+    if (record["latitude"] is None or record["longitude"] is None) and isinstance(raw.get("location"), str):
+        parts = raw["location"].split(",")
+        if len(parts) == 2:
+            record["longitude"], record["latitude"] = parts
+
+    if not record["name"]:
+        return None
+    record["name"] = normalize_name(str(record["name"]))
+    try:
+        latitude = float(record["latitude"])
+        longitude = float(record["longitude"])
+    except (TypeError, ValueError):
+        return None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180) or not record["name"]:
+        return None
+    record["latitude"], record["longitude"] = latitude, longitude
+
+    try:
+        rating = float(record["rating"]) if record["rating"] is not None else None
+    except (TypeError, ValueError):
+        rating = None
+    record["rating"] = rating if rating is not None and 0 <= rating <= 5 else None
+
+    for field in ("category", "address", "description", "image_url", "external_id"):
+        if record[field] is not None:
+            record[field] = str(record[field])
+    for field, length in FIELD_LENGTHS.items():
+        if record[field] is not None:
+            record[field] = record[field][:length]
+
+    if record["external_id"] is None:
+        record["external_id"] = "gen:" + content_key(
+            name_key(record["name"]), round(latitude, 5), round(longitude, 5)
+        )[:32]
+    record["geohash"] = geohash_encode(latitude, longitude, POI_GEOHASH_PRECISION)
+    return record
+
+
+class ImportStats:
+    """导入统计"""
+
+    def __init__(self):
+        self.read = 0
+        self.invalid = 0
+        self.duplicate_ids = 0
+        self.duplicate_nearby = 0
+        self.inserted = 0
+        self.updated = 0
+        self.started = time.monotonic()
+
+    @property
+    def written(self) -> int:
+        return self.inserted + self.updated
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.read / self.elapsed if self.elapsed > 0 else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "read": self.read,
+            "invalid": self.invalid,
+            "duplicate_ids": self.duplicate_ids,
+            "duplicate_nearby": self.duplicate_nearby,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "elapsed_seconds": round(self.elapsed, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+        }
+
+
+class ProximityDeduplicator:
+    """
+    导入过程中的去重：external_id相同，或名称相同且相距不超过radius_m的记录视为重复，保留第一条。
+    按边长radius_m的网格分桶，每条记录只与相邻9个格子中的同名记录比较，总体接近线性。
+    只登记当前块的记录，之前的块已写入数据库，由PoiImportService按块到库中查询
+    """
+
+    def __init__(self, radius_m: float):
+        self.radius_m = radius_m
+        self._external_ids = set()
+        # (行, 列) -> 名称键 -> [(纬度, 经度, external_id)]
+        self._cells: Dict[Tuple[int, int], Dict[str, List[Tuple[float, float, str]]]] = {}
+
+    def check(self, record: Dict[str, Any]) -> Optional[str]:
+        """
+        判断记录是否重复，不重复时登记该记录
+        :return: "external_id"、"nearby"，不重复时返回None
+        """
+        if record["external_id"] in self._external_ids:
+            return "external_id"
+        if self.nearby(record):
+            return "nearby"
+        self.add(record)
+        return None
+
+    def add(self, record: Dict[str, Any]) -> None:
+        """登记记录（需包含external_id、name、latitude、longitude）"""
+        latitude, longitude = record["latitude"], record["longitude"]
+        self._external_ids.add(record["external_id"])
+        self._cells.setdefault(self._cell(latitude, longitude), {}).setdefault(name_key(record["name"]), []).append(
+            (latitude, longitude, record["external_id"])
+        )
+
+    def nearby(self, record: Dict[str, Any]) -> bool:
+        """是否已登记了external_id不同、名称相同且相距不超过radius_m的记录"""
+        if self.radius_m <= 0:
+            return False
+        latitude, longitude = record["latitude"], record["longitude"]
+        key = name_key(record["name"])
+        row, col = self._cell(latitude, longitude)
+        for d_row in (-1, 0, 1):
+            for d_col in (-1, 0, 1):
+                cell = self._cells.get((row + d_row, col + d_col))
+                if not cell:
+                    continue
+                for other_lat, other_lng, other_id in cell.get(key, ()):
+                    if other_id != record["external_id"] and \
+                            self._distance(latitude, longitude, other_lat, other_lng) <= self.radius_m:
+                        return True
+        return False
+
+    def _cell(self, latitude: float, longitude: float) -> Tuple[int, int]:
+        # 等距圆柱投影到米，同一格子附近纬度差极小，各点用自身纬度的余弦即可
+        size = self.radius_m if self.radius_m > 0 else 1.0
+        y = latitude * METERS_PER_DEGREE
+        x = longitude * METERS_PER_DEGREE * math.cos(math.radians(latitude))
+        return math.floor(y / size), math.floor(x / size)
+
+    @staticmethod
+    def _distance(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+        """短距离下的等距圆柱近似距离（米）"""
+        x = math.radians(lng2 - lng1) * math.cos(math.radians((lat1 + lat2) / 2))
+        y = math.radians(lat2 - lat1)
+        return EARTH_RADIUS_M * math.hypot(x, y)
+
+
+class PoiImportService:
+    """兴趣点批量导入：流式读取、规范化、去重后分块写入"""
+
+    STAGING_TABLE = "poi_import_staging"
+
+    def __init__(self, db: Session):
+        self.db = db
+        self._staging_ready = False
+
+    def import_file(
+        self,
+        path: str,
+        file_format: Optional[str] = None,
+        chunk_size: Optional[int] = None,
+        dedup_radius_m: Optional[float] = None,
+        use_copy: bool = True
+    ) -> ImportStats:
+        """
+        导入兴趣点文件
+        :param path: 文件路径，"-"表示标准输入
+        :param file_format: csv、geojson或ndjson，为空时按扩展名识别
+        """
+        if path == "-":
+            if not file_format:
+                raise ValueError("从标准输入导入时必须指定文件格式")
+            return self.import_stream(sys.stdin, file_format, chunk_size, dedup_radius_m, use_copy)
+
+        file_format = file_format or detect_format(path)
+        # utf-8-sig 兼容带BOM的CSV
+        with open(path, encoding="utf-8-sig", newline="") as stream:
+            return self.import_stream(stream, file_format, chunk_size, dedup_radius_m, use_copy)
+
+    def import_stream(
+        self,
+        stream: TextIO,
+        file_format: str,
+        chunk_size: Optional[int] = None,
+        dedup_radius_m: Optional[float] = None,
+        use_copy: bool = True
+    ) -> ImportStats:
+        """从文本流导入兴趣点，每块单独提交"""
+        return self.import_records(
+            read_records(stream, file_format),
+            chunk_size=chunk_size,
+            dedup_radius_m=dedup_radius_m,
+            use_copy=use_copy
+        )
+
+    def import_records(
+        self,
+        records: Iterable[Optional[Dict[str, Any]]],
+        chunk_size: Optional[int] = None,
+        dedup_radius_m: Optional[float] = None,
+        use_copy: bool = True
+    ) -> ImportStats:
+        """
+        导入原始记录
+        :param use_copy: PostgreSQL（psycopg2）下使用COPY写入临时表再合并，否则逐块批量插入和更新
+        """
+        chunk_size = chunk_size or settings.POI_IMPORT_CHUNK_SIZE
+        if dedup_radius_m is None:
+            dedup_radius_m = settings.POI_IMPORT_DEDUP_RADIUS_M
+        load = self._load_copy if use_copy and self._supports_copy() else self._load_portable
+        stats = ImportStats()
+        # 块内去重在内存中进行，写入前再与库中（含之前的块）附近的同名兴趣点比较，内存占用只与块大小有关
+        deduplicator = ProximityDeduplicator(dedup_radius_m)
+
+        chunk: List[Dict[str, Any]] = []
+        for raw in records:
+            stats.read += 1
+            record = clean_record(raw)
+            if record is None:
+                stats.invalid += 1
+                continue
+            duplicate = deduplicator.check(record)
+            if duplicate == "external_id":
+                stats.duplicate_ids += 1
+                continue
+            if duplicate == "nearby":
+                stats.duplicate_nearby += 1
+                continue
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                self._write_chunk(load, chunk, dedup_radius_m, stats)
+                chunk = []
+                deduplicator = ProximityDeduplicator(dedup_radius_m)
+        if chunk:
+            self._write_chunk(load, chunk, dedup_radius_m, stats)
+
+        logger.info(f"兴趣点导入完成: {stats.as_dict()}")
+        return stats
+
+    def _write_chunk(self, load, chunk: List[Dict[str, Any]], dedup_radius_m: float, stats: ImportStats) -> None:
+        kept = self._drop_existing_nearby(chunk, dedup_radius_m)
+        stats.duplicate_nearby += len(chunk) - len(kept)
+        chunk = kept
+        try:
+            inserted, updated = load(chunk) if chunk else (0, 0)
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            raise
+        stats.inserted += inserted
+        stats.updated += updated
+        MapService.invalidate_regions(record["geohash"] for record in chunk)
+        logger.info(
+            f"已读取 {stats.read} 条，写入 {stats.written} 条（新增 {stats.inserted}），"
+            f"{stats.rows_per_second:.0f} 行/秒"
+        )
+
+    def _drop_existing_nearby(self, chunk: List[Dict[str, Any]], radius_m: float) -> List[Dict[str, Any]]:
+        """
+        去掉库中已有external_id不同、名称相同且相距不超过radius_m的兴趣点的记录，
+        按geohash区间和名称分批查询候选
+        """
+        if radius_m <= 0 or not chunk:
+            return chunk
+
+        table = PointOfInterest.__table__
+        existing = ProximityDeduplicator(radius_m)
+        # 按geohash排序后分批，每批查询覆盖其所有记录附近单元格的一段连续geohash区间
+        ordered = sorted(chunk, key=lambda record: record["geohash"])
+        for i in range(0, len(ordered), DEDUP_QUERY_BATCH):
+            batch = ordered[i:i + DEDUP_QUERY_BATCH]
+            cells = set()
+            for record in batch:
+                cells.update(geohash_cells(
+                    *bbox_around(record["latitude"], record["longitude"], radius_m), DEDUP_GEOHASH_PRECISION
+                ))
+            end = geohash_successor(max(cells))
+            query = select(table.c.external_id, table.c.name, table.c.latitude, table.c.longitude).where(
+                table.c.name.in_({record["name"] for record in batch}),
+                table.c.geohash >= min(cells)
+            )
+            if end:
+                query = query.where(table.c.geohash < end)
+            rows = self.db.execute(query)
+            for external_id, name, latitude, longitude in rows:
+                existing.add({
+                    "external_id": external_id, "name": name, "latitude": float(latitude), "longitude": float(longitude)
+                })
+        return [record for record in chunk if not existing.nearby(record)]
+
+    def _supports_copy(self) -> bool:
+        bind = self.db.get_bind()
+        return bind.dialect.name == "postgresql" and bind.dialect.driver == "psycopg2"
+
+    def _load_copy(self, chunk: List[Dict[str, Any]]) -> Tuple[int, int]:
+        """
+        COPY写入会话级临时表后用一条 INSERT ... ON CONFLICT 合并，
+        临时表在每次提交时清空
+        :return: (新增数, 更新数)
+        """
+        connection = self.db.connection()
+        if not self._staging_ready:
+            connection.exec_driver_sql(
+                f"CREATE TEMP TABLE IF NOT EXISTS {self.STAGING_TABLE} "
+                f"(LIKE {PointOfInterest.__tablename__} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS"
+            )
+            self._staging_ready = True
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for record in chunk:
+            writer.writerow([uuid.uuid4() if column == "id" else record[column] for column in COLUMNS])
+        buffer.seek(0)
+
+        columns = ", ".join(COLUMNS)
+        cursor = connection.connection.cursor()
+        try:
+            cursor.copy_expert(f"COPY {self.STAGING_TABLE} ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+        finally:
+            cursor.close()
+
+        table = PointOfInterest.__tablename__
+        assignments = ", ".join(
+            f"{column} = COALESCE(EXCLUDED.{column}, {table}.{column})" for column in UPDATE_COLUMNS
+        )
+        # xmax为0的行是新插入的
+        inserted, total = connection.exec_driver_sql(
+            f"WITH upserted AS ("
+            f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {self.STAGING_TABLE} "
+            f"ON CONFLICT (external_id) DO UPDATE SET {assignments}, updated_at = now() "
+            f"RETURNING (xmax = 0) AS inserted"
+            f") SELECT count(*) FILTER (WHERE inserted), count(*) FROM upserted"
+        ).one()
+        return inserted, total - inserted
+
+    def _load_portable(self, chunk: List[Dict[str, Any]]) -> Tuple[int, int]:
+        """
+        通用写入：查出已存在的external_id，新记录批量插入，已存在的批量更新
+        :return: (新增数, 更新数)
+        """
+        table = PointOfInterest.__table__
+        external_ids = [record["external_id"] for record in chunk]
+        existing = set(self.db.execute(
+            select(table.c.external_id).where(table.c.external_id.in_(external_ids))
+        ).scalars())
+
+        new_rows = []
+        changed_rows = []
+        for record in chunk:
+            if record["external_id"] in existing:
+                changed_rows.append({f"b_{column}": record[column] for column in ("external_id",) + UPDATE_COLUMNS})
+            else:
+                new_rows.append({"id": uuid.uuid4(), **{column: record[column] for column in COLUMNS[1:]}})
+
+        if new_rows:
+            self.db.execute(insert(table), new_rows)
+        if changed_rows:
+            statement = (
+                update(table)
+                .where(table.c.external_id == bindparam("b_external_id"))
+                .values(
+                    updated_at=func.now(),
+                    **{
+                        column: func.coalesce(bindparam(f"b_{column}"), table.c[column])
+                        for column in UPDATE_COLUMNS
+                    }
+                )
+            )
+            self.db.connection().execute(statement, changed_rows)
+        return len(new_rows), len(changed_rows)
@@ -5,28 +5,38 @@ import hashlib
 import time
 import hmac
 import asyncio
-import websockets
 import logging
-from typing import Dict, Any, Optional
+from typing import BinaryIO, Dict, Any, List, Optional, Tuple, Union
 import io
+import os
+import tempfile
 import wave
 import struct
-import numpy as np
+import subprocess
+from urllib.parse import quote, urlsplit
 
 from ..core.config import settings
+from ..core.metrics import ASR_STAGE_DURATION
+from ..core.tracing import SPAN_KIND_CLIENT, start_span
+from ..utils.cache import DiskCache, LRUCache, content_key
 
 # 设置日志
 logger = logging.getLogger(__name__)
 
 class SpeechService:
-    """科大讯飞语音识别服务 - 改进版"""
+    """科大讯飞语音识别与合成服务 - 改进版"""
+
+    # 科大讯飞单个听写会话最长60秒音频
+    MAX_SESSION_SECONDS = 60
+    # 限制同时打开的识别会话数，进程内共享
+    _session_semaphore: Optional[asyncio.Semaphore] = None
 
     @staticmethod
-    def generate_auth_url():
-        """生成科大讯飞API鉴权URL"""
-        url = "wss://iat-api.xfyun.cn/v2/iat"
-        host = "iat-api.xfyun.cn"
-        path = "/v2/iat"
+    def generate_auth_url(url: Optional[str] = None):
+        """生成科大讯飞API鉴权URL，默认为语音听写接口"""
+        url = url or settings.XUNFEI_IAT_URL
+        parts = urlsplit(url)
+        host, path = parts.netloc, parts.path
 
         # 生成RFC1123格式的日期
         date = time.strftime('%a, %d %b %Y %H:%M:%S GMT', time.gmtime())
@@ -55,138 +65,364 @@ class SpeechService:
         }
 
         # 拼接鉴权URL
-        from urllib.parse import quote
         url = f"{url}?{ '&'.join([f'{k}={quote(v[k])}' for k in v])}"
         return url
 
+    @staticmethod
+    def warm_up() -> Dict[str, float]:
+        """
+        预加载音频处理依赖并预热librosa解码路径（触发numba JIT编译）
+        该方法是阻塞的，应在线程池中执行
+        :return: 各阶段耗时（秒）
+        """
+        timings: Dict[str, float] = {}
+
+        start = time.perf_counter()
+        import numpy as np
+        timings["numpy"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        import websockets  # noqa: F401
+        timings["websockets"] = time.perf_counter() - start
+
+        try:
+            start = time.perf_counter()
+            import librosa
+            import soundfile as sf
+            timings["librosa"] = time.perf_counter() - start
+
+            # 用一段静音走一遍与convert_to_pcm相同的加载和重采样路径
+            start = time.perf_counter()
+            buffer = io.BytesIO()
+            sf.write(buffer, np.zeros(800, dtype=np.float32), 8000, format='WAV', subtype='PCM_16')
+            buffer.seek(0)
+            librosa.load(buffer, sr=16000, mono=True)
+            timings["librosa_jit"] = time.perf_counter() - start
+        except ImportError as e:
+            logger.warning(f"音频处理库未安装，跳过librosa预热: {str(e)}")
+
+        logger.info(
+            "音频依赖预热完成: " + ", ".join(f"{name}={seconds * 1000:.0f}ms" for name, seconds in timings.items())
+        )
+        return timings
+
     @staticmethod
     def convert_to_pcm(audio_data: bytes, input_format: str = "webm") -> bytes:
         """
         将音频数据转换为PCM格式
         :param audio_data: 原始音频数据
         :param input_format: 输入格式，支持webm和wav
-        :return: PCM格式的音频数据
+        :return: PCM格式的音频数据，转换失败时返回原始数据
         """
+        # 如果已经是PCM格式，直接返回
+        if input_format == "pcm":
+            return audio_data
+
+        # 解码器从文件读取，先写入临时文件
+        with tempfile.NamedTemporaryFile(suffix='.wav' if input_format == "wav" else '.webm', delete=False) as temp_file:
+            temp_file.write(audio_data)
+            temp_file_path = temp_file.name
+
+        try:
+            pcm_data = SpeechService.convert_file_to_pcm(temp_file_path, input_format)
+        finally:
+            os.unlink(temp_file_path)
+
+        # 转换失败时返回原始数据，让API尝试处理
+        return pcm_data if pcm_data is not None else audio_data
+
+    @staticmethod
+    def convert_file_to_pcm(audio_file: Union[str, BinaryIO], input_format: str = "webm") -> Optional[bytes]:
+        """
+        将音频文件解码为16kHz单声道16位PCM数据
+        该方法是阻塞的，在异步代码中应放到线程池执行
+        :param audio_file: 音频文件路径，或可定位的二进制文件对象（如上传时已缓存的文件）
+        :param input_format: 输入格式，支持webm、wav和pcm
+        :return: PCM格式的音频数据，无法转换时返回None
+        """
+        # 如果已经是PCM格式，直接读取
+        if input_format == "pcm":
+            return SpeechService._read_audio_file(audio_file)
+
         try:
             import librosa
-            import soundfile as sf
-            import tempfile
-            import os
-            
-            # 如果已经是PCM格式，直接返回
-            if input_format == "pcm":
-                return audio_data
-                
-            # 创建临时文件
-            with tempfile.NamedTemporaryFile(suffix='.wav' if input_format == "wav" else '.webm', delete=False) as temp_file:
-                temp_file.write(audio_data)
-                temp_file_path = temp_file.name
-            
-            try:
-                # 使用librosa加载音频
-                # 确保采样率为16kHz，单声道
-                y, sr = librosa.load(temp_file_path, sr=16000, mono=True)
-                
-                # 创建另一个临时文件用于保存PCM数据
-                with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as pcm_file:
-                    pcm_file_path = pcm_file.name
-                
-                # 保存为WAV格式（PCM编码）
-                sf.write(pcm_file_path, y, sr, format='WAV', subtype='PCM_16')
-                
-                # 读取PCM数据
-                with open(pcm_file_path, 'rb') as f:
-                    # 跳过WAV文件头（44字节）
-                    f.seek(44)
-                    pcm_data = f.read()
-                
-                # 删除临时文件
-                os.unlink(temp_file_path)
-                os.unlink(pcm_file_path)
-                
-                return pcm_data
-                
-            except Exception as e:
-                logger.error(f"使用librosa处理音频失败: {str(e)}", exc_info=True)
-                # 删除临时文件
-                if os.path.exists(temp_file_path):
-                    os.unlink(temp_file_path)
-                raise
-            
+            import numpy as np
+
+            # 使用librosa加载音频
+            # 确保采样率为16kHz，单声道
+            if not isinstance(audio_file, str):
+                audio_file.seek(0)
+            y, sr = librosa.load(audio_file, sr=16000, mono=True)
+
+            # 直接量化为16位PCM，不再经过中间WAV文件
+            return (np.clip(y, -1.0, 1.0) * 32767).astype('<i2').tobytes()
+
         except ImportError as e:
             logger.warning(f"音频处理库未安装，使用简化处理: {str(e)}")
-            return SpeechService._simple_convert_to_pcm(audio_data, input_format)
+            return SpeechService._simple_convert_file_to_pcm(audio_file, input_format)
         except Exception as e:
-            logger.error(f"音频格式转换失败: {str(e)}", exc_info=True)
+            logger.error(f"使用librosa处理音频失败: {str(e)}", exc_info=True)
             # 如果是WebM格式，尝试使用ffmpeg直接转换
             if input_format == "webm":
                 try:
                     logger.info("尝试使用ffmpeg直接转换WebM格式")
-                    return SpeechService._convert_webm_with_ffmpeg(audio_data)
+                    return SpeechService._convert_file_with_ffmpeg(audio_file)
                 except Exception as ffmpeg_e:
                     logger.error(f"使用ffmpeg转换WebM失败: {str(ffmpeg_e)}", exc_info=True)
-            # 转换失败时返回原始数据，让API尝试处理
-            return audio_data
-        except Exception as e:
-            logger.error(f"音频格式转换失败: {str(e)}")
-            # 转换失败时返回原始数据，让API尝试处理
-            return audio_data
-    
+            return None
+
+    @staticmethod
+    def _read_audio_file(audio_file: Union[str, BinaryIO]) -> bytes:
+        """
+        读取音频文件的全部内容
+        :param audio_file: 音频文件路径或二进制文件对象
+        :return: 文件内容
+        """
+        if isinstance(audio_file, str):
+            with open(audio_file, 'rb') as f:
+                return f.read()
+        audio_file.seek(0)
+        return audio_file.read()
+
     @staticmethod
-    def _simple_convert_to_pcm(audio_data: bytes, input_format: str = "webm") -> bytes:
+    def _simple_convert_file_to_pcm(audio_file: Union[str, BinaryIO], input_format: str = "webm") -> Optional[bytes]:
         """
         简化的音频格式转换方法，不依赖外部库
-        :param audio_data: 原始音频数据
+        :param audio_file: 音频文件路径或二进制文件对象
         :param input_format: 输入格式，支持webm和wav
-        :return: PCM格式的音频数据
+        :return: PCM格式的音频数据，无法转换时返回None
         """
+        # 如果是WebM格式，需要特殊处理
+        # 这里简化处理，实际项目中应使用ffmpeg或其他库进行转换
+        if input_format != "wav":
+            logger.warning("WebM格式音频可能无法正确处理，建议使用WAV格式")
+            return None
+
+        # 如果是WAV格式，提取PCM数据
         try:
-            # 如果已经是PCM格式，直接返回
-            if input_format == "pcm":
+            if not isinstance(audio_file, str):
+                audio_file.seek(0)
+            with wave.open(audio_file, 'rb') as wav:
+                # 获取音频参数
+                n_channels = wav.getnchannels()
+                framerate = wav.getframerate()
+                n_frames = wav.getnframes()
+
+                # 读取音频数据
+                audio_data = wav.readframes(n_frames)
+
+                # 如果不是单声道，转换为单声道
+                if n_channels > 1:
+                    import numpy as np
+                    # 将多声道转换为单声道
+                    audio_data = np.frombuffer(audio_data, dtype=np.int16)
+                    audio_data = audio_data.reshape(-1, n_channels)
+                    audio_data = np.mean(audio_data, axis=1).astype(np.int16)
+                    audio_data = audio_data.tobytes()
+
+                # 如果采样率不是16kHz，进行重采样
+                if framerate != 16000:
+                    # 这里简化处理，实际应用中应使用专业的重采样算法
+                    logger.warning(f"音频采样率为{framerate}Hz，不是期望的16000Hz，可能影响识别效果")
+
                 return audio_data
-                
-            # 如果是WAV格式，提取PCM数据
-            if input_format == "wav":
-                try:
-                    # 使用io.BytesIO将字节数据转换为文件对象
-                    wav_file = io.BytesIO(audio_data)
-                    with wave.open(wav_file, 'rb') as wav:
-                        # 获取音频参数
-                        n_channels = wav.getnchannels()
-                        sampwidth = wav.getsampwidth()
-                        framerate = wav.getframerate()
-                        n_frames = wav.getnframes()
-                        
-                        # 读取音频数据
-                        audio_data = wav.readframes(n_frames)
-                        
-                        # 如果不是单声道，转换为单声道
-                        if n_channels > 1:
-                            # 将多声道转换为单声道
-                            audio_data = np.frombuffer(audio_data, dtype=np.int16)
-                            audio_data = audio_data.reshape(-1, n_channels)
-                            audio_data = np.mean(audio_data, axis=1).astype(np.int16)
-                            audio_data = audio_data.tobytes()
-                        
-                        # 如果采样率不是16kHz，进行重采样
-                        if framerate != 16000:
-                            # 这里简化处理，实际应用中应使用专业的重采样算法
-                            logger.warning(f"音频采样率为{framerate}Hz，不是期望的16000Hz，可能影响识别效果")
-                        
-                        return audio_data
-                except Exception as e:
-                    logger.error(f"处理WAV格式音频失败: {str(e)}")
-                    raise
-            
-            # 如果是WebM格式，需要特殊处理
-            # 这里简化处理，实际项目中应使用ffmpeg或其他库进行转换
-            logger.warning("WebM格式音频可能无法正确处理，建议使用WAV格式")
-            return audio_data
-            
         except Exception as e:
-            logger.error(f"音频格式转换失败: {str(e)}")
-            # 转换失败时返回原始数据，让API尝试处理
-            return audio_data
+            logger.error(f"处理WAV格式音频失败: {str(e)}")
+            return None
+
+    @staticmethod
+    def _frame_features(pcm_data: bytes, sample_rate: int = 16000, frame_ms: int = 20):
+        """
+        计算每帧的均方根能量和过零率
+        :return: (energy, zcr) 两个长度为帧数的numpy数组
+        """
+        import numpy as np
+
+        frame_len = sample_rate * frame_ms // 1000
+        samples = np.frombuffer(pcm_data, dtype=np.int16, count=len(pcm_data) // 2)
+        n_frames = len(samples) // frame_len
+        frames = samples[:n_frames * frame_len].reshape(n_frames, frame_len).astype(np.float32)
+
+        energy = np.sqrt(np.mean(frames * frames, axis=1)) if n_frames else np.zeros(0, dtype=np.float32)
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / frame_len
+        return energy, zcr
+
+    @staticmethod
+    def detect_speech_segments(
+        pcm_data: bytes,
+        sample_rate: int = 16000,
+        frame_ms: int = 20,
+        min_silence_ms: Optional[int] = None,
+        min_speech_ms: int = 100,
+        padding_ms: int = 200
+    ) -> List[Tuple[int, int]]:
+        """
+        基于短时能量和过零率的语音端点检测
+        :param pcm_data: 16位单声道PCM音频数据
+        :param sample_rate: 采样率
+        :param frame_ms: 分析帧长（毫秒）
+        :param min_silence_ms: 短于该时长的静音不切分，默认取配置SPEECH_VAD_MIN_SILENCE_MS
+        :param min_speech_ms: 短于该时长的语音段视为噪声丢弃
+        :param padding_ms: 每个语音段前后保留的余量，避免切掉字头字尾
+        :return: 语音段在pcm_data中的字节区间列表 [(start, end), ...]
+        """
+        import numpy as np
+
+        if min_silence_ms is None:
+            min_silence_ms = settings.SPEECH_VAD_MIN_SILENCE_MS
+
+        energy, zcr = SpeechService._frame_features(pcm_data, sample_rate, frame_ms)
+        n_frames = len(energy)
+        if n_frames == 0:
+            return []
+        frame_len = sample_rate * frame_ms // 1000
+
+        # 以能量较低的10%帧估计底噪，阈值不超过峰值能量的一半，保证整段都是语音时不被误判
+        noise_floor = float(np.percentile(energy, 10))
+        threshold = max(
+            settings.SPEECH_VAD_MIN_ENERGY,
+            min(noise_floor * settings.SPEECH_VAD_ENERGY_RATIO, float(energy.max()) * 0.5)
+        )
+        # 清辅音能量低但过零率高，适当放宽能量阈值
+        voiced = (energy > threshold) | ((energy > threshold * 0.5) & (zcr > 0.25))
+
+        # 找出连续语音帧的起止位置
+        edges = np.diff(np.concatenate(([0], voiced.astype(np.int8), [0])))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        if len(starts) == 0:
+            return []
+
+        # 合并间隔短于最小静音时长的语音段
+        min_silence_frames = max(1, min_silence_ms // frame_ms)
+        merged: List[List[int]] = [[int(starts[0]), int(ends[0])]]
+        for start, end in zip(starts[1:], ends[1:]):
+            if start - merged[-1][1] < min_silence_frames:
+                merged[-1][1] = int(end)
+            else:
+                merged.append([int(start), int(end)])
+
+        min_speech_frames = max(1, min_speech_ms // frame_ms)
+        padding_frames = padding_ms // frame_ms
+        frame_bytes = frame_len * 2
+
+        segments: List[Tuple[int, int]] = []
+        for start, end in merged:
+            if end - start < min_speech_frames:
+                continue
+            start = max(0, start - padding_frames) * frame_bytes
+            end = min(len(pcm_data), min(n_frames, end + padding_frames) * frame_bytes)
+            # 余量可能使相邻语音段重叠，此时合并
+            if segments and start <= segments[-1][1]:
+                segments[-1] = (segments[-1][0], end)
+            else:
+                segments.append((start, end))
+
+        return segments
+
+    @staticmethod
+    def trim_silence(pcm_data: bytes, sample_rate: int = 16000) -> bytes:
+        """
+        去除首尾静音
+        :param pcm_data: 16位单声道PCM音频数据
+        :param sample_rate: 采样率
+        :return: 去除首尾静音后的PCM数据，未检测到语音时返回空字节串
+        """
+        segments = SpeechService.detect_speech_segments(pcm_data, sample_rate)
+        if not segments:
+            return b""
+        return pcm_data[segments[0][0]:segments[-1][1]]
+
+    @staticmethod
+    def plan_segments(pcm_data: bytes, sample_rate: int = 16000, use_vad: bool = True) -> List[Tuple[int, int]]:
+        """
+        规划识别分段：去除静音后在语句间隙处切分，把相邻语句拼成不超过目标时长的分段；
+        没有停顿的长语句在能量最低处强制切分，并与上一段保留少量重叠，合并结果时去重
+        :param pcm_data: 16位单声道PCM音频数据
+        :param sample_rate: 采样率
+        :param use_vad: 是否做端点检测，否则只按时长切分
+        :return: 按时间顺序排列的分段字节区间，未检测到语音时返回空列表
+        """
+        import numpy as np
+
+        frame_ms = 20
+        frame_bytes = sample_rate * frame_ms // 1000 * 2
+        bytes_per_second = sample_rate * 2
+
+        if use_vad:
+            speech = SpeechService.detect_speech_segments(pcm_data, sample_rate, frame_ms)
+            if not speech:
+                return []
+        else:
+            speech = [(0, len(pcm_data))]
+
+        total_bytes = speech[-1][1] - speech[0][0]
+        if not settings.SPEECH_VAD_SPLIT or total_bytes < settings.SPEECH_VAD_SPLIT_MIN_SECONDS * bytes_per_second:
+            # 单个会话有60秒上限，不切分时也需要按时长切分
+            if total_bytes <= SpeechService.MAX_SESSION_SECONDS * bytes_per_second:
+                return [(speech[0][0], speech[-1][1])]
+            speech = [(speech[0][0], speech[-1][1])]
+
+        # 单个会话时长上限为60秒，目标时长须留有余量
+        target_bytes = min(settings.SPEECH_SEGMENT_SECONDS, SpeechService.MAX_SESSION_SECONDS - 5) * bytes_per_second
+        target_bytes -= target_bytes % frame_bytes
+        overlap_bytes = settings.SPEECH_SEGMENT_OVERLAP_MS // frame_ms * frame_bytes
+        energy = None
+
+        segments: List[Tuple[int, int]] = []
+        for start, end in speech:
+            # 与上一段合并后不超过目标时长则合并（中间的静音一并发送，开销很小）
+            if segments and end - segments[-1][0] <= target_bytes:
+                segments[-1] = (segments[-1][0], end)
+                continue
+
+            # 过长的语句在后半窗口内能量最低的帧处切分
+            while end - start > target_bytes:
+                if energy is None:
+                    energy, _ = SpeechService._frame_features(pcm_data, sample_rate, frame_ms)
+                window_start = (start + target_bytes // 2) // frame_bytes
+                window_end = (start + target_bytes) // frame_bytes
+                cut = (window_start + int(np.argmin(energy[window_start:window_end]))) * frame_bytes
+                segments.append((start, cut))
+                start = max(cut - overlap_bytes, segments[-1][0] + frame_bytes)
+            segments.append((start, end))
+
+        return segments
+
+    @staticmethod
+    def merge_transcripts(texts: List[str], overlapped: List[bool], max_overlap_chars: int = 10) -> str:
+        """
+        按顺序拼接各分段的识别结果，去除重叠音频造成的重复文字
+        :param texts: 各分段的识别文本
+        :param overlapped: 每个分段是否与上一段存在音频重叠
+        :param max_overlap_chars: 最多检查的重复字符数
+        :return: 合并后的文本
+        """
+        punctuation = "，。！？、,.!? "
+        merged = ""
+        for text, has_overlap in zip(texts, overlapped):
+            if merged and has_overlap and text:
+                # 重叠部分在上一段末尾和下一段开头各识别了一次，比较时忽略标点
+                head = merged.rstrip(punctuation)
+                tail = text.lstrip(punctuation)
+                for size in range(min(len(head), len(tail), max_overlap_chars), 0, -1):
+                    if head[-size:] == tail[:size]:
+                        merged = head
+                        text = tail[size:]
+                        break
+            merged += text
+        return merged
+
+    @staticmethod
+    def input_format_for(content_type: str) -> str:
+        """根据内容类型确定输入音频格式"""
+        content_type = (content_type or "").split(";")[0].strip().lower()
+        if content_type in ("audio/wav", "audio/x-wav", "audio/wave"):
+            return "wav"
+        if content_type in ("audio/pcm", "audio/l16"):
+            return "pcm"
+        return "webm"
 
     @staticmethod
     async def speech_to_text(audio_data: bytes, content_type: str = "audio/webm") -> Dict[str, Any]:
@@ -196,6 +432,23 @@ class SpeechService:
         :param content_type: 音频内容类型
         :return: 包含识别结果的字典
         """
+        with tempfile.NamedTemporaryFile(delete=False) as temp_file:
+            temp_file.write(audio_data)
+            temp_file_path = temp_file.name
+
+        try:
+            return await SpeechService.speech_to_text_file(temp_file_path, content_type)
+        finally:
+            os.unlink(temp_file_path)
+
+    @staticmethod
+    async def speech_to_text_file(audio_file: Union[str, BinaryIO], content_type: str = "audio/webm") -> Dict[str, Any]:
+        """
+        将音频文件转换为文本，上传的音频无需整体读入内存
+        :param audio_file: 音频文件路径或可定位的二进制文件对象，支持webm和WAV格式
+        :param content_type: 音频内容类型
+        :return: 包含识别结果的字典
+        """
         if not all([settings.XUNFEI_APP_ID, settings.XUNFEI_API_KEY, settings.XUNFEI_API_SECRET]):
             logger.error("科大讯飞API配置不完整")
             return {
@@ -203,43 +456,113 @@ class SpeechService:
                 "error": "科大讯飞API配置不完整，请检查环境变量XUNFEI_APP_ID、XUNFEI_API_KEY和XUNFEI_API_SECRET"
             }
 
-        try:
-            # 获取鉴权URL
-            auth_url = SpeechService.generate_auth_url()
-            logger.info(f"连接到科大讯飞API: {auth_url[:50]}...")
+        started = time.perf_counter()
+        with start_span("SpeechService.speech_to_text", {"audio.content_type": content_type}) as asr_span:
+            try:
+                input_format = SpeechService.input_format_for(content_type)
 
-            # 将音频数据转换为PCM格式
-            input_format = "webm"
-            if content_type == "audio/wav":
-                input_format = "wav"
-            elif content_type == "audio/x-wav":
-                input_format = "wav"
-            elif content_type == "audio/webm":
-                input_format = "webm"
+                # 解码是CPU密集的阻塞操作，放到线程池执行，避免阻塞事件循环
+                with ASR_STAGE_DURATION.labels("decode").time(), start_span("asr.decode", {"audio.format": input_format}, stage="asr_decode"):
+                    pcm_audio_data = await asyncio.to_thread(SpeechService.convert_file_to_pcm, audio_file, input_format)
+
+                if pcm_audio_data is None:
+                    # 转换失败时整段发送原始编码数据，让API尝试处理，无法切分
+                    logger.error("音频格式转换失败，使用原始数据")
+                    raw_data = await asyncio.to_thread(SpeechService._read_audio_file, audio_file)
+                    return await SpeechService._recognize_pcm_pooled(raw_data)
+
+                logger.info(f"音频格式转换完成，转换后大小: {len(pcm_audio_data)} bytes")
+
+                with ASR_STAGE_DURATION.labels("vad").time(), start_span("asr.vad", stage="asr_vad") as vad_span:
+                    segments = SpeechService.plan_segments(pcm_audio_data, use_vad=settings.SPEECH_VAD_ENABLED)
+                    vad_span.set_attribute("asr.segments", len(segments))
+                if not segments:
+                    logger.info("未检测到有效语音，跳过识别")
+                    return {
+                        "success": True,
+                        "text": "",
+                        "status": "completed"
+                    }
+                logger.info(
+                    f"分段规划完成，有效语音 {segments[-1][1] - segments[0][0]} / {len(pcm_audio_data)} bytes，"
+                    f"共 {len(segments)} 段"
+                )
+
+                # 分段使用内存视图，不复制音频数据
+                pcm_view = memoryview(pcm_audio_data)
+
+                with ASR_STAGE_DURATION.labels("recognize").time(), start_span("asr.recognize", stage="asr_recognize"):
+                    # 所有会话都经过会话池，单段短音频同样受并发会话数限制
+                    if len(segments) == 1:
+                        start, end = segments[0]
+                        return await SpeechService._recognize_pcm_pooled(pcm_view[start:end])
+
+                    # 多段语音在有限的会话池内并行识别，按原顺序合并
+                    results = await asyncio.gather(*[
+                        SpeechService._recognize_pcm_pooled(pcm_view[start:end]) for start, end in segments
+                    ])
+                for result in results:
+                    if not result["success"]:
+                        return result
+
+                overlapped = [False] + [segments[i][0] < segments[i - 1][1] for i in range(1, len(segments))]
+                return {
+                    "success": True,
+                    "text": SpeechService.merge_transcripts([result["text"] for result in results], overlapped),
+                    "status": "completed"
+                }
 
-            try:
-                # 尝试将音频转换为PCM格式
-                pcm_audio_data = SpeechService.convert_to_pcm(audio_data, input_format)
-                logger.info(f"音频格式转换完成，原始大小: {len(audio_data)} bytes，转换后大小: {len(pcm_audio_data)} bytes")
             except Exception as e:
-                logger.error(f"音频格式转换失败，使用原始数据: {str(e)}")
-                pcm_audio_data = audio_data
+                logger.error(f"语音识别过程中发生错误: {str(e)}", exc_info=True)
+                asr_span.record_exception(e)
+                return {
+                    "success": False,
+                    "error": f"语音识别失败: {str(e)}"
+                }
+            finally:
+                ASR_STAGE_DURATION.labels("total").observe(time.perf_counter() - started)
 
-            # 将音频数据转换为base64
-            audio_base64 = str(base64.b64encode(pcm_audio_data), "utf8")
-            logger.info(f"音频数据大小: {len(pcm_audio_data)} bytes")
-            logger.info(f"音频数据Base64编码长度: {len(audio_base64)}")
+    @staticmethod
+    async def _recognize_pcm_pooled(pcm_audio_data: Union[bytes, memoryview]) -> Dict[str, Any]:
+        """在并发会话数限制内识别一段PCM音频"""
+        if SpeechService._session_semaphore is None:
+            SpeechService._session_semaphore = asyncio.Semaphore(settings.SPEECH_MAX_CONCURRENT_SESSIONS)
+        async with SpeechService._session_semaphore:
+            return await SpeechService._recognize_pcm(pcm_audio_data)
+
+    @staticmethod
+    async def _recognize_pcm(pcm_audio_data: Union[bytes, memoryview]) -> Dict[str, Any]:
+        """识别一段PCM音频，每个科大讯飞会话对应一个span"""
+        with start_span("asr.iflytek_session", {"audio.bytes": len(pcm_audio_data)}, kind=SPAN_KIND_CLIENT) as session_span:
+            result = await SpeechService._recognize_pcm_session(pcm_audio_data)
+            if not result.get("success"):
+                session_span.set_error(result.get("error") or "识别失败")
+            return result
+
+    @staticmethod
+    async def _recognize_pcm_session(pcm_audio_data: Union[bytes, memoryview]) -> Dict[str, Any]:
+        """
+        通过一个科大讯飞WebSocket会话识别一段PCM音频
+        :param pcm_audio_data: 16kHz单声道16位PCM音频数据
+        :return: 包含识别结果的字典
+        """
+        # websockets仅在实际识别时加载，避免拖慢应用启动
+        import websockets
+
+        try:
+            # 获取鉴权URL
+            auth_url = SpeechService.generate_auth_url()
+            logger.debug("连接到科大讯飞API: %s...", auth_url[:50])
 
             # 连接WebSocket
             try:
-                logger.info(f"正在连接到科大讯飞WebSocket服务器...")
                 async with websockets.connect(
                     auth_url,
                     ping_interval=20,
                     ping_timeout=10,
                     close_timeout=10
                 ) as websocket:
-                    logger.info("成功连接到科大讯飞WebSocket服务器")
+                    logger.debug("成功连接到科大讯飞WebSocket服务器")
 
                     # 发送音频数据
                     frame_size = 1280  # 每一帧的音频大小
@@ -294,7 +617,7 @@ class SpeechService:
                                 }
                             }
 
-                        logger.info(f"发送音频数据，位置: {pos}-{end_pos}，状态: {status}")
+                        logger.debug("发送音频数据，位置: %d-%d，状态: %d", pos, end_pos, status)
                         await websocket.send(json.dumps(data))
 
                         # 更新位置
@@ -304,7 +627,7 @@ class SpeechService:
                         if status != 2:  # 最后一帧不需要等待
                             await asyncio.sleep(intervel)
 
-                    logger.info("已发送所有音频数据到科大讯飞API")
+                    logger.debug("已发送所有音频数据到科大讯飞API")
 
                     # 接收结果
                     result_text = ""
@@ -317,7 +640,9 @@ class SpeechService:
                         try:
                             message = await asyncio.wait_for(websocket.recv(), timeout=15)
                             result = json.loads(message)
-                            logger.info(f"收到科大讯飞API响应: {json.dumps(result, indent=2)}")
+                            if logger.isEnabledFor(logging.DEBUG):
+                                # 响应较大，只在需要时序列化
+                                logger.debug("收到科大讯飞API响应: %s", json.dumps(result, ensure_ascii=False))
 
                             # 检查是否有错误
                             if "code" in result and result["code"] != 0:
@@ -359,7 +684,7 @@ class SpeechService:
                                     else:
                                         result_text = segment_text
 
-                                logger.info(f"收到部分识别结果 (pgs={pgs}): {result_text}")
+                                logger.debug("收到部分识别结果 (pgs=%s): %s", pgs, result_text)
 
                             # 检查是否结束
                             if "data" in result and "status" in result["data"] and result["data"]["status"] == 2:
@@ -403,66 +728,149 @@ class SpeechService:
             }
     
     @staticmethod
-    def _convert_webm_with_ffmpeg(audio_data: bytes) -> bytes:
+    def _convert_file_with_ffmpeg(audio_file: Union[str, BinaryIO]) -> bytes:
         """
-        使用ffmpeg将WebM格式音频转换为PCM格式
-        :param audio_data: WebM格式的音频数据
+        使用ffmpeg将音频文件解码为PCM格式，解码结果直接从管道读取
+        :param audio_file: 音频文件路径或二进制文件对象，文件对象从标准输入传给ffmpeg
         :return: PCM格式的音频数据
         """
         try:
             import ffmpeg
-            import tempfile
-            import os
-            
-            # 创建临时文件
-            with tempfile.NamedTemporaryFile(suffix='.webm', delete=False) as webm_file:
-                webm_file.write(audio_data)
-                webm_file_path = webm_file.name
-            
-            # 创建输出临时文件
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as wav_file:
-                wav_file_path = wav_file.name
-            
-            try:
-                # 使用ffmpeg进行转换
-                # 设置采样率为16kHz，单声道，PCM 16位编码
-                (
-                    ffmpeg
-                    .input(webm_file_path)
-                    .output(wav_file_path, acodec='pcm_s16le', ac=1, ar='16k')
-                    .overwrite_output()
-                    .run(capture_stdout=True, capture_stderr=True)
-                )
-                
-                # 读取转换后的PCM数据
-                with open(wav_file_path, 'rb') as f:
-                    # 跳过WAV文件头（44字节）
-                    f.seek(44)
-                    pcm_data = f.read()
-                
-                # 删除临时文件
-                os.unlink(webm_file_path)
-                os.unlink(wav_file_path)
-                
-                return pcm_data
-                
-            except ffmpeg.Error as e:
-                logger.error(f"ffmpeg转换错误: {e.stderr.decode('utf-8')}")
-                # 删除临时文件
-                if os.path.exists(webm_file_path):
-                    os.unlink(webm_file_path)
-                if os.path.exists(wav_file_path):
-                    os.unlink(wav_file_path)
-                raise
-            except Exception as e:
-                logger.error(f"使用ffmpeg转换时发生错误: {str(e)}", exc_info=True)
-                # 删除临时文件
-                if os.path.exists(webm_file_path):
-                    os.unlink(webm_file_path)
-                if os.path.exists(wav_file_path):
-                    os.unlink(wav_file_path)
-                raise
-                
         except ImportError as e:
             logger.error(f"ffmpeg-python库未安装: {str(e)}")
             raise
+
+        # 设置采样率为16kHz，单声道，PCM 16位编码，输出不带文件头的裸数据
+        command = (
+            ffmpeg
+            .input(audio_file if isinstance(audio_file, str) else 'pipe:0')
+            .output('pipe:', format='s16le', acodec='pcm_s16le', ac=1, ar='16k')
+            .compile()
+        )
+        if isinstance(audio_file, str):
+            stdin = subprocess.DEVNULL
+        else:
+            # 取fileno会使内存中的缓存文件落盘，ffmpeg直接从文件描述符读取，不经过Python复制
+            audio_file.seek(0)
+            audio_file.fileno()
+            stdin = audio_file
+        process = subprocess.run(command, stdin=stdin, capture_output=True)
+        if process.returncode != 0:
+            logger.error(f"ffmpeg转换错误: {process.stderr.decode('utf-8', errors='replace')}")
+            raise ffmpeg.Error('ffmpeg', process.stdout, process.stderr)
+        return process.stdout
+
+    # 合成句子的切分标点
+    SENTENCE_ENDINGS = "。！？；!?;\n"
+    # 进程内共享的语音合成缓存和会话数限制
+    _tts_memory_cache: Optional[LRUCache] = None
+    _tts_disk_cache: Optional[DiskCache] = None
+    _tts_semaphore: Optional[asyncio.Semaphore] = None
+
+    @staticmethod
+    def split_sentences(text: str) -> Tuple[List[str], str]:
+        """
+        把文本切分为完整的句子
+        :param text: 待切分文本
+        :return: (完整句子列表, 尚未结束的剩余文本)
+        """
+        sentences = []
+        start = 0
+        for i, char in enumerate(text):
+            if char in SpeechService.SENTENCE_ENDINGS:
+                sentence = text[start:i + 1].strip()
+                if sentence:
+                    sentences.append(sentence)
+                start = i + 1
+        return sentences, text[start:]
+
+    @staticmethod
+    def _tts_caches() -> Tuple[LRUCache, DiskCache]:
+        """获取语音合成的内存缓存和磁盘缓存"""
+        if SpeechService._tts_memory_cache is None:
+            SpeechService._tts_memory_cache = LRUCache(max_bytes=settings.TTS_MEMORY_CACHE_MB * 1024 * 1024, name="tts_memory")
+            SpeechService._tts_disk_cache = DiskCache(
+                settings.TTS_CACHE_DIR,
+                max_bytes=settings.TTS_CACHE_MAX_MB * 1024 * 1024,
+                suffix=".mp3",
+                name="tts_disk"
+            )
+        return SpeechService._tts_memory_cache, SpeechService._tts_disk_cache
+
+    @staticmethod
+    async def synthesize(text: str) -> bytes:
+        """
+        将一句文本合成为MP3音频，相同的文本和发音人参数只合成一次
+        :param text: 待合成文本
+        :return: MP3音频数据
+        """
+        memory_cache, disk_cache = SpeechService._tts_caches()
+        key = content_key(settings.TTS_VOICE, settings.TTS_SPEED, "lame", text)
+
+        audio = memory_cache.get(key)
+        if audio is not None:
+            return audio
+
+        audio = await asyncio.to_thread(disk_cache.get, key)
+        if audio is None:
+            audio = await SpeechService._synthesize_remote(text)
+            await asyncio.to_thread(disk_cache.set, key, audio)
+
+        memory_cache.set(key, audio)
+        return audio
+
+    @staticmethod
+    async def _synthesize_remote(text: str) -> bytes:
+        """通过科大讯飞在线语音合成接口合成一句文本"""
+        if not all([settings.XUNFEI_APP_ID, settings.XUNFEI_API_KEY, settings.XUNFEI_API_SECRET]):
+            raise Exception("科大讯飞API配置不完整，请检查环境变量XUNFEI_APP_ID、XUNFEI_API_KEY和XUNFEI_API_SECRET")
+
+        import websockets
+
+        if SpeechService._tts_semaphore is None:
+            SpeechService._tts_semaphore = asyncio.Semaphore(settings.SPEECH_MAX_CONCURRENT_SESSIONS)
+
+        request = {
+            "common": {
+                "app_id": settings.XUNFEI_APP_ID
+            },
+            "business": {
+                "aue": "lame",  # MP3编码，分句音频可直接拼接播放
+                "sfl": 1,  # 流式返回MP3
+                "auf": "audio/L16;rate=16000",
+                "vcn": settings.TTS_VOICE,
+                "speed": settings.TTS_SPEED,
+                "tte": "UTF8"
+            },
+            "data": {
+                "status": 2,
+                "text": str(base64.b64encode(text.encode("utf-8")), "utf-8")
+            }
+        }
+
+        audio_chunks = []
+        async with SpeechService._tts_semaphore:
+            auth_url = SpeechService.generate_auth_url(settings.XUNFEI_TTS_URL)
+            async with websockets.connect(
+                auth_url,
+                ping_interval=20,
+                ping_timeout=10,
+                close_timeout=10
+            ) as websocket:
+                await websocket.send(json.dumps(request))
+
+                while True:
+                    message = await asyncio.wait_for(websocket.recv(), timeout=15)
+                    result = json.loads(message)
+
+                    if result.get("code", 0) != 0:
+                        raise Exception(f"科大讯飞API错误 ({result['code']}): {result.get('message', '未知错误')}")
+
+                    data = result.get("data") or {}
+                    if data.get("audio"):
+                        audio_chunks.append(base64.b64decode(data["audio"]))
+                    if data.get("status") == 2:
+                        break
+
+        logger.info(f"语音合成完成，文本长度: {len(text)}，音频大小: {sum(len(c) for c in audio_chunks)} bytes")
+        return b"".join(audio_chunks)
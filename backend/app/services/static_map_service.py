@@ -0,0 +1,116 @@
+import os
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from ..core.config import settings
+from ..utils.cache import DiskCache, content_key
+from .amap_client import AMapClient
+
+logger = logging.getLogger(__name__)
+
+# 透传给高德静态地图的参数
+STATIC_MAP_PARAMS = ("location", "zoom", "size", "scale", "markers", "labels", "paths", "traffic")
+# 路线缩略图的标注标签，高德静态地图的标签只能是单个数字或字母
+MARKER_LABELS = "123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+# 路线缩略图最多标注的途经点数和折线点数
+THUMBNAIL_MAX_MARKERS = 10
+THUMBNAIL_MAX_PATH_POINTS = 100
+
+
+class StaticMapService:
+    """静态地图代理：相同参数的图片只向高德请求一次，保存在磁盘缓存中"""
+
+    # 进程内共享的磁盘缓存和进行中的请求：缓存键 -> 下载任务
+    _disk_cache: Optional[DiskCache] = None
+    _inflight: Dict[str, "asyncio.Task[str]"] = {}
+
+    @classmethod
+    def cache(cls) -> DiskCache:
+        if cls._disk_cache is None:
+            cls._disk_cache = DiskCache(
+                settings.STATIC_MAP_CACHE_DIR,
+                max_bytes=settings.STATIC_MAP_CACHE_MAX_MB * 1024 * 1024,
+                suffix=".png",
+                name="static_map"
+            )
+        return cls._disk_cache
+
+    @staticmethod
+    def image_key(params: Dict[str, Any]) -> str:
+        """
+        图片的缓存键，同时用作ETag：参数相同的静态地图内容相同。
+        标注文字区分大小写，因此只去除首尾空白，不做其他规范化
+        """
+        parts = sorted(
+            f"{name}={str(value).strip()}"
+            for name, value in params.items()
+            if name in STATIC_MAP_PARAMS and value not in (None, "")
+        )
+        return content_key("staticmap", *parts)
+
+    @classmethod
+    async def get_image(cls, params: Dict[str, Any]) -> Tuple[str, str]:
+        """
+        获取静态地图图片，未缓存时下载；同一图片的并发请求共用一次下载
+        :return: (缓存键, 图片文件路径)
+        """
+        key = cls.image_key(params)
+        path = await asyncio.to_thread(cls.cache().get_path, key)
+        if path is not None:
+            return key, path
+
+        task = cls._inflight.get(key)
+        if task is None:
+            # 下载放在独立任务中，发起请求的客户端断开时不影响其他等待者
+            task = asyncio.ensure_future(cls._download(key, params))
+            cls._inflight[key] = task
+            task.add_done_callback(lambda done: cls._download_done(key, done))
+        return key, await asyncio.shield(task)
+
+    @classmethod
+    async def _download(cls, key: str, params: Dict[str, Any]) -> str:
+        data = await AMapClient.static_map({
+            name: params[name] for name in STATIC_MAP_PARAMS if params.get(name) not in (None, "")
+        })
+        path = await asyncio.to_thread(cls.cache().set, key, data)
+        logger.info(f"静态地图已缓存: {key}，{len(data)} bytes")
+        return path
+
+    @classmethod
+    def _download_done(cls, key: str, task: "asyncio.Task[str]") -> None:
+        cls._inflight.pop(key, None)
+        # 读取异常并记录，所有等待者都已断开时也不会出现未获取异常的警告
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"静态地图下载失败: {task.exception()}")
+
+    @classmethod
+    def accel_path(cls, path: str) -> Optional[str]:
+        """配置了STATIC_MAP_ACCEL_PREFIX时，返回交给Nginx发送的内部路径"""
+        if not settings.STATIC_MAP_ACCEL_PREFIX:
+            return None
+        relative = os.path.relpath(path, cls.cache().directory).replace(os.sep, "/")
+        return settings.STATIC_MAP_ACCEL_PREFIX.rstrip("/") + "/" + relative
+
+    @staticmethod
+    def route_params(points: Sequence[Tuple[float, float]], size: str, scale: int = 1) -> Dict[str, Any]:
+        """
+        生成路线缩略图参数：按顺序编号标注途经点并用折线连接，地图范围由高德按标注自动调整
+        :param points: 按游览顺序的 (纬度, 经度)
+        """
+        coordinates = [f"{lng:.6f},{lat:.6f}" for lat, lng in points]
+        params: Dict[str, Any] = {"size": size, "scale": scale}
+
+        markers: List[str] = [
+            f"mid,0xFF6600,{label}:{coordinate}"
+            for label, coordinate in zip(MARKER_LABELS, coordinates[:THUMBNAIL_MAX_MARKERS])
+        ]
+        if markers:
+            params["markers"] = "|".join(markers)
+        if len(coordinates) >= 2:
+            step = max(1, -(-len(coordinates) // THUMBNAIL_MAX_PATH_POINTS))
+            path_points = coordinates[::step]
+            if path_points[-1] != coordinates[-1]:
+                path_points.append(coordinates[-1])
+            params["paths"] = "4,0x3366FF,1,,:" + ";".join(path_points)
+        return params
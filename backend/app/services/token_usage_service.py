@@ -0,0 +1,228 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..core.database import SessionLocal, upsert
+from ..core.exceptions import QuotaExceededException
+from ..models.token_usage import TokenUsage
+from .analytics_service import AnalyticsService
+
+logger = logging.getLogger(__name__)
+
+# 滑动窗口分成的时间片数，窗口内用量按时间片累计
+WINDOW_SLICES = 60
+
+
+class _SlidingWindow:
+    """按时间片累计的滑动窗口，过期的时间片在读取时移除"""
+
+    __slots__ = ("slices", "total")
+
+    def __init__(self):
+        # (时间片开始时间, token数)
+        self.slices: Deque[List[float]] = deque()
+        self.total = 0
+
+    def add(self, now: float, tokens: int, width: float) -> None:
+        start = now - now % width
+        if self.slices and self.slices[-1][0] == start:
+            self.slices[-1][1] += tokens
+        else:
+            self.slices.append([start, tokens])
+        self.total += tokens
+
+    def used(self, now: float, window: float) -> int:
+        while self.slices and self.slices[0][0] <= now - window:
+            self.total -= self.slices.popleft()[1]
+        return self.total
+
+
+class TokenUsageService:
+    """
+    大模型token用量：每次调用后在进程内累计，后台任务定期写入用量表；
+    调用前按进程内的滑动窗口检查配额，不访问数据库
+    """
+
+    # 进程内共享的状态：用户 -> 滑动窗口；(用户, UTC日期, 模型) -> [输入token, 输出token, 请求数]
+    _windows: Dict[UUID, _SlidingWindow] = {}
+    _pending: Dict[Tuple[UUID, date, str], List[int]] = {}
+    _task: Optional["asyncio.Task[None]"] = None
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @staticmethod
+    def quota_for(is_guest: bool) -> int:
+        return settings.LLM_QUOTA_GUEST_TOKENS if is_guest else settings.LLM_QUOTA_TOKENS
+
+    @classmethod
+    def check_quota(cls, user_id: UUID, is_guest: bool) -> None:
+        """
+        调用大模型前检查配额，窗口内用量已达上限时抛出QuotaExceededException
+        """
+        if not settings.LLM_QUOTA_ENABLED:
+            return
+        window = cls._windows.get(user_id)
+        if window is None:
+            return
+        now = time.time()
+        limit = cls.quota_for(is_guest)
+        if window.used(now, settings.LLM_QUOTA_WINDOW_SECONDS) < limit:
+            return
+
+        # 等到足够多的用量移出窗口后再重试
+        excess = window.total - limit
+        retry_after = settings.LLM_QUOTA_WINDOW_SECONDS
+        for start, tokens in window.slices:
+            excess -= tokens
+            if excess < 0:
+                retry_after = start + settings.LLM_QUOTA_WINDOW_SECONDS - now
+                break
+        raise QuotaExceededException(
+            f"最近{settings.LLM_QUOTA_WINDOW_SECONDS // 60}分钟内的AI用量已达上限（{limit} tokens），请稍后再试",
+            retry_after=max(1, int(retry_after) + 1)
+        )
+
+    @classmethod
+    def record(
+        cls,
+        user_id: Optional[UUID],
+        model: str,
+        prompt_tokens: int,
+        completion_tokens: int,
+        estimated: bool = False
+    ) -> None:
+        """
+        记录一次调用的用量
+        :param estimated: 用量是否为本地估算值（接口未返回用量）
+        """
+        AnalyticsService.record(
+            "llm_tokens", user_id, prompt_tokens + completion_tokens,
+            model=model, prompt_tokens=prompt_tokens, estimated=estimated
+        )
+        if user_id is None:
+            return
+
+        window = cls._windows.get(user_id)
+        if window is None:
+            window = cls._windows[user_id] = _SlidingWindow()
+        window.add(time.time(), prompt_tokens + completion_tokens, settings.LLM_QUOTA_WINDOW_SECONDS / WINDOW_SLICES)
+
+        key = (user_id, datetime.now(timezone.utc).date(), model)
+        totals = cls._pending.get(key)
+        if totals is None:
+            totals = cls._pending[key] = [0, 0, 0]
+        totals[0] += prompt_tokens
+        totals[1] += completion_tokens
+        totals[2] += 1
+
+    @classmethod
+    async def flush(cls) -> int:
+        """
+        把累计的用量写入用量表，返回写入的行数；须在事件循环中调用。
+        累计表在事件循环中换出，写入失败时也在事件循环中放回，与record不会并发修改同一个字典
+        """
+        pending, cls._pending = cls._pending, {}
+        if not pending:
+            return 0
+        try:
+            await asyncio.to_thread(cls._write, pending)
+        except Exception as e:
+            # 写入失败时放回，下次一起写入
+            for key, values in pending.items():
+                totals = cls._pending.setdefault(key, [0, 0, 0])
+                for i, value in enumerate(values):
+                    totals[i] += value
+            logger.error(f"写入token用量失败: {str(e)}")
+            return 0
+        return len(pending)
+
+    @staticmethod
+    def _write(pending: Dict[Tuple[UUID, date, str], List[int]]) -> None:
+        """把换出的用量写入用量表（阻塞操作，在线程池中执行）"""
+        with SessionLocal() as db:
+            # 多个进程可能同时写入同一行，在数据库中累加，避免读-改-写丢失更新
+            for (user_id, day, model), (prompt, completion, requests) in pending.items():
+                statement = upsert(db, TokenUsage).values(
+                    user_id=user_id, day=day, model=model,
+                    prompt_tokens=prompt, completion_tokens=completion, requests=requests
+                )
+                db.execute(statement.on_conflict_do_update(
+                    index_elements=[TokenUsage.user_id, TokenUsage.day, TokenUsage.model],
+                    set_={
+                        "prompt_tokens": TokenUsage.prompt_tokens + statement.excluded.prompt_tokens,
+                        "completion_tokens": TokenUsage.completion_tokens + statement.excluded.completion_tokens,
+                        "requests": TokenUsage.requests + statement.excluded.requests,
+                    }
+                ))
+            db.commit()
+
+    @classmethod
+    def prune_windows(cls) -> None:
+        """清理窗口内已没有用量的用户，须在事件循环中调用（与record、check_quota在同一线程）"""
+        now = time.time()
+        for user_id in [user_id for user_id, window in cls._windows.items() if not window.used(now, settings.LLM_QUOTA_WINDOW_SECONDS)]:
+            cls._windows.pop(user_id, None)
+
+    @classmethod
+    def start(cls) -> None:
+        """启动后台写入任务"""
+        if cls._task is None:
+            cls._task = asyncio.ensure_future(cls._run())
+
+    @classmethod
+    async def stop(cls) -> None:
+        """停止后台任务，并写入剩余的用量"""
+        if cls._task is None:
+            return
+        cls._task.cancel()
+        try:
+            await cls._task
+        except asyncio.CancelledError:
+            pass
+        cls._task = None
+        await cls.flush()
+
+    @classmethod
+    async def _run(cls) -> None:
+        while True:
+            await asyncio.sleep(settings.TOKEN_USAGE_FLUSH_INTERVAL_SECONDS)
+            try:
+                await cls.flush()
+                cls.prune_windows()
+            except Exception as e:
+                logger.error(f"token用量后台任务出错: {str(e)}", exc_info=True)
+
+    def get_usage(self, user_id: UUID, is_guest: bool, days: int = 7) -> Dict[str, Any]:
+        """
+        用户最近几天的用量（含尚未写入的部分）和当前窗口内的配额使用情况
+        """
+        since = datetime.now(timezone.utc).date() - timedelta(days=days - 1)
+        totals: Dict[Tuple[date, str], List[int]] = {}
+        rows = self.db.query(TokenUsage).filter(TokenUsage.user_id == user_id, TokenUsage.day >= since).all()
+        for row in rows:
+            totals[(row.day, row.model)] = [row.prompt_tokens, row.completion_tokens, row.requests]
+        for (pending_user, day, model), values in list(self._pending.items()):
+            if pending_user == user_id and day >= since:
+                current = totals.setdefault((day, model), [0, 0, 0])
+                for i, value in enumerate(values):
+                    current[i] += value
+
+        window = self._windows.get(user_id)
+        used = window.used(time.time(), settings.LLM_QUOTA_WINDOW_SECONDS) if window else 0
+        return {
+            "days": [
+                {"day": day, "model": model, "prompt_tokens": prompt, "completion_tokens": completion, "requests": requests}
+                for (day, model), (prompt, completion, requests) in sorted(totals.items())
+            ],
+            "window_seconds": settings.LLM_QUOTA_WINDOW_SECONDS,
+            "window_used": used,
+            "window_limit": self.quota_for(is_guest),
+        }
@@ -0,0 +1,725 @@
+import time
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from datetime import time as clock_time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from ..core.config import settings
+from ..models.poi import PointOfInterest
+from ..models.trip import Trip, TripDay, TripExpense, TripStop
+from ..schemas.trip import (
+    BudgetCompareRequest,
+    PlanDay,
+    TripCreate,
+    TripDayUpdate,
+    TripExpenseCreate,
+    TripOptimizeRequest,
+    TripStopCreate,
+    TripStopUpdate,
+    TripUpdate
+)
+from ..services.currency_service import CurrencyService
+from ..services.map_service import MapService
+from ..utils.budget import BUDGET_CATEGORIES, CostItem, aggregate_costs, summarize
+from ..utils.route_optimizer import RouteProblem, describe, solve, solve_local_search, timeline
+
+logger = logging.getLogger(__name__)
+
+# 一天的秒数
+DAY_SECONDS = 24 * 3600
+
+
+class TripService:
+    """行程服务：行程与途经点管理、路线规划与优化、预算计算"""
+
+    # 进程内共享的优化计算进程池，避免CPU密集的搜索阻塞事件循环
+    _executor: Optional[ProcessPoolExecutor] = None
+
+    def __init__(self, db: Session):
+        self.db = db
+
+    @classmethod
+    def executor(cls) -> ProcessPoolExecutor:
+        """获取共享的进程池"""
+        if cls._executor is None:
+            cls._executor = ProcessPoolExecutor(max_workers=settings.TRIP_OPT_WORKERS)
+        return cls._executor
+
+    @classmethod
+    def shutdown(cls) -> None:
+        """关闭共享的进程池"""
+        if cls._executor is not None:
+            cls._executor.shutdown(wait=False, cancel_futures=True)
+            cls._executor = None
+
+    # 获取用户的所有行程
+    def get_user_trips(self, user_id: UUID) -> List[Trip]:
+        return self.db.query(Trip).filter(Trip.user_id == user_id).order_by(Trip.updated_at.desc()).all()
+
+    # 创建行程及其行程日
+    def create_trip(self, user_id: UUID, trip_data: TripCreate) -> Trip:
+        if trip_data.day_start_time >= trip_data.day_end_time:
+            raise ValueError("每日结束时间必须晚于开始时间")
+        CurrencyService(self.db).conversion(trip_data.currency)
+
+        db_trip = Trip(
+            user_id=user_id,
+            title=trip_data.title,
+            destination=trip_data.destination,
+            start_date=trip_data.start_date,
+            mode=trip_data.mode,
+            travelers=trip_data.travelers,
+            currency=trip_data.currency,
+            total_cost=0
+        )
+        for day_index in range(trip_data.days):
+            db_trip.days.append(TripDay(
+                day_index=day_index,
+                start_time=trip_data.day_start_time,
+                end_time=trip_data.day_end_time,
+                budget=trip_data.daily_budget,
+                return_to_start=False,
+                travel_seconds=0,
+                travel_meters=0,
+                total_cost=0,
+                **{f"{category}_cost": 0 for category in BUDGET_CATEGORIES}
+            ))
+        self.db.add(db_trip)
+        self.db.commit()
+        self.db.refresh(db_trip)
+        return db_trip
+
+    # 获取特定行程
+    def get_trip(self, trip_id: UUID, user_id: UUID) -> Optional[Trip]:
+        return self.db.query(Trip).filter(Trip.id == trip_id, Trip.user_id == user_id).first()
+
+    # 更新行程信息，出行方式变化时重新计算所有行程日，人数或币种变化时重新计算花费
+    async def update_trip(self, trip_id: UUID, user_id: UUID, trip_data: TripUpdate) -> Optional[Trip]:
+        db_trip = self.get_trip(trip_id, user_id)
+        if not db_trip:
+            return None
+
+        # 目的地和开始日期可以清空，其他字段为空时不修改
+        changes = {
+            field: value
+            for field, value in trip_data.model_dump(exclude_unset=True).items()
+            if value is not None or field in ("destination", "start_date")
+        }
+        if "currency" in changes:
+            CurrencyService(self.db).conversion(changes["currency"])
+        mode_changed = "mode" in changes and changes["mode"] != db_trip.mode
+        cost_changed = any(
+            field in changes and changes[field] != getattr(db_trip, field) for field in ("travelers", "currency")
+        )
+        for field, value in changes.items():
+            setattr(db_trip, field, value)
+
+        if mode_changed:
+            for day in db_trip.days:
+                await self._replan_day(db_trip, day)
+        elif cost_changed:
+            conversion = CurrencyService(self.db).conversion(db_trip.currency)
+            expenses = self._day_expenses(db_trip.id)
+            for day in db_trip.days:
+                self._update_day_costs(db_trip, day, conversion, expenses.get(day.day_index, []))
+        if mode_changed or cost_changed:
+            self._update_trip_cost(db_trip)
+
+        self.db.commit()
+        self.db.refresh(db_trip)
+        return db_trip
+
+    # 删除行程
+    def delete_trip(self, trip_id: UUID, user_id: UUID) -> bool:
+        db_trip = self.get_trip(trip_id, user_id)
+        if not db_trip:
+            return False
+
+        self.db.delete(db_trip)
+        self.db.commit()
+        return True
+
+    # 修改行程日的时间、预算或出发地
+    async def update_day(
+        self,
+        trip_id: UUID,
+        user_id: UUID,
+        day_index: int,
+        day_data: TripDayUpdate
+    ) -> Optional[Tuple[Trip, List[TripDay]]]:
+        """
+        :return: (行程, 受影响的行程日)，行程或行程日不存在时返回None
+        """
+        db_trip = self.get_trip(trip_id, user_id)
+        day = self._get_day(trip_id, day_index) if db_trip else None
+        if not day:
+            return None
+
+        changes = day_data.model_dump(exclude_unset=True)
+        if "start" in changes:
+            start = changes.pop("start")
+            day.start_latitude = start["latitude"] if start else None
+            day.start_longitude = start["longitude"] if start else None
+        for field, value in changes.items():
+            if value is not None or field == "budget":
+                setattr(day, field, value)
+        if day.start_time >= day.end_time:
+            raise ValueError("每日结束时间必须晚于开始时间")
+
+        return await self._commit_days(db_trip, [day])
+
+    # 在某一天插入途经点
+    async def add_stop(
+        self,
+        trip_id: UUID,
+        user_id: UUID,
+        day_index: int,
+        stop_data: TripStopCreate
+    ) -> Optional[Tuple[Trip, List[TripDay]]]:
+        db_trip = self.get_trip(trip_id, user_id)
+        day = self._get_day(trip_id, day_index) if db_trip else None
+        if not day:
+            return None
+
+        values = stop_data.model_dump(exclude={"position"})
+        if stop_data.latitude is None or stop_data.longitude is None or stop_data.name is None:
+            if stop_data.poi_id is None:
+                raise ValueError("途经点需要提供poi_id，或名称和经纬度")
+            poi = self.db.query(PointOfInterest).filter(PointOfInterest.id == stop_data.poi_id).first()
+            if not poi:
+                raise ValueError(f"兴趣点不存在: {stop_data.poi_id}")
+            if stop_data.latitude is None or stop_data.longitude is None:
+                values["latitude"] = float(poi.latitude)
+                values["longitude"] = float(poi.longitude)
+            values["name"] = stop_data.name or poi.name
+
+        stop = TripStop(travel_seconds=0, conflict=False, **values)
+        position = len(day.stops) if stop_data.position is None else min(stop_data.position, len(day.stops))
+        day.stops.insert(position, stop)
+        return await self._commit_days(db_trip, [day])
+
+    # 修改途经点，或移动到其他位置/其他天
+    async def update_stop(
+        self,
+        trip_id: UUID,
+        user_id: UUID,
+        stop_id: UUID,
+        stop_data: TripStopUpdate
+    ) -> Optional[Tuple[Trip, List[TripDay]]]:
+        db_trip = self.get_trip(trip_id, user_id)
+        stop = self._get_stop(trip_id, stop_id) if db_trip else None
+        if not stop:
+            return None
+
+        changes = stop_data.model_dump(exclude_unset=True, exclude={"day_index", "position"})
+        for field, value in changes.items():
+            if value is not None or field in ("open_time", "close_time"):
+                setattr(stop, field, value)
+
+        source = stop.day
+        target = source
+        if stop_data.day_index is not None and stop_data.day_index != source.day_index:
+            target = self._get_day(trip_id, stop_data.day_index)
+            if not target:
+                raise ValueError(f"行程日不存在: {stop_data.day_index}")
+
+        if target is not source or stop_data.position is not None:
+            source.stops.remove(stop)
+            position = len(target.stops) if stop_data.position is None else min(stop_data.position, len(target.stops))
+            target.stops.insert(position, stop)
+
+        return await self._commit_days(db_trip, [source] if target is source else [source, target])
+
+    # 删除途经点
+    async def delete_stop(self, trip_id: UUID, user_id: UUID, stop_id: UUID) -> Optional[Tuple[Trip, List[TripDay]]]:
+        db_trip = self.get_trip(trip_id, user_id)
+        stop = self._get_stop(trip_id, stop_id) if db_trip else None
+        if not stop:
+            return None
+
+        day = stop.day
+        day.stops.remove(stop)
+        return await self._commit_days(db_trip, [day])
+
+    # 优化已保存行程的游览顺序
+    async def optimize_trip(
+        self,
+        trip_id: UUID,
+        user_id: UUID,
+        day_index: Optional[int] = None
+    ) -> Optional[Tuple[Trip, List[TripDay]]]:
+        """
+        重新排列行程日的途经点顺序，无法安排的途经点排在当天末尾并标记为冲突
+        :param day_index: 只优化某一天，为空时优化所有天
+        """
+        db_trip = self.get_trip(trip_id, user_id)
+        if not db_trip:
+            return None
+        days = db_trip.days if day_index is None else [self._get_day(trip_id, day_index)]
+        if not days or days[0] is None:
+            return None
+
+        started = time.monotonic()
+        conversion = CurrencyService(self.db).conversion(db_trip.currency)
+        problems = []
+        for day in days:
+            travel, _, _ = await self._travel(
+                [(float(stop.latitude), float(stop.longitude)) for stop in day.stops],
+                self._day_start_point(day), day.return_to_start, db_trip.mode, db_trip.id, day.day_index
+            )
+            costs = self._stop_costs(db_trip, day.stops, conversion)
+            problems.append(self._day_problem(day, day.stops, travel, costs))
+
+        remaining = settings.TRIP_OPT_LATENCY_MS / 1000 - (time.monotonic() - started)
+        results = await asyncio.gather(*(self._solve(problem, remaining) for problem in problems))
+
+        for day, result in zip(days, results):
+            stops = list(day.stops)
+            day.stops[:] = [stops[k] for k in result["order"] + result["dropped"]]
+
+        return await self._commit_days(db_trip, days)
+
+    # 优化多日行程中每一天的游览顺序（不保存）
+    async def optimize(self, request: TripOptimizeRequest) -> Dict[str, Any]:
+        """
+        按营业时间、游览时长和当日预算为每一天选择并排列途经点，使交通和等待时间最少
+        :param request: 行程优化请求
+        :return: {"days": 每日规划结果, "source": 交通时间来源}
+        """
+        started = time.monotonic()
+
+        for day in request.days:
+            if day.start_time >= day.end_time:
+                raise ValueError("每日结束时间必须晚于开始时间")
+        points = self._resolve_points(request.days)
+
+        # 各天的距离矩阵和优化计算都并发进行
+        matrices = await asyncio.gather(*(
+            self._travel(
+                day_points,
+                (day.start.latitude, day.start.longitude) if day.start else None,
+                day.return_to_start,
+                request.mode
+            )
+            for day, day_points in zip(request.days, points)
+        ))
+        problems = [
+            self._day_problem(day, day.stops, travel)
+            for day, (travel, _, _) in zip(request.days, matrices)
+        ]
+
+        remaining = settings.TRIP_OPT_LATENCY_MS / 1000 - (time.monotonic() - started)
+        results = await asyncio.gather(*(self._solve(problem, remaining) for problem in problems))
+
+        sources = {source for _, _, source in matrices if source}
+        return {
+            "days": [
+                self._planned_day(day, problem, result)
+                for day, problem, result in zip(request.days, problems, results)
+            ],
+            "source": sources.pop() if len(sources) == 1 else ("mixed" if sources else "estimate"),
+        }
+
+    # 行程预算：各天的分类花费来自行程日上保存的汇总，不需要读取途经点
+    def get_budget(self, trip_id: UUID, user_id: UUID) -> Optional[Dict[str, Any]]:
+        db_trip = self.get_trip(trip_id, user_id)
+        if not db_trip:
+            return None
+
+        columns = [getattr(TripDay, f"{category}_cost") for category in BUDGET_CATEGORIES]
+        rows = (
+            self.db.query(TripDay.day_index, TripDay.budget, TripDay.total_cost, *columns)
+            .filter(TripDay.trip_id == db_trip.id)
+            .order_by(TripDay.day_index)
+            .all()
+        )
+        trip_level = self._trip_level_costs(db_trip)
+
+        # 逐日明细和各分类合计都来自同一次查询的结果，不再单独汇总
+        days = []
+        categories = {category: float(value) for category, value in zip(BUDGET_CATEGORIES, trip_level)}
+        for day_index, budget, total_cost, *costs in rows:
+            day_categories = {category: float(value) for category, value in zip(BUDGET_CATEGORIES, costs)}
+            for category, value in day_categories.items():
+                categories[category] += value
+            days.append({
+                "day_index": day_index,
+                "categories": day_categories,
+                "total_cost": float(total_cost),
+                "budget": None if budget is None else float(budget),
+                "over_budget": budget is not None and float(total_cost) > float(budget),
+            })
+
+        total = sum(categories.values())
+        return {
+            "currency": db_trip.currency,
+            "travelers": db_trip.travelers,
+            "total_cost": round(total, 2),
+            "per_person_cost": round(total / max(db_trip.travelers, 1), 2),
+            "categories": {category: round(value, 2) for category, value in categories.items()},
+            "days": days,
+            "trip_level_cost": round(float(trip_level.sum()), 2),
+            "expenses": db_trip.expenses,
+        }
+
+    # 添加不在路线上的花费（住宿、餐饮等），只重新计算所属的那一天
+    def add_expense(self, trip_id: UUID, user_id: UUID, expense_data: TripExpenseCreate) -> Optional[Dict[str, Any]]:
+        db_trip = self.get_trip(trip_id, user_id)
+        if not db_trip:
+            return None
+
+        day = None
+        if expense_data.day_index is not None:
+            day = self._get_day(trip_id, expense_data.day_index)
+            if not day:
+                raise ValueError(f"行程日不存在: {expense_data.day_index}")
+        conversion = CurrencyService(self.db).conversion(db_trip.currency)
+        if expense_data.currency and expense_data.currency not in conversion:
+            raise ValueError(f"缺少汇率: {expense_data.currency}")
+
+        db_trip.expenses.append(TripExpense(**expense_data.model_dump()))
+        self._commit_expense_day(db_trip, day, conversion)
+        return self.get_budget(trip_id, user_id)
+
+    # 删除花费
+    def delete_expense(self, trip_id: UUID, user_id: UUID, expense_id: UUID) -> Optional[Dict[str, Any]]:
+        db_trip = self.get_trip(trip_id, user_id)
+        expense = self.db.query(TripExpense).filter(
+            TripExpense.id == expense_id, TripExpense.trip_id == trip_id
+        ).first() if db_trip else None
+        if not expense:
+            return None
+
+        day = None if expense.day_index is None else self._get_day(trip_id, expense.day_index)
+        db_trip.expenses.remove(expense)
+        self._commit_expense_day(db_trip, day, CurrencyService(self.db).conversion(db_trip.currency))
+        return self.get_budget(trip_id, user_id)
+
+    def _commit_expense_day(self, db_trip: Trip, day: Optional[TripDay], conversion: Dict[str, float]) -> None:
+        """花费变化后重新计算所属行程日（整个行程的花费只影响行程总花费）并提交"""
+        self.db.flush()
+        if day is not None:
+            expenses = self.db.query(TripExpense).filter(
+                TripExpense.trip_id == db_trip.id, TripExpense.day_index == day.day_index
+            ).all()
+            self._update_day_costs(db_trip, day, conversion, expenses)
+        self._update_trip_cost(db_trip)
+        self.db.commit()
+
+    # 比较多个预算方案（不保存）
+    def compare_budgets(self, request: BudgetCompareRequest) -> Dict[str, Any]:
+        """
+        所有方案的花费一次性向量化汇总，用于在多个酒店、交通方案之间选择
+        :return: {"currency": 币种, "alternatives": 各方案汇总, "cheapest": 总花费最低的方案下标}
+        """
+        if len(request.alternatives) > settings.BUDGET_MAX_ALTERNATIVES:
+            raise ValueError(f"预算方案不能超过{settings.BUDGET_MAX_ALTERNATIVES}个")
+
+        conversion = CurrencyService(self.db).conversion(request.currency)
+        travelers = [alternative.travelers or request.travelers for alternative in request.alternatives]
+        items = [
+            CostItem(k, item.day_index, item.category, item.amount, item.currency or request.currency, item.per_person)
+            for k, alternative in enumerate(request.alternatives)
+            for item in alternative.items
+        ]
+        if any(item.day_index is not None and item.day_index >= request.days for item in items):
+            raise ValueError("花费所属的行程日超出行程天数")
+        by_day_category = aggregate_costs(items, travelers, conversion, request.days)["by_day_category"]
+
+        totals = by_day_category.sum(axis=(1, 2))
+        over_budget = totals > request.total_budget if request.total_budget is not None else totals < 0
+        if request.daily_budget is not None:
+            over_budget |= (by_day_category[:, :request.days].sum(axis=2) > request.daily_budget).any(axis=1)
+
+        return {
+            "currency": request.currency,
+            "alternatives": [
+                {
+                    "name": alternative.name,
+                    "travelers": travelers[k],
+                    **summarize(by_day_category[k], travelers[k], request.days),
+                    "over_budget": bool(over_budget[k]),
+                }
+                for k, alternative in enumerate(request.alternatives)
+            ],
+            "cheapest": int(totals.argmin()),
+        }
+
+    def _get_day(self, trip_id: UUID, day_index: int) -> Optional[TripDay]:
+        return self.db.query(TripDay).filter(TripDay.trip_id == trip_id, TripDay.day_index == day_index).first()
+
+    def _get_stop(self, trip_id: UUID, stop_id: UUID) -> Optional[TripStop]:
+        return (
+            self.db.query(TripStop)
+            .join(TripDay, TripStop.day_id == TripDay.id)
+            .filter(TripStop.id == stop_id, TripDay.trip_id == trip_id)
+            .first()
+        )
+
+    async def _commit_days(self, db_trip: Trip, days: List[TripDay]) -> Tuple[Trip, List[TripDay]]:
+        """只重新计算受影响的行程日，再更新行程总花费并提交"""
+        conversion = CurrencyService(self.db).conversion(db_trip.currency)
+        for day in days:
+            await self._replan_day(db_trip, day, conversion)
+        self._update_trip_cost(db_trip)
+        self.db.commit()
+        for day in days:
+            self.db.refresh(day)
+        self.db.refresh(db_trip)
+        return db_trip, days
+
+    def _update_trip_cost(self, db_trip: Trip) -> None:
+        # 其他天的汇总已保存在行程日上，不需要读取它们的途经点
+        self.db.flush()
+        total = self.db.query(func.coalesce(func.sum(TripDay.total_cost), 0)).filter(TripDay.trip_id == db_trip.id).scalar()
+        db_trip.total_cost = round(float(total) + float(self._trip_level_costs(db_trip).sum()), 2)
+
+    async def _replan_day(self, db_trip: Trip, day: TripDay, conversion: Optional[Dict[str, float]] = None) -> None:
+        """按当前顺序重新计算某一天的时间表、交通时间和花费"""
+        if conversion is None:
+            conversion = CurrencyService(self.db).conversion(db_trip.currency)
+        stops = list(day.stops)
+        for position, stop in enumerate(stops):
+            stop.position = position
+
+        travel, distance, _ = await self._travel(
+            [(float(stop.latitude), float(stop.longitude)) for stop in stops],
+            self._day_start_point(day), day.return_to_start, db_trip.mode, db_trip.id, day.day_index
+        )
+        problem = self._day_problem(day, stops, travel, self._stop_costs(db_trip, stops, conversion))
+        route = list(range(len(stops)))
+        starts, conflicts, finish = timeline(problem, route)
+
+        total_travel = 0.0
+        total_distance = 0.0
+        prev = 0
+        for k, (stop, start, conflict) in enumerate(zip(stops, starts, conflicts)):
+            stop.arrival_time = self._clock(start)
+            stop.departure_time = self._clock(start + problem.dwell[k])
+            stop.travel_seconds = round(travel[prev][k + 1])
+            stop.conflict = conflict
+            total_travel += travel[prev][k + 1]
+            total_distance += distance[prev][k + 1]
+            prev = k + 1
+        total_travel += travel[prev][0]
+        total_distance += distance[prev][0]
+
+        day.travel_seconds = round(total_travel)
+        day.travel_meters = round(total_distance)
+        day.finish_time = self._clock(finish) if stops else None
+        expenses = self.db.query(TripExpense).filter(
+            TripExpense.trip_id == db_trip.id, TripExpense.day_index == day.day_index
+        ).all()
+        self._update_day_costs(db_trip, day, conversion, expenses, stops)
+
+    def _update_day_costs(
+        self,
+        db_trip: Trip,
+        day: TripDay,
+        conversion: Dict[str, float],
+        expenses: List[TripExpense],
+        stops: Optional[List[TripStop]] = None
+    ) -> None:
+        """重新计算某一天的分类花费：途经点、当天的花费和自驾交通费"""
+        stops = list(day.stops) if stops is None else stops
+        items = [
+            CostItem(0, 0, stop.category, float(stop.cost), stop.currency or db_trip.currency, stop.per_person)
+            for stop in stops
+        ] + [
+            CostItem(0, 0, expense.category, float(expense.amount), expense.currency or db_trip.currency, expense.per_person)
+            for expense in expenses
+        ]
+        if db_trip.mode == "driving" and day.travel_meters:
+            items.append(CostItem(
+                0, 0, "transport", day.travel_meters / 1000 * settings.TRIP_DRIVING_COST_PER_KM,
+                settings.CURRENCY_BASE, False
+            ))
+
+        costs = aggregate_costs(items, [db_trip.travelers], conversion, 1)["by_day_category"][0, 0]
+        for category, value in zip(BUDGET_CATEGORIES, costs):
+            setattr(day, f"{category}_cost", round(float(value), 2))
+        day.total_cost = round(float(costs.sum()), 2)
+
+    def _day_expenses(self, trip_id: UUID) -> Dict[Optional[int], List[TripExpense]]:
+        """按行程日分组的花费，None为整个行程的花费"""
+        grouped: Dict[Optional[int], List[TripExpense]] = {}
+        for expense in self.db.query(TripExpense).filter(TripExpense.trip_id == trip_id):
+            grouped.setdefault(expense.day_index, []).append(expense)
+        return grouped
+
+    def _trip_level_costs(self, db_trip: Trip, conversion: Optional[Dict[str, float]] = None):
+        """不属于某一天的花费按分类的合计"""
+        expenses = self.db.query(TripExpense).filter(
+            TripExpense.trip_id == db_trip.id, TripExpense.day_index.is_(None)
+        ).all()
+        if conversion is None:
+            conversion = CurrencyService(self.db).conversion(db_trip.currency)
+        items = [
+            CostItem(0, None, expense.category, float(expense.amount), expense.currency or db_trip.currency, expense.per_person)
+            for expense in expenses
+        ]
+        return aggregate_costs(items, [db_trip.travelers], conversion, 0)["by_day_category"][0, 0]
+
+    @staticmethod
+    def _stop_costs(db_trip: Trip, stops: Sequence[TripStop], conversion: Dict[str, float]) -> List[float]:
+        """途经点按行程币种和人数计算的花费，用于当日预算约束"""
+        costs = []
+        for stop in stops:
+            currency = stop.currency or db_trip.currency
+            if currency not in conversion:
+                raise ValueError(f"缺少汇率: {currency}")
+            cost = float(stop.cost) * conversion[currency]
+            costs.append(cost * db_trip.travelers if stop.per_person else cost)
+        return costs
+
+    @staticmethod
+    def _day_start_point(day: TripDay) -> Optional[Tuple[float, float]]:
+        if day.start_latitude is None or day.start_longitude is None:
+            return None
+        return float(day.start_latitude), float(day.start_longitude)
+
+    def _resolve_points(self, days: List[PlanDay]) -> List[List[Tuple[float, float]]]:
+        """确定每个途经点的坐标，只提供poi_id的途经点批量从兴趣点表读取"""
+        poi_ids = {
+            stop.poi_id
+            for day in days
+            for stop in day.stops
+            if stop.poi_id is not None and (stop.latitude is None or stop.longitude is None)
+        }
+        pois = {}
+        if poi_ids:
+            pois = {
+                poi.id: poi
+                for poi in self.db.query(PointOfInterest).filter(PointOfInterest.id.in_(poi_ids))
+            }
+
+        points = []
+        for day in days:
+            day_points = []
+            for stop in day.stops:
+                if stop.latitude is not None and stop.longitude is not None:
+                    day_points.append((stop.latitude, stop.longitude))
+                elif stop.poi_id is None:
+                    raise ValueError("途经点需要提供poi_id或经纬度")
+                elif stop.poi_id not in pois:
+                    raise ValueError(f"兴趣点不存在: {stop.poi_id}")
+                else:
+                    poi = pois[stop.poi_id]
+                    if stop.name is None:
+                        stop.name = poi.name
+                    day_points.append((float(poi.latitude), float(poi.longitude)))
+            points.append(day_points)
+        return points
+
+    async def _travel(
+        self,
+        points: List[Tuple[float, float]],
+        start: Optional[Tuple[float, float]],
+        return_to_start: bool,
+        mode: str,
+        trip_id: Optional[UUID] = None,
+        day_index: int = 0
+    ) -> Tuple[List[List[float]], List[List[float]], Optional[str]]:
+        """
+        构造当日的交通时间和距离矩阵，下标0为出发地
+        :return: ((n+1) x (n+1) 交通时间矩阵, 同形状的距离矩阵, 距离矩阵来源)
+        """
+        n = len(points)
+        if n == 0:
+            return [[0.0]], [[0.0]], None
+
+        # 矩阵随行程的修改一起提交，不在重新计算的中途提交
+        map_service = MapService(self.db)
+        if start is None:
+            matrix = await map_service.distance_matrix(points, mode, trip_id, day_index, commit=False)
+            travel = [[0.0] * (n + 1)] + [[0.0] + row for row in matrix["durations"]]
+            distance = [[0.0] * (n + 1)] + [[0.0] + row for row in matrix["distances"]]
+        else:
+            matrix = await map_service.distance_matrix([start] + points, mode, trip_id, day_index, commit=False)
+            travel = matrix["durations"]
+            distance = matrix["distances"]
+            if not return_to_start:
+                for row in travel:
+                    row[0] = 0.0
+                for row in distance:
+                    row[0] = 0.0
+        return travel, distance, matrix["source"]
+
+    @staticmethod
+    def _day_problem(
+        day: Any,
+        stops: Sequence[Any],
+        travel: List[List[float]],
+        costs: Optional[List[float]] = None
+    ) -> RouteProblem:
+        """
+        由行程日（PlanDay或TripDay）及其途经点构造规划问题
+        :param costs: 按预算币种计算的途经点花费，为空时直接使用途经点的cost
+        """
+        return RouteProblem(
+            travel=travel,
+            open_times=[TripService._seconds(stop.open_time) if stop.open_time else 0.0 for stop in stops],
+            close_times=[TripService._seconds(stop.close_time) if stop.close_time else DAY_SECONDS for stop in stops],
+            dwell=[stop.dwell_minutes * 60.0 for stop in stops],
+            costs=costs if costs is not None else [float(stop.cost) for stop in stops],
+            priorities=[float(stop.priority) for stop in stops],
+            day_start=TripService._seconds(day.start_time),
+            day_end=TripService._seconds(day.end_time),
+            budget=float(day.budget) if day.budget is not None else None
+        )
+
+    async def _solve(self, problem: RouteProblem, remaining: float) -> Dict[str, Any]:
+        """在进程池中求解，超出时间预算时改用贪心构造的路线"""
+        remaining = max(0.1, remaining)
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(
+            self.executor(), solve, problem, remaining * 0.8, settings.TRIP_OPT_EXACT_MAX_STOPS
+        )
+        try:
+            return await asyncio.wait_for(future, timeout=remaining)
+        except asyncio.TimeoutError:
+            logger.warning(f"行程优化超出时间预算，{problem.n} 个途经点改用贪心路线")
+            route = await asyncio.to_thread(solve_local_search, problem, 0.0)
+            return describe(problem, route, "greedy", False)
+
+    @staticmethod
+    def _planned_day(day: PlanDay, problem: RouteProblem, result: Dict[str, Any]) -> Dict[str, Any]:
+        """把求解结果转换为响应格式"""
+        stops = []
+        prev = 0
+        for k, start in zip(result["order"], result["starts"]):
+            stop = day.stops[k]
+            stops.append({
+                "index": k,
+                "poi_id": stop.poi_id,
+                "name": stop.name,
+                "arrival_time": TripService._clock(start),
+                "departure_time": TripService._clock(start + problem.dwell[k]),
+                "travel_seconds": round(problem.travel[prev][k + 1]),
+            })
+            prev = k + 1
+
+        finish = result["finish"]
+        return {
+            "stops": stops,
+            "dropped": result["dropped"],
+            "total_travel_seconds": round(result["travel"]),
+            "total_cost": result["cost"],
+            "finish_time": TripService._clock(finish) if finish != float("inf") else None,
+            "method": result["method"],
+            "optimal": result["optimal"],
+        }
+
+    @staticmethod
+    def _seconds(value: clock_time) -> float:
+        return value.hour * 3600.0 + value.minute * 60.0 + value.second
+
+    @staticmethod
+    def _clock(seconds: float) -> clock_time:
+        seconds = int(min(max(seconds, 0), DAY_SECONDS - 1))
+        return clock_time(seconds // 3600, seconds % 3600 // 60, seconds % 60)
@@ -1,5 +1,5 @@
+import logging
 from typing import Optional
-import traceback
 from uuid import UUID
 
 from sqlalchemy.orm import Session
@@ -8,6 +8,8 @@ from ..models.user import User
 from ..schemas.user import UserCreate, UserUpdate
 from ..core.security import get_password_hash, verify_password
 
+logger = logging.getLogger(__name__)
+
 class UserService:
     @staticmethod
     def get_user_by_id(db: Session, user_id: UUID) -> Optional[User]:
@@ -28,9 +30,7 @@ class UserService:
     def create_user(db: Session, user: UserCreate) -> User:
         """创建新用户"""
         try:
-            print(f"准备创建用户，输入数据: {user.dict()}")
             hashed_password = get_password_hash(user.password)
-            print(f"密码哈希成功")
             
             db_user = User(
                 email=user.email,
@@ -45,17 +45,13 @@ class UserService:
                 is_guest=user.is_guest
             )
             
-            print(f"用户对象创建成功")
             db.add(db_user)
-            print(f"用户对象添加到会话")
             db.commit()
-            print(f"数据库提交成功")
             db.refresh(db_user)
-            print(f"用户对象刷新成功，ID: {db_user.id}")
+            logger.info("用户创建成功: %s", db_user.id)
             return db_user
         except Exception as e:
-            print(f"创建用户时出错: {str(e)}")
-            traceback.print_exc()
+            logger.exception("创建用户时出错")
             db.rollback()
             raise
 
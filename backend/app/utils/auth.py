@@ -6,7 +6,9 @@ from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 
 from ..core.database import get_db
+from ..core.tracing import start_span
 from ..core.security import verify_token, verify_token_with_exp, should_refresh_token, create_access_token
+from ..core.token_refresh_middleware import set_new_token
 from ..models.user import User
 from ..services.user_service import UserService
 
@@ -30,44 +32,41 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer", "X-Error-Code": "TOKEN_EXPIRED"},
     )
 
-    # 使用带过期检查的令牌验证
-    payload = verify_token_with_exp(token)
-    if payload is None:
-        raise credentials_exception
+    # 令牌校验和用户查询计入慢请求的auth阶段
+    with start_span("get_current_user", {"auth.method": "jwt"}, stage="auth") as auth_span:
+        # 使用带过期检查的令牌验证
+        payload = verify_token_with_exp(token)
+        if payload is None:
+            raise credentials_exception
 
-    # 检查令牌是否已过期
-    if payload.get("expired", False):
-        raise token_expired_exception
+        # 检查令牌是否已过期
+        if payload.get("expired", False):
+            raise token_expired_exception
 
-    user_id: UUID = UUID(payload.get("sub"))
-    if user_id is None:
-        raise credentials_exception
+        user_id: UUID = UUID(payload.get("sub"))
+        if user_id is None:
+            raise credentials_exception
 
-    user = UserService.get_user_by_id(db, user_id=user_id)
-    if user is None:
-        raise credentials_exception
+        user = UserService.get_user_by_id(db, user_id=user_id)
+        if user is None:
+            raise credentials_exception
 
-    if not user.is_active:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="用户已被禁用"
-        )
+        if not user.is_active:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="用户已被禁用"
+            )
 
-    # 检查令牌是否需要续期
-    if should_refresh_token(payload):
-        # 创建新的访问令牌
-        new_token = create_access_token(data={"sub": str(user_id)})
+        # 检查令牌是否需要续期
+        if should_refresh_token(payload):
+            # 创建新的访问令牌
+            new_token = create_access_token(data={"sub": str(user_id)})
 
-        # 使用全局上下文变量来存储新令牌
-        try:
-            from ..core.token_refresh_middleware import new_token_context
-            new_token_context.set(new_token)
-        except Exception as e:
-            # 如果设置上下文变量失败，至少记录日志
-            import logging
-            logging.error(f"Failed to set new token in context: {str(e)}")
+            # 交给令牌刷新中间件添加到响应头
+            set_new_token(new_token)
 
-    return user
+        auth_span.set_attribute("enduser.id", str(user_id))
+        return user
 
 async def get_current_active_user(
     current_user: User = Depends(get_current_user)
@@ -0,0 +1,137 @@
+import heapq
+import logging
+from array import array
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from .cache import LRUCache
+from .geo import haversine_m
+from .text import name_key
+
+logger = logging.getLogger(__name__)
+
+try:
+    from pypinyin import lazy_pinyin
+except ImportError:
+    # 未安装pypinyin时只支持按汉字检索
+    lazy_pinyin = None
+    logger.warning("pypinyin未安装，兴趣点联想不支持拼音检索")
+
+# 从名称中间开始匹配时，最多从第几个字（音节）开始
+MAX_INFIX_START = 8
+# 不超过该长度的查询缓存候选结果
+SHORT_QUERY_CHARS = 2
+SHORT_QUERY_CACHE_ITEMS = 4096
+
+
+def search_keys(name: str) -> Set[Tuple[str, bool]]:
+    """
+    生成名称的检索键：名称本身及从中间各字开始的后缀，
+    安装pypinyin时还包括全拼和首字母（同样含从各音节开始的后缀）
+    :return: {(检索键, 是否从名称开头开始)}
+    """
+    key = name_key(name)
+    if not key:
+        return set()
+    keys = {(key[i:], i == 0) for i in range(min(len(key), MAX_INFIX_START))}
+    if lazy_pinyin is not None and not key.isascii():
+        syllables = [s for s in (name_key(part) for part in lazy_pinyin(key)) if s]
+        for i in range(min(len(syllables), MAX_INFIX_START)):
+            keys.add(("".join(syllables[i:]), i == 0))
+            keys.add(("".join(s[0] for s in syllables[i:]), i == 0))
+    return keys
+
+
+class PrefixIndex:
+    """
+    兴趣点名称前缀索引：所有检索键排序后存放在一个列表中，
+    前缀查询用二分查找定位后顺序扫描，内存紧凑且构建后只读，可被多个请求并发使用
+    """
+
+    def __init__(self, pois: Sequence[Dict[str, Any]], complete: bool = False):
+        """
+        :param complete: 索引是否包含了全部兴趣点，为True时无需再查数据库
+        """
+        self.pois = list(pois)
+        self.complete = complete
+        self._name_keys = [name_key(poi["name"]) for poi in self.pois]
+        entries = sorted(
+            (key, not from_start, i)
+            for i, poi in enumerate(self.pois)
+            for key, from_start in search_keys(poi["name"])
+        )
+        self._keys = [key for key, _, _ in entries]
+        self._from_start = array("b", [not later for _, later, _ in entries])
+        self._poi_indexes = array("i", [i for _, _, i in entries])
+        # 短查询的候选结果缓存
+        self._short_queries = LRUCache(max_items=SHORT_QUERY_CACHE_ITEMS, name="autocomplete_short_queries")
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def search(self, query: str, max_candidates: int) -> List[Tuple[Dict[str, Any], str, bool]]:
+        """
+        查找检索键以query开头的兴趣点，匹配过多时只保留从名称开头匹配、评分最高的一部分；
+        很短的查询匹配范围大，结果缓存复用
+        :param query: 已经过name_key处理的查询
+        :param max_candidates: 最多返回的兴趣点数
+        :return: [(兴趣点, 名称键, 是否从名称开头匹配)]
+        """
+        if not query:
+            return []
+        cache_key = f"{query}\x00{max_candidates}"
+        short = len(query) <= SHORT_QUERY_CHARS
+        if short:
+            cached = self._short_queries.get(cache_key)
+            if cached is not None:
+                return list(cached)
+
+        matches: Dict[int, bool] = {}
+        position = bisect_left(self._keys, query)
+        while position < len(self._keys) and self._keys[position].startswith(query):
+            index = self._poi_indexes[position]
+            matches[index] = matches.get(index, False) or bool(self._from_start[position])
+            position += 1
+
+        if len(matches) > max_candidates:
+            kept = heapq.nlargest(
+                max_candidates,
+                matches.items(),
+                key=lambda item: (item[1], self.pois[item[0]]["rating"] or 0.0)
+            )
+        else:
+            kept = matches.items()
+        candidates = [(self.pois[index], self._name_keys[index], from_start) for index, from_start in kept]
+        if short:
+            self._short_queries.set(cache_key, candidates)
+        return list(candidates)
+
+
+def rank_pois(
+    candidates: Iterable[Tuple[Dict[str, Any], str, bool]],
+    query: str,
+    limit: int,
+    center: Optional[Tuple[float, float]] = None,
+    distance_scale_m: float = 5000.0
+) -> List[Dict[str, Any]]:
+    """
+    按匹配位置、评分和与地图中心的距离排序：从名称开头匹配、名称完全相同各加1分，
+    评分折算为0~1分，距离中心distance_scale_m时距离分为0.5
+    :param candidates: [(兴趣点, 名称键, 是否从名称开头匹配)]
+    :return: 得分最高的limit个兴趣点，提供中心时带distance字段
+    """
+    scored = []
+    for poi, key, from_start in candidates:
+        score = (1.0 if from_start else 0.0) + (poi["rating"] or 0.0) / 5.0
+        if key == query:
+            score += 1.0
+        distance = None
+        if center is not None:
+            distance = haversine_m(center[0], center[1], poi["latitude"], poi["longitude"])
+            score += 1.0 / (1.0 + distance / distance_scale_m)
+        scored.append((score, distance, poi))
+
+    results = []
+    for _, distance, poi in heapq.nlargest(limit, scored, key=lambda item: item[0]):
+        results.append(poi if distance is None else dict(poi, distance=round(distance, 1)))
+    return results
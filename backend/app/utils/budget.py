@@ -0,0 +1,84 @@
+from typing import Any, Dict, NamedTuple, Optional, Sequence
+
+# 花费分类：门票、交通、住宿、餐饮、其他
+BUDGET_CATEGORIES = ("tickets", "transport", "lodging", "food", "other")
+_CATEGORY_INDEX = {category: i for i, category in enumerate(BUDGET_CATEGORIES)}
+
+
+class CostItem(NamedTuple):
+    """
+    一笔花费
+    :param alternative: 所属方案下标（单个行程时为0）
+    :param day_index: 所属行程日，None表示整个行程（如签证、保险）
+    :param per_person: 是否按人数计算
+    """
+    alternative: int
+    day_index: Optional[int]
+    category: str
+    amount: float
+    currency: str
+    per_person: bool
+
+
+def aggregate_costs(
+    items: Sequence[CostItem],
+    travelers: Sequence[int],
+    rates: Dict[str, float],
+    n_days: int
+) -> Dict[str, Any]:
+    """
+    向量化汇总多个方案的花费：换算为目标币种、按人数展开后，
+    按 (方案, 行程日, 分类) 累加
+    :param travelers: 每个方案的出行人数
+    :param rates: 币种 -> 1单位该币种折合的目标币种金额
+    :param n_days: 行程天数，day_index为None的花费记在最后一列
+    :return: {"by_day_category": (方案数, n_days + 1, 分类数) 数组}
+    """
+    import numpy as np
+
+    n_alternatives = len(travelers)
+    totals = np.zeros((n_alternatives, n_days + 1, len(BUDGET_CATEGORIES)))
+    if not items:
+        return {"by_day_category": totals}
+
+    alternatives = np.fromiter((item.alternative for item in items), dtype=np.int64, count=len(items))
+    days = np.fromiter(
+        (n_days if item.day_index is None else item.day_index for item in items), dtype=np.int64, count=len(items)
+    )
+    amounts = np.fromiter((item.amount for item in items), dtype=np.float64, count=len(items))
+    per_person = np.fromiter((item.per_person for item in items), dtype=bool, count=len(items))
+
+    unknown = {item.category for item in items} - set(_CATEGORY_INDEX)
+    if unknown:
+        raise ValueError(f"未知的花费分类: {', '.join(sorted(unknown))}")
+    categories = np.fromiter((_CATEGORY_INDEX[item.category] for item in items), dtype=np.int64, count=len(items))
+
+    # 每种币种只查一次汇率
+    currencies, currency_index = np.unique([item.currency for item in items], return_inverse=True)
+    missing = [currency for currency in currencies if currency not in rates]
+    if missing:
+        raise ValueError(f"缺少汇率: {', '.join(missing)}")
+    currency_rates = np.array([rates[currency] for currency in currencies], dtype=np.float64)
+
+    if (days < 0).any() or (days > n_days).any():
+        raise ValueError("花费所属的行程日超出行程天数")
+
+    multiplier = np.where(per_person, np.asarray(travelers, dtype=np.float64)[alternatives], 1.0)
+    values = amounts * currency_rates[currency_index] * multiplier
+    np.add.at(totals, (alternatives, days, categories), values)
+    return {"by_day_category": totals}
+
+
+def summarize(by_day_category, travelers: int, n_days: int) -> Dict[str, Any]:
+    """
+    单个方案的汇总
+    :param by_day_category: (n_days + 1, 分类数) 数组
+    """
+    categories = by_day_category.sum(axis=0)
+    total = float(categories.sum())
+    return {
+        "total_cost": round(total, 2),
+        "per_person_cost": round(total / max(travelers, 1), 2),
+        "categories": {category: round(float(value), 2) for category, value in zip(BUDGET_CATEGORIES, categories)},
+        "days": [round(float(value), 2) for value in by_day_category[:n_days].sum(axis=1)],
+    }
@@ -0,0 +1,188 @@
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Optional
+
+from ..core.metrics import register_cache
+
+logger = logging.getLogger(__name__)
+
+
+def content_key(*parts: Any) -> str:
+    """根据内容生成缓存键（SHA-256十六进制）"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(str(part).encode("utf-8"))
+        digest.update(b"\x00")
+    return digest.hexdigest()
+
+
+class LRUCache:
+    """进程内LRU缓存，按条目数或总字节数限制容量，指定name时在/metrics中导出命中率"""
+
+    def __init__(
+        self,
+        max_items: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        sizeof: Callable[[Any], int] = len,
+        name: Optional[str] = None
+    ):
+        self.max_items = max_items
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof
+        self._data: "OrderedDict[str, Any]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if name:
+            register_cache(name, self)
+
+    def get(self, key: str) -> Optional[Any]:
+        """读取缓存，命中时移到最近使用的位置"""
+        with self._lock:
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        """写入缓存，超出容量时淘汰最久未使用的条目"""
+        size = self._sizeof(value) if self.max_bytes is not None else 0
+        # 单个条目超过总容量时不缓存
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None and self.max_bytes is not None:
+                self._bytes -= self._sizeof(old)
+            self._data[key] = value
+            self._bytes += size
+
+            while self._data and (
+                (self.max_items is not None and len(self._data) > self.max_items)
+                or (self.max_bytes is not None and self._bytes > self.max_bytes)
+            ):
+                _, evicted = self._data.popitem(last=False)
+                if self.max_bytes is not None:
+                    self._bytes -= self._sizeof(evicted)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            old = self._data.pop(key, None)
+            if old is not None and self.max_bytes is not None:
+                self._bytes -= self._sizeof(old)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class DiskCache:
+    """
+    内容寻址的磁盘缓存，文件按键的前两位分目录存放，
+    以文件修改时间作为最近使用时间，总大小超限时淘汰最久未使用的文件
+    """
+
+    def __init__(self, directory: str, max_bytes: int, suffix: str = "", name: Optional[str] = None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+        self._lock = threading.Lock()
+        self._total_bytes: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        if name:
+            register_cache(name, self)
+
+    def path_for(self, key: str) -> str:
+        """缓存键对应的文件路径"""
+        return os.path.join(self.directory, key[:2], key + self.suffix)
+
+    def get_path(self, key: str) -> Optional[str]:
+        """命中时刷新使用时间并返回文件路径"""
+        path = self.path_for(key)
+        try:
+            os.utime(path)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self.get_path(key)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def set(self, key: str, data: bytes) -> str:
+        """写入缓存（先写临时文件再原子替换），返回文件路径"""
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        existed = os.path.exists(path)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan_size()
+            elif not existed:
+                self._total_bytes += len(data)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+        return path
+
+    def _scan_size(self) -> int:
+        total = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except OSError:
+                    pass
+        return total
+
+    def _evict(self) -> None:
+        """淘汰最久未使用的文件，直到总大小降到上限的90%以下"""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+
+        total = sum(size for _, size, _ in entries)
+        target = int(self.max_bytes * 0.9)
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.unlink(path)
+                total -= size
+            except OSError:
+                pass
+        self._total_bytes = total
+        logger.info(f"磁盘缓存 {self.directory} 淘汰完成，当前大小: {total} bytes")
@@ -0,0 +1,157 @@
+import math
+from typing import List, Tuple
+
+# 地球平均半径（米）
+EARTH_RADIUS_M = 6371008.8
+
+# geohash使用的base32字符表，按编码值排序
+GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_BASE32_INDEX = {char: i for i, char in enumerate(GEOHASH_BASE32)}
+
+
+def haversine_m(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    """计算两点间的大圆距离（米）"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lng2 - lng1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bbox_around(lat: float, lng: float, radius_m: float) -> Tuple[float, float, float, float]:
+    """
+    计算以某点为中心、给定半径的外接矩形
+    :return: (min_lat, min_lng, max_lat, max_lng)
+    """
+    d_lat = math.degrees(radius_m / EARTH_RADIUS_M)
+    # 高纬度地区经度跨度急剧增大，限制在合理范围
+    cos_lat = max(math.cos(math.radians(lat)), 0.01)
+    d_lng = min(180.0, d_lat / cos_lat)
+    return max(-90.0, lat - d_lat), max(-180.0, lng - d_lng), min(90.0, lat + d_lat), min(180.0, lng + d_lng)
+
+
+def geohash_encode(lat: float, lng: float, precision: int = 12) -> str:
+    """将经纬度编码为geohash"""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True  # 偶数位编码经度
+    while len(chars) < precision:
+        if even:
+            mid = (lng_range[0] + lng_range[1]) / 2
+            if lng >= mid:
+                value = (value << 1) | 1
+                lng_range[0] = mid
+            else:
+                value <<= 1
+                lng_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if lat >= mid:
+                value = (value << 1) | 1
+                lat_range[0] = mid
+            else:
+                value <<= 1
+                lat_range[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_BASE32[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def geohash_cell_size(precision: int) -> Tuple[float, float]:
+    """某精度下geohash单元格的（纬度跨度，经度跨度），单位为度"""
+    total_bits = precision * 5
+    lng_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lng_bits)
+
+
+def geohash_cell_count(min_lat: float, min_lng: float, max_lat: float, max_lng: float, precision: int) -> int:
+    """某精度下覆盖矩形区域的geohash单元格数，只计算不枚举"""
+    cell_lat, cell_lng = geohash_cell_size(precision)
+    n_lat = math.floor((max_lat + 90.0) / cell_lat) - math.floor((min_lat + 90.0) / cell_lat) + 1
+    n_lng = math.floor((max_lng + 180.0) / cell_lng) - math.floor((min_lng + 180.0) / cell_lng) + 1
+    return n_lat * n_lng
+
+
+def geohash_cover(
+    min_lat: float,
+    min_lng: float,
+    max_lat: float,
+    max_lng: float,
+    max_cells: int = 16
+) -> List[str]:
+    """
+    选择单元格数不超过max_cells的最高精度，返回覆盖矩形区域的geohash单元格（已排序）
+    """
+    precision = 1
+    for candidate in range(12, 0, -1):
+        if geohash_cell_count(min_lat, min_lng, max_lat, max_lng, candidate) <= max_cells:
+            precision = candidate
+            break
+    return geohash_cells(min_lat, min_lng, max_lat, max_lng, precision)
+
+
+def geohash_cells(min_lat: float, min_lng: float, max_lat: float, max_lng: float, precision: int) -> List[str]:
+    """返回某精度下覆盖矩形区域的所有geohash单元格（已排序）"""
+    cell_lat, cell_lng = geohash_cell_size(precision)
+    cells = set()
+    lat_start = math.floor((min_lat + 90.0) / cell_lat)
+    lat_end = math.floor((max_lat + 90.0) / cell_lat)
+    lng_start = math.floor((min_lng + 180.0) / cell_lng)
+    lng_end = math.floor((max_lng + 180.0) / cell_lng)
+    for i in range(lat_start, lat_end + 1):
+        # 取单元格中心点编码，避免边界上的浮点误差
+        lat = min(89.999999, -90.0 + (i + 0.5) * cell_lat)
+        for j in range(lng_start, lng_end + 1):
+            lng = min(179.999999, -180.0 + (j + 0.5) * cell_lng)
+            cells.add(geohash_encode(lat, lng, precision))
+    return sorted(cells)
+
+
+def geohash_successor(prefix: str) -> str:
+    """
+    按geohash字符顺序返回紧随前缀范围之后的字符串，
+    使 prefix <= geohash < successor 等价于 geohash.startswith(prefix)；
+    只使用base32字符，比较结果不受数据库排序规则影响
+    """
+    chars = list(prefix)
+    while chars:
+        index = _BASE32_INDEX[chars[-1]]
+        if index + 1 < len(GEOHASH_BASE32):
+            chars[-1] = GEOHASH_BASE32[index + 1]
+            return "".join(chars)
+        chars.pop()
+    # 前缀全部为'z'时没有上界
+    return ""
+
+
+def geohash_ranges(cells: List[str]) -> List[Tuple[str, str]]:
+    """把已排序的geohash单元格转换为合并后的区间 [start, end)，end为空字符串表示无上界"""
+    ranges: List[Tuple[str, str]] = []
+    for cell in cells:
+        end = geohash_successor(cell)
+        if ranges and ranges[-1][1] == cell:
+            ranges[-1] = (ranges[-1][0], end)
+        else:
+            ranges.append((cell, end))
+    return ranges
+
+
+def haversine_matrix(lats, lngs):
+    """向量化计算所有点两两之间的大圆距离（米），返回 n x n 的numpy数组"""
+    import numpy as np
+
+    phi = np.radians(np.asarray(lats, dtype=np.float64))
+    lam = np.radians(np.asarray(lngs, dtype=np.float64))
+    d_phi = phi[:, None] - phi[None, :]
+    d_lambda = lam[:, None] - lam[None, :]
+    a = np.sin(d_phi / 2) ** 2 + np.cos(phi)[:, None] * np.cos(phi)[None, :] * np.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_M * np.arcsin(np.minimum(1.0, np.sqrt(a)))
@@ -0,0 +1,31 @@
+import re
+from typing import Any, Dict, Optional
+
+from .json_stream import JsonArrayStreamParser
+
+
+class ItineraryStreamParser(JsonArrayStreamParser):
+    """
+    从流式输出的文本中增量提取 ```itinerary 代码块里JSON数组的元素，
+    每个元素的右括号一到达就返回该元素，不等待整个回复结束
+    """
+
+    START_MARKER = "```itinerary"
+    END_MARKER = "```"
+
+    # 行程代码块（未闭合时到文本结尾）及其前后的空行
+    _BLOCK = re.compile(r"\n*```itinerary.*?(?:```|$)\n*", re.DOTALL)
+
+    def __init__(self):
+        super().__init__(self.START_MARKER, self.END_MARKER)
+
+    @classmethod
+    def strip_blocks(cls, text: str) -> str:
+        """去掉文本中的行程代码块，只保留给用户阅读的正文"""
+        return cls._BLOCK.sub("\n\n", text).strip()
+
+    def _parse_item(self, raw: str) -> Optional[Dict[str, Any]]:
+        item = super()._parse_item(raw)
+        if item is not None:
+            item["index"] = self.count
+        return item
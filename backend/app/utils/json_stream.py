@@ -0,0 +1,136 @@
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class JsonArrayStreamParser:
+    """
+    从分块到达的文本中增量提取标记之后JSON数组里的对象元素，
+    每个元素的右括号一到达就返回该元素，不必等待全部文本。
+    未指定结束标记时只提取标记后的第一个数组，之后的文本全部忽略
+    """
+
+    # 数组内需要关注的字符：括号和字符串起止，其余字符整段跳过
+    _STRUCTURAL = re.compile(r'[\[\]{}"]')
+    _STRING_SPECIAL = re.compile(r'["\\]')
+
+    def __init__(self, start_marker: str, end_marker: Optional[str] = None):
+        self.start_marker = start_marker
+        self.end_marker = end_marker
+        self._pending = ""  # 可能是标记前半部分、需要等后续文本确认的内容
+        self._inside = False  # 是否在标记之后
+        self._done = False  # 数组已结束且没有结束标记
+        self._depth = 0  # JSON括号深度，1表示在数组内、元素外
+        self._in_string = False
+        self._escape = False
+        self._item: List[str] = []  # 跨块的未完成元素
+        self.count = 0  # 已提取的元素数
+
+    @property
+    def in_block(self) -> bool:
+        """是否仍在标记之后的区域内，离开后不会再有新元素"""
+        return self._inside and not self._done
+
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        """
+        输入新到达的文本
+        :return: 本次新完成的元素
+        """
+        items = []
+        text = self._pending + text
+        self._pending = ""
+        # 上一块留下的未完成元素从本块开头继续
+        item_start = 0 if self._depth >= 2 else None
+        i = 0
+        n = len(text)
+        while i < n and not self._done:
+            if not self._inside:
+                position = text.find(self.start_marker, i)
+                if position < 0:
+                    self._pending = self._partial_marker(text[i:], self.start_marker)
+                    break
+                i = position + len(self.start_marker)
+                self._inside = True
+                self._depth = 0
+                continue
+
+            if self._depth == 0:
+                # 在数组外：等待数组开始或结束标记
+                array = text.find("[", i)
+                end = text.find(self.end_marker, i) if self.end_marker else -1
+                if end >= 0 and (array < 0 or end < array):
+                    self._inside = False
+                    i = end + len(self.end_marker)
+                    continue
+                if array < 0:
+                    if self.end_marker:
+                        self._pending = self._partial_marker(text[i:], self.end_marker)
+                    break
+                self._depth = 1
+                i = array + 1
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                    i += 1
+                    continue
+                match = self._STRING_SPECIAL.search(text, i)
+                if match is None:
+                    break
+                i = match.end()
+                if match.group() == "\\":
+                    self._escape = True
+                else:
+                    self._in_string = False
+                continue
+
+            match = self._STRUCTURAL.search(text, i)
+            if match is None:
+                break
+            char = match.group()
+            i = match.end()
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+                if self._depth == 2:
+                    item_start = match.start()
+                    self._item = []
+            else:
+                self._depth -= 1
+                if self._depth == 1:
+                    self._item.append(text[item_start:i])
+                    item = self._parse_item("".join(self._item))
+                    if item is not None:
+                        items.append(item)
+                        self.count += 1
+                    self._item = []
+                    item_start = None
+                elif self._depth == 0 and self.end_marker is None:
+                    self._done = True
+
+        if self._depth >= 2 and item_start is not None:
+            self._item.append(text[item_start:])
+        return items
+
+    def _parse_item(self, raw: str) -> Optional[Dict[str, Any]]:
+        try:
+            item = json.loads(raw)
+        except json.JSONDecodeError:
+            logger.warning(f"无法解析JSON元素: {raw[:100]}")
+            return None
+        if not isinstance(item, dict):
+            return None
+        return item
+
+    @staticmethod
+    def _partial_marker(text: str, marker: str) -> str:
+        """返回文本末尾可能是标记前半部分的内容"""
+        for length in range(min(len(marker) - 1, len(text)), 0, -1):
+            if marker.startswith(text[-length:]):
+                return text[-length:]
+        return ""
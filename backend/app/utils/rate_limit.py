@@ -0,0 +1,30 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """异步令牌桶限流器：以固定速率补充令牌，桶容量决定允许的突发请求数"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: int = 1) -> bool:
+        """立即尝试获取令牌，不等待"""
+        self._refill()
+        if self._tokens >= tokens:
+            self._tokens -= tokens
+            return True
+        return False
+
+    async def acquire(self, tokens: int = 1) -> None:
+        """获取令牌，令牌不足时等待补充"""
+        while not self.try_acquire(tokens):
+            await asyncio.sleep((tokens - self._tokens) / self.rate)
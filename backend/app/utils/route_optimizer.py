@@ -0,0 +1,326 @@
+import time
+import random
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# 精确动态规划的最大途经点数，状态数为 2^n * n
+EXACT_HARD_LIMIT = 16
+# 局部搜索连续多少次重启没有改进后提前结束
+MAX_STALE_RESTARTS = 50
+
+
+class RouteProblem:
+    """
+    单日路线规划问题：在营业时间、游览时长和当日预算约束下，
+    选择并排列途经点，使可游览的优先级之和最大，其次使当日结束时间最早
+
+    时间均为当日零点起的秒数；travel为 (n+1) x (n+1) 的交通时间矩阵，
+    下标0为出发地（未指定出发地时对应行列为0），下标1..n为途经点
+    """
+
+    def __init__(
+        self,
+        travel: Sequence[Sequence[float]],
+        open_times: Sequence[float],
+        close_times: Sequence[float],
+        dwell: Sequence[float],
+        costs: Sequence[float],
+        priorities: Sequence[float],
+        day_start: float,
+        day_end: float,
+        budget: Optional[float] = None
+    ):
+        self.n = len(dwell)
+        self.travel = [list(row) for row in travel]
+        self.open_times = list(open_times)
+        self.dwell = list(dwell)
+        self.costs = list(costs)
+        self.priorities = list(priorities)
+        self.day_start = day_start
+        self.day_end = day_end
+        self.budget = budget
+        # 最晚开始游览时间：需在闭馆和当日结束前游览完毕
+        self.latest = [min(close, day_end) - stay for close, stay in zip(close_times, dwell)]
+
+
+def schedule(problem: RouteProblem, route: Sequence[int]) -> Optional[List[float]]:
+    """
+    按顺序模拟一条路线，到达过早时等待开门
+    :param route: 途经点下标（0起）
+    :return: 各途经点的开始游览时间，不可行时返回None
+    """
+    travel = problem.travel
+    t = problem.day_start
+    prev = 0
+    starts = []
+    for k in route:
+        t = max(t + travel[prev][k + 1], problem.open_times[k])
+        if t > problem.latest[k]:
+            return None
+        starts.append(t)
+        t += problem.dwell[k]
+        prev = k + 1
+    if t + travel[prev][0] > problem.day_end:
+        return None
+    return starts
+
+
+def timeline(problem: RouteProblem, route: Sequence[int]) -> Tuple[List[float], List[bool], float]:
+    """
+    按用户指定的顺序模拟路线，不剔除无法安排的途经点
+    :return: (各途经点的开始游览时间, 是否晚于最晚开始时间, 结束时间（含返回出发地）)
+    """
+    travel = problem.travel
+    t = problem.day_start
+    prev = 0
+    starts = []
+    conflicts = []
+    for k in route:
+        t = max(t + travel[prev][k + 1], problem.open_times[k])
+        starts.append(t)
+        conflicts.append(t > problem.latest[k])
+        t += problem.dwell[k]
+        prev = k + 1
+    return starts, conflicts, t + travel[prev][0]
+
+
+def finish_time(problem: RouteProblem, route: Sequence[int]) -> float:
+    """路线的结束时间（含返回出发地），不可行时为无穷大"""
+    starts = schedule(problem, route)
+    if starts is None:
+        return float("inf")
+    if not route:
+        return problem.day_start
+    last = route[-1]
+    return starts[-1] + problem.dwell[last] + problem.travel[last + 1][0]
+
+
+def solve(problem: RouteProblem, time_limit: float, exact_max_stops: int = 12) -> Dict[str, Any]:
+    """
+    求解单日路线：途经点较少时用动态规划求精确解，否则用局部搜索在时限内求近似解
+    :param time_limit: 局部搜索时限（秒）
+    :return: {"order", "starts", "finish", "travel", "cost", "dropped", "method", "optimal"}
+    """
+    if problem.n <= min(exact_max_stops, EXACT_HARD_LIMIT):
+        route = solve_exact(problem)
+        method, optimal = "exact", True
+    else:
+        route = solve_local_search(problem, time.monotonic() + time_limit)
+        method, optimal = "local_search", False
+    return describe(problem, route, method, optimal)
+
+
+def describe(problem: RouteProblem, route: List[int], method: str, optimal: bool) -> Dict[str, Any]:
+    """汇总路线的时间表和开销"""
+    starts = schedule(problem, route) or []
+    travel = 0.0
+    prev = 0
+    for k in route:
+        travel += problem.travel[prev][k + 1]
+        prev = k + 1
+    travel += problem.travel[prev][0]
+    visited = set(route)
+    return {
+        "order": list(route),
+        "starts": starts,
+        "finish": finish_time(problem, route),
+        "travel": travel,
+        "cost": sum(problem.costs[k] for k in route),
+        "dropped": [k for k in range(problem.n) if k not in visited],
+        "method": method,
+        "optimal": optimal,
+    }
+
+
+def solve_exact(problem: RouteProblem) -> List[int]:
+    """
+    Held-Karp动态规划：状态为(已游览集合, 最后一个途经点)，值为最早离开时间。
+    允许等待开门时，更早离开的状态总不劣于更晚离开的状态，因此只需保留最早时间。
+    按集合大小分层，每层对所有集合向量化转移
+    """
+    import numpy as np
+
+    n = problem.n
+    if n == 0:
+        return []
+
+    travel = np.asarray(problem.travel, dtype=np.float64)
+    open_times = np.asarray(problem.open_times, dtype=np.float64)
+    latest = np.asarray(problem.latest, dtype=np.float64)
+    dwell = np.asarray(problem.dwell, dtype=np.float64)
+
+    size = 1 << n
+    masks = np.arange(size, dtype=np.int64)
+    bits = (masks[:, None] >> np.arange(n)) & 1
+    counts = bits.sum(axis=1)
+    mask_costs = bits @ np.asarray(problem.costs, dtype=np.float64)
+    mask_priorities = bits @ np.asarray(problem.priorities, dtype=np.float64)
+    within_budget = np.ones(size, dtype=bool) if problem.budget is None else mask_costs <= problem.budget + 1e-9
+
+    departure = np.full((size, n), np.inf)
+    for k in range(n):
+        start = max(problem.day_start + travel[0, k + 1], open_times[k])
+        if start <= latest[k] and within_budget[1 << k]:
+            departure[1 << k, k] = start + dwell[k]
+
+    for count in range(1, n):
+        layer = masks[counts == count]
+        for j in range(n):
+            from_masks = layer[bits[layer, j] == 1]
+            times = departure[from_masks, j]
+            reachable = np.isfinite(times)
+            from_masks, times = from_masks[reachable], times[reachable]
+            if from_masks.size == 0:
+                continue
+            for k in range(n):
+                if k == j:
+                    continue
+                free = bits[from_masks, k] == 0
+                starts = np.maximum(times[free] + travel[j + 1, k + 1], open_times[k])
+                targets = from_masks[free] | (1 << k)
+                feasible = (starts <= latest[k]) & within_budget[targets]
+                if not feasible.any():
+                    continue
+                targets = targets[feasible]
+                # 同一(j, k)转移中目标集合互不相同，可以直接取最小值
+                departure[targets, k] = np.minimum(departure[targets, k], starts[feasible] + dwell[k])
+
+    finish = departure + travel[1:, 0][None, :]
+    valid = finish <= problem.day_end
+    if not valid.any():
+        return []
+
+    # 优先级之和最大，其次结束时间最早
+    priorities = np.where(valid, mask_priorities[:, None], -np.inf)
+    best_priority = priorities.max()
+    candidates = np.where(priorities >= best_priority - 1e-9, finish, np.inf)
+    mask, last = np.unravel_index(int(np.argmin(candidates)), candidates.shape)
+    mask, last = int(mask), int(last)
+
+    # 回溯：找到能以相同时间到达当前状态的前驱
+    route = [last]
+    while mask & (mask - 1):
+        target = departure[mask, last]
+        mask ^= 1 << last
+        for j in range(n):
+            if not (mask >> j) & 1 or not np.isfinite(departure[mask, j]):
+                continue
+            start = max(departure[mask, j] + travel[j + 1, last + 1], open_times[last])
+            if abs(start + dwell[last] - target) < 1e-6:
+                last = j
+                break
+        else:
+            raise RuntimeError("动态规划回溯失败")
+        route.append(last)
+    route.reverse()
+    return route
+
+
+def solve_local_search(problem: RouteProblem, deadline: float, seed: int = 0) -> List[int]:
+    """
+    贪心插入构造初始路线，再交替使用2-opt、Or-opt和插入未游览点改进到局部最优；
+    时间有余时按优先级加权随机的插入顺序多次重启，保留最好的路线
+    """
+    rng = random.Random(seed)
+    order = sorted(range(problem.n), key=lambda k: (-problem.priorities[k], problem.latest[k]))
+    best = _improve(problem, _insert_unvisited(problem, [], None, order), deadline)
+    best_score = _score(problem, best)
+
+    stale = 0
+    while time.monotonic() < deadline and stale < MAX_STALE_RESTARTS:
+        # 加权随机排列：优先级越高越可能排在前面
+        order = sorted(range(problem.n), key=lambda k: -rng.random() ** (1.0 / problem.priorities[k]))
+        route = _improve(problem, _insert_unvisited(problem, [], deadline, order), deadline)
+        score = _score(problem, route)
+        if score > best_score:
+            best, best_score = route, score
+            stale = 0
+        else:
+            stale += 1
+    return best
+
+
+def _improve(problem: RouteProblem, route: List[int], deadline: float) -> List[int]:
+    while time.monotonic() < deadline:
+        improved = _two_opt(problem, route, deadline) or _or_opt(problem, route, deadline)
+        # 路线缩短后可能腾出时间容纳更多途经点
+        longer = _insert_unvisited(problem, route, deadline)
+        if len(longer) > len(route):
+            route = longer
+            improved = True
+        if not improved:
+            break
+    return route
+
+
+def _score(problem: RouteProblem, route: Sequence[int]):
+    """优先级之和越大越好，其次结束时间越早越好"""
+    return round(sum(problem.priorities[k] for k in route), 9), -finish_time(problem, route)
+
+
+def _route_cost(problem: RouteProblem, route: Sequence[int]) -> float:
+    return sum(problem.costs[k] for k in route)
+
+
+def _insert_unvisited(
+    problem: RouteProblem,
+    route: List[int],
+    deadline: Optional[float],
+    order: Optional[Sequence[int]] = None
+) -> List[int]:
+    """按给定顺序（默认优先级从高到低）把未游览的点插入到使结束时间最早的可行位置"""
+    route = list(route)
+    visited = set(route)
+    spent = _route_cost(problem, route)
+    if order is None:
+        order = sorted(range(problem.n), key=lambda k: (-problem.priorities[k], problem.latest[k]))
+    for k in order:
+        if k in visited:
+            continue
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+        if problem.budget is not None and spent + problem.costs[k] > problem.budget + 1e-9:
+            continue
+        best_finish = float("inf")
+        best_position = None
+        for position in range(len(route) + 1):
+            finish = finish_time(problem, route[:position] + [k] + route[position:])
+            if finish < best_finish:
+                best_finish = finish
+                best_position = position
+        if best_position is not None:
+            route.insert(best_position, k)
+            spent += problem.costs[k]
+    return route
+
+
+def _two_opt(problem: RouteProblem, route: List[int], deadline: float) -> bool:
+    """反转一段路线，接受第一个使结束时间提前的反转"""
+    current = finish_time(problem, route)
+    for i in range(len(route) - 1):
+        if time.monotonic() >= deadline:
+            return False
+        for j in range(i + 1, len(route)):
+            candidate = route[:i] + route[i:j + 1][::-1] + route[j + 1:]
+            if finish_time(problem, candidate) < current - 1e-6:
+                route[:] = candidate
+                return True
+    return False
+
+
+def _or_opt(problem: RouteProblem, route: List[int], deadline: float) -> bool:
+    """把连续1到3个途经点移动到其他位置，接受第一个使结束时间提前的移动"""
+    current = finish_time(problem, route)
+    for length in (1, 2, 3):
+        for i in range(len(route) - length + 1):
+            if time.monotonic() >= deadline:
+                return False
+            segment = route[i:i + length]
+            rest = route[:i] + route[i + length:]
+            for position in range(len(rest) + 1):
+                if position == i:
+                    continue
+                candidate = rest[:position] + segment + rest[position:]
+                if finish_time(problem, candidate) < current - 1e-6:
+                    route[:] = candidate
+                    return True
+    return False
@@ -0,0 +1,27 @@
+import math
+import re
+import unicodedata
+
+
+def normalize_name(name: str) -> str:
+    """统一全角半角和兼容字符，合并连续空白"""
+    return " ".join(unicodedata.normalize("NFKC", name).split())
+
+
+def name_key(name: str) -> str:
+    """用于比较和检索名称的键：统一全角半角，忽略大小写、空白和标点"""
+    return "".join(char for char in unicodedata.normalize("NFKC", name).casefold() if char.isalnum())
+
+
+# 中日韩文字大约每个字一个token：假名、CJK扩展A、CJK统一汉字、谚文音节、CJK兼容汉字
+_CJK_PATTERN = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯豈-﫿]")
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    在没有分词器时估算token数：中日韩文字按每字1个，其他字符按每4个1个
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK_PATTERN.findall(text))
+    return cjk + math.ceil((len(text) - cjk) / 4)
@@ -0,0 +1,194 @@
+"""
+高德地图客户端检查：启动本地模拟上游服务（benchmarks.fakes），验证AMapClient的缓存、
+并发未命中、限流、错误处理和测距结果，任一检查失败时以非零状态退出
+
+默认使用临时SQLite数据库，传入--database-url可改用PostgreSQL（会在其中建表）。
+
+用法（在backend目录下）:
+    python -m benchmarks.amap_check [--database-url postgresql://...]
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, List, Tuple
+
+import httpx
+
+from benchmarks.load import BACKEND_DIR, free_port
+
+# 限流参数：突发5个，之后每秒10个
+QPS = 10
+BURST = 5
+
+checks: List[Tuple[str, Callable]] = []
+
+
+def check(name: str):
+    def register(func):
+        checks.append((name, func))
+        return func
+    return register
+
+
+async def calls(fake_url: str) -> dict:
+    async with httpx.AsyncClient() as client:
+        return (await client.get(f"{fake_url}/amap/calls")).json()
+
+
+def fresh_client():
+    from app.core.database import SessionLocal
+    from app.services.amap_client import AMapClient
+
+    return AMapClient(SessionLocal())
+
+
+@check("内存缓存和持久化缓存命中时不请求上游")
+async def check_cache(fake_url: str) -> None:
+    from app.services.amap_client import AMapClient
+
+    first = await fresh_client().geocode("天安门", city="北京")
+    # 参数规范化后视为同一查询
+    second = await fresh_client().geocode(" 天安门 ", city="北京")
+    AMapClient._memory_cache.clear()
+    third = await fresh_client().geocode("天安门", city="北京")
+    assert first == second == third, "缓存结果与首次结果不一致"
+    assert (await calls(fake_url)).get("/amap/v3/geocode/geo") == 1, "缓存命中时仍请求了上游"
+
+
+@check("并发未命中同一查询时都能写入缓存")
+async def check_concurrent_miss(fake_url: str) -> None:
+    from app.core.database import SessionLocal
+    from app.models.map_cache import MapQueryCache
+
+    results = await asyncio.gather(*(fresh_client().geocode("故宫博物院") for _ in range(4)))
+    assert all(result == results[0] for result in results), "并发请求结果不一致"
+    with SessionLocal() as db:
+        assert db.query(MapQueryCache).filter(MapQueryCache.kind == "geocode").count() == 2, "缓存行数不正确"
+
+
+@check("搜索结果写入兴趣点表，空字段转换为None")
+async def check_search(fake_url: str) -> None:
+    pois = await fresh_client().search_pois("公园", city="北京")
+    assert [poi["name"] for poi in pois] == ["公园一号", "公园二号"], pois
+    assert pois[1]["address"] is None and pois[1]["rating"] is None, pois[1]
+
+
+@check("搜索命中缓存时只读取兴趣点，不提交也不使热点区域失效")
+async def check_search_cache_read_only(fake_url: str) -> None:
+    from sqlalchemy import event
+
+    from app.services.map_service import REGION_PRECISION, MapService
+
+    first = await fresh_client().search_pois("公园", city="北京")
+    region = first[0]["geohash"][:REGION_PRECISION]
+    MapService._hot_regions.set(region, (0.0, []))
+
+    client = fresh_client()
+    commits = []
+    event.listen(client.db, "after_commit", lambda session: commits.append(session))
+    second = await client.search_pois("公园", city="北京")
+    assert second == first, "缓存命中时结果与首次结果不一致"
+    assert not commits, "缓存命中时提交了会话"
+    assert MapService._hot_regions.get(region) is not None, "缓存命中时热点区域被清除"
+    assert (await calls(fake_url)).get("/amap/v3/place/text") == 1, "缓存命中时仍请求了上游"
+
+
+@check("上游返回错误状态时抛出ExternalServiceException")
+async def check_error(fake_url: str) -> None:
+    from app.core.exceptions import ExternalServiceException
+
+    try:
+        await fresh_client().search_pois("error")
+    except ExternalServiceException as e:
+        assert "INVALID_PARAMS" in str(e), str(e)
+    else:
+        raise AssertionError("未抛出异常")
+
+
+@check("测距结果与起点顺序一致")
+async def check_distance(fake_url: str) -> None:
+    destination = (39.908, 116.397)
+    origins = [(39.918, 116.397), (39.908, 116.397), (39.928, 116.397)]
+    results = await fresh_client().distance(origins, destination)
+    assert [int(meters) for meters, _ in results] == [1000, 0, 2000], results
+
+
+@check("超出突发量的请求按QPS限流")
+async def check_rate_limit(fake_url: str) -> None:
+    from app.services.amap_client import AMapClient
+
+    # 等令牌桶回满后发出突发量加10个请求，超出的部分至少需要10/QPS秒
+    await asyncio.sleep(BURST / QPS)
+    started = time.perf_counter()
+    await asyncio.gather(*(AMapClient._send("/v3/geocode/geo", {"address": f"地址{i}"}) for i in range(BURST + 10)))
+    elapsed = time.perf_counter() - started
+    assert elapsed >= 10 / QPS * 0.9, f"{BURST + 10}个请求只用了{elapsed:.2f}秒"
+
+
+async def run(fake_url: str) -> int:
+    from app.services.amap_client import AMapClient
+
+    failed = 0
+    try:
+        for name, func in checks:
+            try:
+                await func(fake_url)
+                print(f"通过  {name}")
+            except Exception as e:
+                failed += 1
+                print(f"失败  {name}: {type(e).__name__}: {e}")
+    finally:
+        await AMapClient.close()
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database-url", default=None)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="trip-master-amap-")
+    fake_port = free_port()
+    fake_url = f"http://127.0.0.1:{fake_port}"
+    os.environ.update({
+        "DATABASE_URL": args.database_url or f"sqlite:///{os.path.join(workdir, 'amap.db')}",
+        "AMAP_API_KEY": "fake-key",
+        "AMAP_BASE_URL": f"{fake_url}/amap",
+        "AMAP_QPS": str(QPS),
+        "AMAP_BURST": str(BURST),
+    })
+    # 设置环境变量后再导入，使配置生效
+    from benchmarks.app_server import prepare_database
+
+    prepare_database(users=0)
+
+    env = {k: v for k, v in os.environ.items() if k != "WEB_CONCURRENCY"}
+    fake = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.fakes", "--port", str(fake_port)],
+        cwd=BACKEND_DIR, env=env
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while True:
+            try:
+                httpx.get(f"{fake_url}/amap/calls")
+                break
+            except httpx.HTTPError:
+                if fake.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("模拟上游服务启动失败")
+                time.sleep(0.1)
+        failed = asyncio.run(run(fake_url))
+    finally:
+        fake.terminate()
+        fake.wait(timeout=15)
+
+    print(f"{len(checks) - failed}/{len(checks)} 项检查通过（工作目录: {workdir}）")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
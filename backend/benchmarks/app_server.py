@@ -0,0 +1,68 @@
+"""
+基准测试中启动的应用进程：按DATABASE_URL建表（SQLite时把PostgreSQL的UUID类型存为CHAR(32)），
+然后用uvicorn启动app.main:app。上游服务地址等配置通过环境变量传入，见benchmarks.load
+
+用法（在backend目录下）:
+    python -m benchmarks.app_server [--port 18000]
+"""
+import argparse
+import os
+import uuid
+from typing import Any, Dict, List
+
+
+def _register_sqlite_uuid() -> None:
+    """SQLite没有UUID类型，建表时按32位十六进制字符串存储"""
+    from sqlalchemy.dialects.postgresql import UUID
+    from sqlalchemy.ext.compiler import compiles
+
+    @compiles(UUID, "sqlite")
+    def compile_uuid(type_, compiler, **kw):
+        return "CHAR(32)"
+
+
+def prepare_database(users: int, chats_per_user: int = 1) -> List[Dict[str, Any]]:
+    """
+    建表并写入测试用户和聊天，返回[{"user_id", "email", "chat_ids"}]
+    须在设置DATABASE_URL环境变量之后调用
+    """
+    if os.environ.get("DATABASE_URL", "").startswith("sqlite"):
+        _register_sqlite_uuid()
+
+    from app.core.database import Base, SessionLocal, dispose_engine, get_engine
+    from app.models.chat import Chat
+    from app.models.user import User
+    import app.models  # noqa: F401  注册所有表
+
+    Base.metadata.create_all(get_engine())
+    fixtures = []
+    with SessionLocal() as db:
+        for i in range(users):
+            user_id = uuid.uuid4()
+            email = f"bench-{user_id.hex[:12]}@example.com"
+            db.add(User(id=user_id, email=email, username=f"bench{user_id.hex[:12]}", name=f"压测用户{i}"))
+            chat_ids = [uuid.uuid4() for _ in range(chats_per_user)]
+            for chat_id in chat_ids:
+                db.add(Chat(id=chat_id, user_id=user_id, title="压测对话"))
+            fixtures.append({"user_id": str(user_id), "email": email, "chat_ids": [str(c) for c in chat_ids]})
+        db.commit()
+    dispose_engine()
+    return fixtures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=18000)
+    args = parser.parse_args()
+
+    if os.environ.get("DATABASE_URL", "").startswith("sqlite"):
+        _register_sqlite_uuid()
+
+    import uvicorn
+    from app.main import app
+
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
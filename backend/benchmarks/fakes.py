@@ -0,0 +1,223 @@
+"""
+基准测试用的本地模拟上游服务，一个进程同时提供：
+
+- OpenAI兼容的对话接口 POST /llm/chat/completions，可配置首个token延迟和生成速度
+- 科大讯飞语音听写 WS /iflytek/v2/iat 和语音合成 WS /iflytek/v2/tts
+- Supabase Auth的 GET /auth/v1/user，按访问令牌（JWT，不校验签名）中的sub返回用户
+- 高德地图Web服务的关键字搜索、地理编码和测距 GET /amap/v3/...，GET /amap/calls 返回各接口被调用的次数
+
+用法（在backend目录下）:
+    python -m benchmarks.fakes [--port 18090] [--ttft-ms 300] [--tokens-per-second 40] [--tokens 120]
+"""
+import argparse
+import asyncio
+import base64
+import json
+import math
+import os
+import time
+from collections import Counter
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route, WebSocketRoute
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+# 通过环境变量传给uvicorn启动的进程
+TTFT_SECONDS = float(os.environ.get("FAKE_LLM_TTFT_MS", "300")) / 1000
+TOKENS_PER_SECOND = float(os.environ.get("FAKE_LLM_TOKENS_PER_SECOND", "40"))
+COMPLETION_TOKENS = int(os.environ.get("FAKE_LLM_TOKENS", "120"))
+AUTH_LATENCY_SECONDS = float(os.environ.get("FAKE_AUTH_LATENCY_MS", "20")) / 1000
+ASR_LATENCY_SECONDS = float(os.environ.get("FAKE_ASR_LATENCY_MS", "150")) / 1000
+TTS_LATENCY_SECONDS = float(os.environ.get("FAKE_TTS_LATENCY_MS", "100")) / 1000
+AMAP_LATENCY_SECONDS = float(os.environ.get("FAKE_AMAP_LATENCY_MS", "50")) / 1000
+
+# 高德地图各接口被调用的次数
+amap_calls: Counter = Counter()
+
+# 回复内容按token循环使用
+REPLY_TOKENS = (
+    ["好的", "，", "为您", "规划", "一日", "游", "：", "上午", "参观", "故宫", "，", "下午", "游览", "景山", "公园", "。"] * 8
+)
+
+
+async def chat_completions(request: Request):
+    body = await request.json()
+    prompt_tokens = sum(len(m.get("content") or "") for m in body.get("messages", [])) // 2 + 1
+    tokens = [REPLY_TOKENS[i % len(REPLY_TOKENS)] for i in range(COMPLETION_TOKENS)]
+    usage = {"prompt_tokens": prompt_tokens, "completion_tokens": len(tokens), "total_tokens": prompt_tokens + len(tokens)}
+
+    if not body.get("stream"):
+        await asyncio.sleep(TTFT_SECONDS + len(tokens) / TOKENS_PER_SECOND)
+        return JSONResponse({
+            "id": "fake-completion",
+            "model": body.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(tokens)}, "finish_reason": "stop"}],
+            "usage": usage,
+        })
+
+    async def stream():
+        await asyncio.sleep(TTFT_SECONDS)
+        started = time.perf_counter()
+        for i, token in enumerate(tokens):
+            # 按生成速度计算每个token的发送时间，避免sleep误差累积
+            delay = started + i / TOKENS_PER_SECOND - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            chunk = {"id": "fake-completion", "choices": [{"index": 0, "delta": {"content": token}}]}
+            yield f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+        yield f"data: {json.dumps({'id': 'fake-completion', 'choices': [], 'usage': usage})}\n\n"
+        yield "data: [DONE]\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
+
+def _jwt_payload(token: str) -> dict:
+    payload = token.split(".")[1]
+    return json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+
+
+async def auth_user(request: Request):
+    await asyncio.sleep(AUTH_LATENCY_SECONDS)
+    authorization = request.headers.get("authorization", "")
+    try:
+        payload = _jwt_payload(authorization.removeprefix("Bearer "))
+    except (IndexError, ValueError):
+        return JSONResponse({"msg": "invalid JWT"}, status_code=401)
+    return JSONResponse({
+        "id": payload["sub"],
+        "aud": "authenticated",
+        "role": "authenticated",
+        "email": payload.get("email"),
+        "app_metadata": {"provider": "email"},
+        "user_metadata": {},
+        "created_at": "2024-01-01T00:00:00Z",
+    })
+
+
+async def iflytek_iat(websocket: WebSocket):
+    """收到最后一帧（status=2）后返回识别结果"""
+    await websocket.accept()
+    received = 0
+    try:
+        while True:
+            frame = json.loads(await websocket.receive_text())
+            data = frame.get("data") or {}
+            received += len(data.get("audio") or "") * 3 // 4
+            if data.get("status") == 2:
+                break
+        await asyncio.sleep(ASR_LATENCY_SECONDS)
+        words = [{"bg": 0, "cw": [{"w": "我想去"}]}, {"bg": 1, "cw": [{"w": f"北京玩三天（{received}字节）"}]}]
+        await websocket.send_text(json.dumps({
+            "code": 0, "message": "success", "sid": "fake-iat",
+            "data": {"status": 2, "result": {"pgs": "apd", "ws": words}},
+        }, ensure_ascii=False))
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
+
+async def iflytek_tts(websocket: WebSocket):
+    """按文本长度分几帧返回音频"""
+    await websocket.accept()
+    try:
+        request = json.loads(await websocket.receive_text())
+        text = base64.b64decode(request["data"]["text"]).decode("utf-8")
+        await asyncio.sleep(TTS_LATENCY_SECONDS)
+        frames = max(1, len(text) // 10)
+        for i in range(frames):
+            audio = base64.b64encode(os.urandom(1600)).decode("ascii")
+            await websocket.send_text(json.dumps({
+                "code": 0, "message": "success", "sid": "fake-tts",
+                "data": {"status": 2 if i == frames - 1 else 1, "audio": audio},
+            }))
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
+
+async def _amap_call(request: Request):
+    """记录调用并模拟延迟；缺少key时按高德的格式返回错误"""
+    amap_calls[request.url.path] += 1
+    await asyncio.sleep(AMAP_LATENCY_SECONDS)
+    if not request.query_params.get("key"):
+        return JSONResponse({"status": "0", "info": "INVALID_USER_KEY", "infocode": "10001"})
+    return None
+
+
+async def amap_place_text(request: Request):
+    """关键字为error时返回错误，其余返回两个兴趣点（空字段与高德一样为空列表）"""
+    error = await _amap_call(request)
+    if error is not None:
+        return error
+    keywords = request.query_params.get("keywords", "")
+    if keywords == "error":
+        return JSONResponse({"status": "0", "info": "INVALID_PARAMS", "infocode": "20000"})
+    return JSONResponse({"status": "1", "count": "2", "pois": [
+        {"id": f"FAKE-{keywords}-1", "name": f"{keywords}一号", "type": "风景名胜;公园广场;公园", "address": "长安街",
+         "location": "116.397,39.908", "biz_ext": {"rating": "4.8"}, "photos": [{"url": "http://example.com/1.jpg"}]},
+        {"id": f"FAKE-{keywords}-2", "name": f"{keywords}二号", "type": "风景名胜", "address": [],
+         "location": "116.397,39.918", "biz_ext": {"rating": []}, "photos": []},
+    ]})
+
+
+async def amap_geocode(request: Request):
+    error = await _amap_call(request)
+    if error is not None:
+        return error
+    return JSONResponse({"status": "1", "geocodes": [{
+        "formatted_address": request.query_params.get("address"), "province": "北京市", "city": "北京市",
+        "district": "东城区", "level": "兴趣点", "location": "116.397,39.908",
+    }]})
+
+
+async def amap_distance(request: Request):
+    """按平面距离估算，每个起点一条结果"""
+    error = await _amap_call(request)
+    if error is not None:
+        return error
+    destination = [float(v) for v in request.query_params["destination"].split(",")]
+    results = []
+    for i, origin in enumerate(request.query_params["origins"].split("|")):
+        lng, lat = (float(v) for v in origin.split(","))
+        meters = math.hypot(lng - destination[0], lat - destination[1]) * 100000
+        results.append({"origin_id": str(i + 1), "dest_id": "1", "distance": str(round(meters)), "duration": str(round(meters / 10))})
+    return JSONResponse({"status": "1", "results": results})
+
+
+async def amap_call_counts(request: Request):
+    return JSONResponse(dict(amap_calls))
+
+
+app = Starlette(routes=[
+    Route("/llm/chat/completions", chat_completions, methods=["POST"]),
+    Route("/auth/v1/user", auth_user, methods=["GET"]),
+    Route("/amap/v3/place/text", amap_place_text, methods=["GET"]),
+    Route("/amap/v3/geocode/geo", amap_geocode, methods=["GET"]),
+    Route("/amap/v3/distance", amap_distance, methods=["GET"]),
+    Route("/amap/calls", amap_call_counts, methods=["GET"]),
+    WebSocketRoute("/iflytek/v2/iat", iflytek_iat),
+    WebSocketRoute("/iflytek/v2/tts", iflytek_tts),
+])
+
+
+def main():
+    global TTFT_SECONDS, TOKENS_PER_SECOND, COMPLETION_TOKENS
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=18090)
+    parser.add_argument("--ttft-ms", type=float, default=TTFT_SECONDS * 1000)
+    parser.add_argument("--tokens-per-second", type=float, default=TOKENS_PER_SECOND)
+    parser.add_argument("--tokens", type=int, default=COMPLETION_TOKENS)
+    args = parser.parse_args()
+
+    TTFT_SECONDS = args.ttft_ms / 1000
+    TOKENS_PER_SECOND = args.tokens_per_second
+    COMPLETION_TOKENS = args.tokens
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
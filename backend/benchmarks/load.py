@@ -0,0 +1,345 @@
+"""
+端到端压测：启动本地模拟上游服务（benchmarks.fakes）和app.main:app，按场景施加并发负载，
+报告每个场景的吞吐量、p50/p99延迟和应用进程内存（RSS）
+
+场景：
+    sse    流式聊天补全（另报告首字节延迟）
+    ws     连接聊天室WebSocket并保持一段时间（报告握手延迟）
+    voice  上传WAV音频进行语音识别
+    mixed  以上三种按6:2:2混合
+
+默认使用临时SQLite数据库，传入--database-url可改用PostgreSQL（会在其中建表并写入测试数据）。
+
+用法（在backend目录下）:
+    python -m benchmarks.load [--scenarios sse,ws,voice,mixed] [--concurrency 20] [--duration 20]
+                              [--ttft-ms 300] [--tokens-per-second 40] [--tokens 120] [--json result.json]
+"""
+import argparse
+import asyncio
+import io
+import json
+import math
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from array import array
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# mixed场景中各操作的权重
+MIX = (("sse", 6), ("voice", 2), ("ws", 2))
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def rss_mb(pid: int) -> float:
+    """进程当前的常驻内存（MB），仅支持Linux"""
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return float("nan")
+
+
+def percentile(values: List[float], p: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(math.ceil(p / 100 * len(values))) - 1)]
+
+
+def make_wav(seconds: float, sample_rate: int = 16000) -> bytes:
+    """合成一段“说话”音频：音节长度的带噪声音，中间有短暂停顿，使端点检测能切出语音段"""
+    rng = random.Random(42)
+    samples = array("h")
+    for i in range(int(seconds * sample_rate)):
+        t = i / sample_rate
+        voiced = (t % 0.6) < 0.45
+        value = (math.sin(2 * math.pi * 220 * t) * 0.5 + rng.uniform(-0.2, 0.2)) if voiced else rng.uniform(-0.01, 0.01)
+        samples.append(int(value * 12000))
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(sample_rate)
+        f.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+
+def make_token(claims: Dict[str, Any]) -> str:
+    """模拟Supabase签发的JWT（Supabase客户端要求anon key也是JWT），模拟服务不校验签名"""
+    from jose import jwt
+
+    return jwt.encode(dict(claims, exp=int(time.time()) + 24 * 3600), "benchmark-secret", algorithm="HS256")
+
+
+class Result:
+    """一个场景中某种操作的测量结果"""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.first_byte: List[float] = []
+        self.errors = 0
+        self.last_error: Optional[str] = None
+
+
+class Harness:
+    def __init__(self, args):
+        self.args = args
+        self.workdir = tempfile.mkdtemp(prefix="trip-master-bench-")
+        self.fake_port = free_port()
+        self.app_port = free_port()
+        self.base_url = f"http://127.0.0.1:{self.app_port}"
+        self.processes: List[subprocess.Popen] = []
+        self.fixtures: List[Dict[str, Any]] = []
+        self.tokens: List[str] = []
+        self.wav = make_wav(args.audio_seconds)
+        self._next = 0
+
+    def app_env(self) -> Dict[str, str]:
+        fake = f"127.0.0.1:{self.fake_port}"
+        env = dict(os.environ)
+        env.update({
+            "DATABASE_URL": self.args.database_url or f"sqlite:///{os.path.join(self.workdir, 'bench.db')}",
+            "AI_API_KEY": "fake-key",
+            "AI_API_BASE_URL": f"http://{fake}/llm",
+            "SUPABASE_URL": f"http://{fake}",
+            "SUPABASE_ANON_KEY": make_token({"role": "anon", "iss": "supabase"}),
+            "XUNFEI_APP_ID": "fake-app",
+            "XUNFEI_API_KEY": "fake-key",
+            "XUNFEI_API_SECRET": "fake-secret",
+            "XUNFEI_IAT_URL": f"ws://{fake}/iflytek/v2/iat",
+            "XUNFEI_TTS_URL": f"ws://{fake}/iflytek/v2/tts",
+            # 压测用户不受配额限制，也不在启动时预热无关的索引
+            "LLM_QUOTA_ENABLED": "False",
+            "AUTOCOMPLETE_WARMUP": "False",
+            "TTS_CACHE_DIR": os.path.join(self.workdir, "tts-cache"),
+            "FAKE_LLM_TTFT_MS": str(self.args.ttft_ms),
+            "FAKE_LLM_TOKENS_PER_SECOND": str(self.args.tokens_per_second),
+            "FAKE_LLM_TOKENS": str(self.args.tokens),
+            "PYTHONPATH": BACKEND_DIR,
+        })
+        return env
+
+    def start(self) -> None:
+        env = self.app_env()
+        os.environ.update({k: v for k, v in env.items() if k != "PYTHONPATH"})
+        from benchmarks.app_server import prepare_database
+
+        self.fixtures = prepare_database(self.args.users)
+        self.tokens = [
+            make_token({"sub": fixture["user_id"], "email": fixture["email"], "role": "authenticated"})
+            for fixture in self.fixtures
+        ]
+
+        log = open(os.path.join(self.workdir, "app.log"), "wb")
+        self.processes.append(subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.fakes", "--port", str(self.fake_port)],
+            cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT
+        ))
+        self.processes.append(subprocess.Popen(
+            [sys.executable, "-m", "benchmarks.app_server", "--port", str(self.app_port)],
+            cwd=BACKEND_DIR, env=env, stdout=log, stderr=subprocess.STDOUT
+        ))
+        for port in (self.fake_port, self.app_port):
+            self._wait_for_port(port)
+        print(f"工作目录: {self.workdir}（应用日志见app.log）")
+
+    def _wait_for_port(self, port: int, timeout: float = 60) -> None:
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if any(p.poll() is not None for p in self.processes):
+                raise RuntimeError(f"进程启动失败，详见 {self.workdir}/app.log")
+            with socket.socket() as sock:
+                if sock.connect_ex(("127.0.0.1", port)) == 0:
+                    return
+            time.sleep(0.1)
+        raise RuntimeError(f"等待端口 {port} 超时")
+
+    def stop(self) -> None:
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    @property
+    def app_pid(self) -> int:
+        return self.processes[1].pid
+
+    def pick(self):
+        """轮流选择测试用户和聊天"""
+        self._next += 1
+        i = self._next % len(self.fixtures)
+        return self.fixtures[i], self.tokens[i]
+
+    # 各场景的单次操作，把耗时记入result；流式补全另记录首字节时间
+
+    async def op_sse(self, client: httpx.AsyncClient, result: Result) -> None:
+        fixture, token = self.pick()
+        chat_id = fixture["chat_ids"][0]
+        body = {"messages": [{"role": "user", "content": "帮我规划北京三日游"}], "stream": True}
+        started = time.perf_counter()
+        first_byte = None
+        async with client.stream(
+            "POST", f"/api/chats/{chat_id}/completions", json=body,
+            headers={"Authorization": f"Bearer {token}"}
+        ) as response:
+            if response.status_code != 200:
+                raise RuntimeError(f"HTTP {response.status_code}: {(await response.aread()).decode()[:200]}")
+            async for line in response.aiter_lines():
+                if first_byte is None and line.startswith("data:"):
+                    first_byte = time.perf_counter() - started
+        result.latencies.append(time.perf_counter() - started)
+        if first_byte is not None:
+            result.first_byte.append(first_byte)
+
+    async def op_voice(self, client: httpx.AsyncClient, result: Result) -> None:
+        _, token = self.pick()
+        started = time.perf_counter()
+        response = await client.post(
+            "/api/speech/speech-to-text",
+            files={"audio_file": ("speech.wav", self.wav, "audio/wav")},
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}: {response.text[:200]}")
+        result.latencies.append(time.perf_counter() - started)
+
+    async def op_ws(self, client: httpx.AsyncClient, result: Result) -> None:
+        import websockets
+
+        fixture, token = self.pick()
+        # 多个用户加入同一批聊天室
+        room = self.fixtures[self._next % self.args.rooms]["chat_ids"][0]
+        started = time.perf_counter()
+        async with websockets.connect(f"ws://127.0.0.1:{self.app_port}/api/ws/{room}?token={token}") as websocket:
+            result.latencies.append(time.perf_counter() - started)
+            deadline = time.monotonic() + self.args.ws_hold
+            while time.monotonic() < deadline:
+                await websocket.send("ping")
+                await asyncio.sleep(1)
+
+    async def run_scenario(self, name: str) -> Dict[str, Any]:
+        ops = {"sse": self.op_sse, "voice": self.op_voice, "ws": self.op_ws}
+        if name == "mixed":
+            choices = [op for op, weight in MIX for _ in range(weight)]
+        else:
+            choices = [name]
+        results: Dict[str, Result] = {op: Result() for op in set(choices)}
+        rng = random.Random(0)
+        deadline = time.monotonic() + self.args.duration
+
+        async def worker(client: httpx.AsyncClient):
+            while time.monotonic() < deadline:
+                op = rng.choice(choices)
+                try:
+                    await ops[op](client, results[op])
+                except Exception as e:
+                    results[op].errors += 1
+                    results[op].last_error = f"{type(e).__name__}: {e}"
+
+        peak_rss = 0.0
+
+        async def sample_rss():
+            nonlocal peak_rss
+            while True:
+                peak_rss = max(peak_rss, rss_mb(self.app_pid))
+                await asyncio.sleep(0.2)
+
+        limits = httpx.Limits(max_connections=self.args.concurrency, max_keepalive_connections=self.args.concurrency)
+        async with httpx.AsyncClient(base_url=self.base_url, timeout=120, limits=limits) as client:
+            sampler = asyncio.create_task(sample_rss())
+            started = time.perf_counter()
+            await asyncio.gather(*[worker(client) for _ in range(self.args.concurrency)])
+            elapsed = time.perf_counter() - started
+            sampler.cancel()
+
+        rss = rss_mb(self.app_pid)
+        report = {"scenario": name, "seconds": elapsed, "rss_mb": rss, "peak_rss_mb": max(peak_rss, rss), "ops": {}}
+        for op, result in sorted(results.items()):
+            report["ops"][op] = {
+                "ok": len(result.latencies),
+                "errors": result.errors,
+                "throughput": len(result.latencies) / elapsed,
+                "p50_ms": percentile(result.latencies, 50) * 1000,
+                "p99_ms": percentile(result.latencies, 99) * 1000,
+                "ttfb_p50_ms": percentile(result.first_byte, 50) * 1000 if result.first_byte else None,
+                "ttfb_p99_ms": percentile(result.first_byte, 99) * 1000 if result.first_byte else None,
+                "last_error": result.last_error,
+            }
+        return report
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    for op, stats in report["ops"].items():
+        ttfb = (
+            f"{stats['ttfb_p50_ms']:>9.0f} {stats['ttfb_p99_ms']:>9.0f}"
+            if stats["ttfb_p50_ms"] is not None else f"{'-':>9} {'-':>9}"
+        )
+        print(
+            f"{report['scenario']:<8} {op:<6} {stats['ok']:>6} {stats['errors']:>6} {stats['throughput']:>8.1f} "
+            f"{stats['p50_ms']:>9.0f} {stats['p99_ms']:>9.0f} {ttfb} "
+            f"{report['rss_mb']:>8.0f} {report['peak_rss_mb']:>8.0f}"
+        )
+        if stats["last_error"]:
+            print(f"    最后一个错误: {stats['last_error'][:200]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scenarios", default="sse,ws,voice,mixed")
+    parser.add_argument("--concurrency", type=int, default=20, help="并发客户端数")
+    parser.add_argument("--duration", type=float, default=20, help="每个场景的持续时间（秒）")
+    parser.add_argument("--users", type=int, default=50, help="测试用户数，每个用户一个聊天")
+    parser.add_argument("--rooms", type=int, default=5, help="ws场景中的聊天室数")
+    parser.add_argument("--ws-hold", type=float, default=5, help="ws场景中每个连接保持的时间（秒）")
+    parser.add_argument("--audio-seconds", type=float, default=3, help="voice场景上传的音频时长")
+    parser.add_argument("--ttft-ms", type=float, default=300, help="模拟大模型的首个token延迟")
+    parser.add_argument("--tokens-per-second", type=float, default=40, help="模拟大模型的生成速度")
+    parser.add_argument("--tokens", type=int, default=120, help="模拟大模型每次回复的token数")
+    parser.add_argument("--database-url", help="默认使用临时SQLite数据库")
+    parser.add_argument("--json", help="把结果另存为JSON文件")
+    args = parser.parse_args()
+    args.rooms = max(1, min(args.rooms, args.users))
+
+    harness = Harness(args)
+    harness.start()
+    reports = []
+    try:
+        print(f"并发 {args.concurrency}，每个场景 {args.duration:.0f}s，模拟大模型首token {args.ttft_ms:.0f}ms、{args.tokens_per_second:.0f} tokens/s")
+        print(
+            f"{'scenario':<8} {'op':<6} {'ok':>6} {'errors':>6} {'req/s':>8} {'p50 ms':>9} {'p99 ms':>9} "
+            f"{'ttfb p50':>9} {'ttfb p99':>9} {'rss MB':>8} {'peak MB':>8}"
+        )
+        for name in args.scenarios.split(","):
+            report = asyncio.run(harness.run_scenario(name.strip()))
+            reports.append(report)
+            print_report(report)
+    finally:
+        harness.stop()
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"args": vars(args), "reports": reports}, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
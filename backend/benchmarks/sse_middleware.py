@@ -0,0 +1,131 @@
+"""
+令牌刷新中间件基准测试：比较BaseHTTPMiddleware实现与纯ASGI实现下SSE流式响应的吞吐量
+
+直接以ASGI调用应用，不经过网络和服务器，只测量中间件本身的开销。
+
+用法（在backend目录下）:
+    python -m benchmarks.sse_middleware [--chunks 20000] [--chunk-size 64] [--streams 8] [--trials 5]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from starlette.applications import Starlette
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import StreamingResponse
+from starlette.routing import Route
+
+from app.core.token_refresh_middleware import TokenRefreshMiddleware, new_token_context, set_new_token
+
+
+class LegacyTokenRefreshMiddleware(BaseHTTPMiddleware):
+    """
+    改造前的实现，仅用于对比。
+    call_next在另一个任务中执行应用，端点中设置的令牌在这里读不到
+    """
+
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+        holder = new_token_context.get()
+        if holder and holder.get("token"):
+            response.headers["X-New-Token"] = holder["token"]
+        return response
+
+
+def make_app(middleware, chunks, chunk_size):
+    payload = b"data: " + b"x" * chunk_size + b"\n\n"
+
+    async def stream(request):
+        set_new_token("benchmark-token")
+
+        async def events():
+            for _ in range(chunks):
+                yield payload
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    app = Starlette(routes=[Route("/stream", stream)])
+    if middleware is not None:
+        app.add_middleware(middleware)
+    return app
+
+
+async def consume(app):
+    """发起一次请求并读完响应，返回 (收到的数据块数, 是否带有X-New-Token)"""
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/stream",
+        "raw_path": b"/stream",
+        "query_string": b"",
+        "root_path": "",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 1),
+        "server": ("bench", 80),
+    }
+    received = 0
+    has_token = False
+    request_sent = False
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        # 模拟保持连接的客户端：直到响应结束都不会断开
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal received, has_token
+        if message["type"] == "http.response.start":
+            has_token = any(name == b"x-new-token" for name, _ in message["headers"])
+        elif message["type"] == "http.response.body" and message.get("body"):
+            received += 1
+
+    await app(scope, receive, send)
+    return received, has_token
+
+
+async def measure(app, streams, chunks):
+    started = time.perf_counter()
+    results = await asyncio.gather(*(consume(app) for _ in range(streams)))
+    elapsed = time.perf_counter() - started
+    assert all(count == chunks for count, _ in results), "响应数据块数不一致"
+    return elapsed, all(token for _, token in results)
+
+
+def run(chunks, chunk_size, streams, trials):
+    variants = {
+        "none": None,
+        "base_http": LegacyTokenRefreshMiddleware,
+        "pure_asgi": TokenRefreshMiddleware,
+    }
+    print(f"{streams} streams x {chunks} chunks x {chunk_size + 8} bytes")
+    print(f"{'middleware':<10} {'p50 ms':>9} {'min ms':>9} {'chunks/s':>12} {'token':>6}")
+    for name, middleware in variants.items():
+        app = make_app(middleware, chunks, chunk_size)
+        # 预热一次
+        asyncio.run(measure(app, 1, chunks))
+        samples = []
+        has_token = False
+        for _ in range(trials):
+            elapsed, has_token = asyncio.run(measure(app, streams, chunks))
+            samples.append(elapsed)
+        p50 = statistics.median(samples)
+        rate = streams * chunks / p50
+        token = "-" if middleware is None else ("yes" if has_token else "no")
+        print(f"{name:<10} {p50 * 1000:>9.1f} {min(samples) * 1000:>9.1f} {rate:>12,.0f} {token:>6}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="令牌刷新中间件SSE吞吐量基准测试")
+    parser.add_argument("--chunks", type=int, default=20000, help="每个流的数据块数")
+    parser.add_argument("--chunk-size", type=int, default=64, help="每个数据块的字节数")
+    parser.add_argument("--streams", type=int, default=8, help="并发流数")
+    parser.add_argument("--trials", type=int, default=5, help="重复次数")
+    args = parser.parse_args()
+    run(args.chunks, args.chunk_size, args.streams, args.trials)
@@ -0,0 +1,121 @@
+"""
+行程优化基准测试：在合成城市数据集上比较动态规划与局部搜索的耗时和解的质量
+
+用法（在backend目录下）:
+    python -m benchmarks.trip_optimizer [--trials 5] [--time-limit 0.5]
+"""
+import argparse
+import math
+import random
+import statistics
+import time
+
+from app.utils.route_optimizer import RouteProblem, solve
+
+# 城市类型 -> (生成途经点的函数, 平均速度米/秒, 绕行系数)
+CITIES = {}
+
+
+def city(name, speed, detour):
+    def register(generate):
+        CITIES[name] = (generate, speed, detour)
+        return generate
+    return register
+
+
+@city("compact", speed=1.2, detour=1.2)
+def compact_city(rng, n):
+    """步行游览的老城区：5km见方"""
+    return [(rng.uniform(0, 5000), rng.uniform(0, 5000)) for _ in range(n)]
+
+
+@city("sprawling", speed=8.3, detour=1.4)
+def sprawling_city(rng, n):
+    """驾车游览的大城市：40km见方"""
+    return [(rng.uniform(0, 40000), rng.uniform(0, 40000)) for _ in range(n)]
+
+
+@city("clustered", speed=8.3, detour=1.3)
+def clustered_city(rng, n):
+    """景点集中在三个相距较远的片区"""
+    centers = [(rng.uniform(0, 30000), rng.uniform(0, 30000)) for _ in range(3)]
+    points = []
+    for _ in range(n):
+        cx, cy = rng.choice(centers)
+        points.append((cx + rng.gauss(0, 1500), cy + rng.gauss(0, 1500)))
+    return points
+
+
+def make_problem(name, n, seed):
+    generate, speed, detour = CITIES[name]
+    rng = random.Random(seed)
+    hotel = generate(rng, 1)[0]
+    points = [hotel] + generate(rng, n)
+    travel = [[math.dist(a, b) * detour / speed for b in points] for a in points]
+
+    open_times, close_times = [], []
+    for _ in range(n):
+        opening = rng.choice([0, 8, 9, 10, 14]) * 3600
+        open_times.append(opening)
+        close_times.append(24 * 3600 if opening == 0 else opening + rng.choice([4, 8, 10]) * 3600)
+
+    return RouteProblem(
+        travel=travel,
+        open_times=open_times,
+        close_times=close_times,
+        dwell=[rng.choice([20, 45, 60, 90]) * 60 for _ in range(n)],
+        costs=[rng.choice([0, 0, 40, 80, 150]) for _ in range(n)],
+        priorities=[rng.choice([1, 1, 2, 3]) for _ in range(n)],
+        day_start=9 * 3600,
+        day_end=21 * 3600,
+        budget=400
+    )
+
+
+def score(result, problem):
+    return sum(problem.priorities[k] for k in result["order"]), result["finish"]
+
+
+def run(trials, time_limit):
+    print(f"{'city':<10} {'n':>3} {'method':<13} {'p50 ms':>8} {'max ms':>8} {'stops':>6} {'gap':>12}")
+    for name in CITIES:
+        for n in (6, 8, 10, 12, 14, 20, 30, 50):
+            rows = {"exact": [], "local_search": []}
+            gaps = []
+            for seed in range(trials):
+                problem = make_problem(name, n, seed)
+                exact = None
+                if n <= 14:
+                    started = time.perf_counter()
+                    exact = solve(problem, time_limit, exact_max_stops=n)
+                    rows["exact"].append((time.perf_counter() - started, len(exact["order"])))
+
+                started = time.perf_counter()
+                local = solve(problem, time_limit, exact_max_stops=0)
+                rows["local_search"].append((time.perf_counter() - started, len(local["order"])))
+
+                if exact is not None:
+                    # 与最优解的差距：少游览的优先级，以及结束时间晚多少分钟
+                    best_priority, best_finish = score(exact, problem)
+                    priority, finish = score(local, problem)
+                    gaps.append((best_priority - priority, (finish - best_finish) / 60))
+
+            for method, samples in rows.items():
+                if not samples:
+                    continue
+                times = sorted(t * 1000 for t, _ in samples)
+                stops = statistics.mean(count for _, count in samples)
+                gap = ""
+                if method == "local_search" and gaps:
+                    missed = sum(g[0] for g in gaps) / len(gaps)
+                    late = statistics.mean(g[1] for g in gaps if g[0] == 0) if any(g[0] == 0 for g in gaps) else 0.0
+                    gap = f"{missed:.2f}p {late:+.0f}m"
+                print(f"{name:<10} {n:>3} {method:<13} {statistics.median(times):>8.1f} {times[-1]:>8.1f} {stops:>6.1f} {gap:>12}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="行程优化基准测试")
+    parser.add_argument("--trials", type=int, default=5, help="每种规模的随机实例数")
+    parser.add_argument("--time-limit", type=float, default=0.5, help="局部搜索时限（秒）")
+    args = parser.parse_args()
+    run(args.trials, args.time_limit)
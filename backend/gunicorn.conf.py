@@ -0,0 +1,51 @@
+"""
+生产环境的gunicorn配置（在backend目录下）:
+    gunicorn -c gunicorn.conf.py app.main:app
+
+- worker数默认等于可用CPU核数（考虑容器的CPU配额），可用WEB_CONCURRENCY指定
+- 预加载应用：在主进程中导入一次，worker通过fork共享只读内存（写时复制），启动更快、占用更少
+- 优雅退出：停止接受新连接，等待进行中的流式回复完成，最长GRACEFUL_TIMEOUT秒
+- worker处理MAX_REQUESTS个请求后（加随机抖动，避免同时重启）自动替换，限制内存增长
+"""
+import os
+
+# gunicorn把本文件的模块级变量都当作配置项，decouple的config不能直接导入（与-c/--config同名）
+import decouple
+
+
+def _cpu_count() -> int:
+    """可用CPU核数，容器设置了CPU配额（cgroup v2的cpu.max）时按配额向上取整"""
+    count = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else (os.cpu_count() or 1)
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            count = min(count, -(-int(quota) // int(period)))
+    except (OSError, ValueError):
+        pass
+    return max(1, count)
+
+
+bind = decouple.config("GUNICORN_BIND", default="0.0.0.0:8000")
+# worker数，0表示按CPU核数
+workers = decouple.config("WEB_CONCURRENCY", default=0, cast=int) or _cpu_count()
+worker_class = "app.core.gunicorn_worker.UvicornWorker"
+preload_app = True
+
+# 退出时等待进行中请求的最长时间（秒），超时后强制结束worker
+graceful_timeout = decouple.config("GRACEFUL_TIMEOUT", default=60, cast=int)
+# worker无响应多久后被重启（秒）
+timeout = decouple.config("WORKER_TIMEOUT", default=60, cast=int)
+keepalive = 5
+
+# worker处理多少个请求后替换，0表示不替换
+max_requests = decouple.config("MAX_REQUESTS", default=5000, cast=int)
+max_requests_jitter = decouple.config("MAX_REQUESTS_JITTER", default=500, cast=int)
+
+accesslog = "-"
+
+
+def post_fork(server, worker):
+    """丢弃从主进程继承的数据库连接（如有），worker各自建立连接"""
+    from app.core.database import dispose_engine
+    dispose_engine(close=False)
@@ -0,0 +1,49 @@
+"""
+批量导入兴趣点
+
+用法:
+    python import_pois.py beijing.geojson
+    python import_pois.py pois.csv --chunk-size 10000 --dedup-radius 30
+    cat pois.ndjson | python import_pois.py - --format ndjson
+"""
+import argparse
+import json
+import logging
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.services.poi_import_service import PoiImportService
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量导入兴趣点（CSV/GeoJSON/NDJSON）")
+    parser.add_argument("path", help="导入文件路径，- 表示标准输入")
+    parser.add_argument("--format", choices=["csv", "geojson", "ndjson"], help="文件格式，默认按扩展名识别")
+    parser.add_argument("--chunk-size", type=int, default=settings.POI_IMPORT_CHUNK_SIZE, help="每次提交的记录数")
+    parser.add_argument(
+        "--dedup-radius",
+        type=float,
+        default=settings.POI_IMPORT_DEDUP_RADIUS_M,
+        help="同名兴趣点相距不超过该距离（米）时视为重复，0表示只按external_id去重"
+    )
+    parser.add_argument("--no-copy", action="store_true", help="不使用PostgreSQL COPY，逐块批量插入和更新")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+
+    db = SessionLocal()
+    try:
+        stats = PoiImportService(db).import_file(
+            args.path,
+            file_format=args.format,
+            chunk_size=args.chunk_size,
+            dedup_radius_m=args.dedup_radius,
+            use_copy=not args.no_copy
+        )
+    finally:
+        db.close()
+    print(json.dumps(stats.as_dict(), ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
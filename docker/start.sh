@@ -13,6 +13,7 @@ fi
 # 启动 Nginx（在后台运行）
 nginx &
 
-# 启动后端服务（在前台运行）
+# 启动后端服务（在前台运行）：gunicorn多进程，配置见gunicorn.conf.py
+# 使用exec使gunicorn直接接收docker stop的SIGTERM，进行优雅退出
 cd /app
-uvicorn app.main:app --host 0.0.0.0 --port 8000
+exec gunicorn -c gunicorn.conf.py app.main:app